@@ -2,10 +2,12 @@
 Backend API Server for Echo Voice Application
 Provides endpoints for voice synthesis, user management, and conversation history.
 """
-from flask import Flask, request, jsonify, send_from_directory, render_template
+from flask import Flask, Request, Response, request, jsonify, send_from_directory, render_template
 from flask_cors import CORS
 import os
 import sys
+import json
+import tempfile
 from pathlib import Path
 
 # Add parent directory to path to import modules
@@ -13,17 +15,62 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from backend.config import Config
 from backend.database import DatabaseManager
+from backend.job_queue import JobQueue
+from backend.resumable_upload import UploadOffsetMismatch, UploadSessionNotFound, UploadSessionStore
 from backend.voice_service import VoiceServiceWrapper
 
+class UploadRequest(Request):
+    """Request that keeps uploaded files in memory up to UPLOAD_SPOOL_MAX_BYTES."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Only larger uploads spill to an anonymous temp file (unique, removed on close)
+        return tempfile.SpooledTemporaryFile(max_size=Config.UPLOAD_SPOOL_MAX_BYTES, mode="rb+")
+
+
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React Native frontend
+app.request_class = UploadRequest
+app.use_x_sendfile = Config.USE_X_SENDFILE
+# Enable CORS for React Native frontend (expose streaming metadata headers)
+CORS(app, expose_headers=["X-Audio-Url", "X-Cache", "Upload-Offset", "Location"])
 
 # Initialize services
 try:
     Config.validate()
     db = DatabaseManager()
     voice_service = VoiceServiceWrapper()
+    
+    # Background synthesis jobs (POST /api/synthesize with "async": true)
+    job_queue = JobQueue(
+        Path(__file__).parent / Config.JOB_QUEUE_DB,
+        handlers={"synthesize": lambda payload: voice_service.synthesize(**payload)},
+        workers=Config.JOB_WORKERS,
+        lease_seconds=Config.JOB_LEASE_SECONDS,
+        retention_seconds=Config.JOB_RETENTION_HOURS * 3600,
+        callback_allowed_hosts=Config.JOB_CALLBACK_ALLOWED_HOSTS
+    )
+    job_queue.start()
+    
+    # Resumable reference uploads (/api/uploads), assembled on local disk
+    upload_sessions = UploadSessionStore(
+        Path(__file__).parent / Config.UPLOAD_SESSIONS_DIR,
+        ttl_seconds=Config.UPLOAD_SESSION_TTL_HOURS * 3600,
+        max_bytes=Config.UPLOAD_SESSION_MAX_BYTES,
+        max_chunk_bytes=Config.UPLOAD_CHUNK_MAX_BYTES
+    )
+    upload_sessions.start(Config.UPLOAD_SESSION_SWEEP_INTERVAL)
+    
+    # Background voice model creation ("async" uploads) - its own worker pool on
+    # the same job database, so slow model training doesn't hold up synthesis.
+    # Started at the bottom of this module, once its handler is defined.
+    model_queue = JobQueue(
+        Path(__file__).parent / Config.JOB_QUEUE_DB,
+        handlers={"create_voice_model": lambda payload: _create_voice_model_job(payload)},
+        workers=Config.VOICE_MODEL_WORKERS,
+        lease_seconds=Config.JOB_LEASE_SECONDS,
+        retention_seconds=Config.JOB_RETENTION_HOURS * 3600,
+        callback_allowed_hosts=Config.JOB_CALLBACK_ALLOWED_HOSTS
+    )
     print("✅ All services initialized successfully")
 except Exception as e:
     print(f"❌ Error initializing services: {e}")
@@ -43,6 +90,27 @@ def health_check():
     return jsonify({"status": "healthy", "service": "echo-backend"}), 200
 
 
+@app.route('/outputs/<path:filename>', methods=['GET'])
+def serve_output(filename):
+    """
+    Serve generated audio (the audio_url returned by /api/synthesize).
+    
+    Supports Range requests (206) for seeking and conditional requests via
+    ETag. Under a WSGI server with wsgi.file_wrapper (e.g. gunicorn) the
+    file is sent with sendfile instead of being read through Python.
+    """
+    etag, cache_control = voice_service.output_cache_policy(filename)
+    response = send_from_directory(
+        voice_service.output_dir,
+        filename,
+        conditional=True,
+        etag=etag or True
+    )
+    response.headers["Cache-Control"] = cache_control
+    voice_service.retention.touch(filename)
+    return response
+
+
 @app.route('/api/synthesize', methods=['POST'])
 def synthesize_speech():
     """
@@ -53,8 +121,19 @@ def synthesize_speech():
         "text": "Text to synthesize",
         "reference_id": "reference_audio_id" (optional),
         "voice_id": "voice_model_id" (optional),
-        "format": "wav" (optional, default: wav)
+        "format": "wav" (optional, default: wav),
+        "stream": true (optional, or ?stream=1),
+        "async": true (optional, or ?async=1),
+        "callback_url": "https://..." (optional, with async; must be a public address)
     }
+    
+    With stream enabled the response body is the audio itself (audio/mpeg),
+    sent chunk by chunk as Fish.Audio produces it. The saved file's URL is
+    returned in the X-Audio-Url header.
+    
+    With async enabled the request is queued and answered with 202 and a
+    job_id; poll /api/jobs/<job_id> for the result, or pass callback_url
+    to have the finished job POSTed to you.
     """
     try:
         data = request.json
@@ -63,34 +142,302 @@ def synthesize_speech():
         if not text:
             return jsonify({"error": "Text is required"}), 400
         
+        run_async = data.get('async') or request.args.get('async', '').lower() in ('1', 'true')
+        if run_async:
+            try:
+                job = job_queue.submit(
+                    "synthesize",
+                    {
+                        "text": text,
+                        "reference_id": data.get('reference_id'),
+                        "voice_id": data.get('voice_id'),
+                        "format": data.get('format', 'wav')
+                    },
+                    callback_url=data.get('callback_url')
+                )
+            except ValueError as e:
+                # callback_url that isn't http(s) or points at an internal address
+                return jsonify({"error": str(e)}), 400
+            status_url = f"/api/jobs/{job['job_id']}"
+            return jsonify({**job, "status_url": status_url}), 202, {"Location": status_url}
+        
+        stream = data.get('stream') or request.args.get('stream', '').lower() in ('1', 'true')
+        if stream:
+            audio_stream = voice_service.synthesize_stream(
+                text=text,
+                reference_id=data.get('reference_id'),
+                voice_id=data.get('voice_id'),
+                format=data.get('format', 'wav')
+            )
+            return Response(
+                audio_stream,
+                mimetype='audio/mpeg',
+                headers={
+                    "X-Audio-Url": audio_stream.audio_url,
+                    "X-Cache": "HIT" if audio_stream.cached else "MISS"
+                }
+            )
+        
         # Generate speech using Fish.Audio API
-        output_path = voice_service.synthesize(
+        result = voice_service.synthesize(
             text=text,
             reference_id=data.get('reference_id'),
             voice_id=data.get('voice_id'),
             format=data.get('format', 'wav')
         )
         
+        # audio_url is served by /outputs/<path>
         return jsonify({
             "success": True,
-            "audio_path": str(output_path),
-            "message": "Speech synthesized successfully"
+            "audio_path": result["audio_path"],
+            "audio_url": result["audio_url"],
+            "cached": result["cached"],
+            "message": result["message"]
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/synthesize/batch', methods=['POST'])
+def synthesize_batch():
+    """
+    Synthesize a batch of texts.
+    
+    Request body:
+    {
+        "items": [{"text": "...", "reference_id": "..." (optional), "voice_id": "..." (optional)}],
+        "concurrency": 4 (optional, capped at TTS_BATCH_CONCURRENCY)
+    }
+    
+    Responds with NDJSON: one line per item, in order, sent as soon as each
+    item is done. Failed items get "success": false and an "error".
+    """
+    try:
+        data = request.json
+        items = data.get('items')
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items must be a non-empty list"}), 400
+        if len(items) > Config.TTS_BATCH_MAX_ITEMS:
+            return jsonify({"error": f"Batch is limited to {Config.TTS_BATCH_MAX_ITEMS} items"}), 400
+        
+        results = voice_service.synthesize_batch(items, data.get('concurrency'))
+        lines = (json.dumps(result) + "\n" for result in results)
+        
+        return Response(lines, mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the status of a background job.
+    
+    Status is one of queued, running, succeeded or failed. Succeeded
+    synthesis jobs include the result (audio_url) from /api/synthesize.
+    """
+    try:
+        job = job_queue.get(job_id, kinds=('synthesize',))
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify({"job": job}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/voices', methods=['GET'])
 def get_voices():
-    """Get list of available voices from Fish.Audio."""
+    """
+    Get list of available voices from Fish.Audio.
+    
+    Query parameters (all optional):
+        page_size: Models per page
+        offset: Number of models to skip (use next_offset from the last page)
+        title: Only models whose title matches
+        stream: 1 to stream every model as NDJSON (one model per line)
+    """
     try:
-        voices = voice_service.get_available_voices()
+        title = request.args.get('title')
+        if request.args.get('stream', '').lower() in ('1', 'true'):
+            def lines():
+                try:
+                    for model in voice_service.iter_voices(title):
+                        yield json.dumps(model) + "\n"
+                except Exception as e:
+                    yield json.dumps({"error": str(e)}) + "\n"
+            
+            return Response(lines(), mimetype='application/x-ndjson')
+        
+        voices = voice_service.get_available_voices(
+            page_size=request.args.get('page_size', type=int),
+            offset=request.args.get('offset', 0, type=int),
+            title=title
+        )
         return jsonify({"voices": voices}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss statistics for the TTS cache and request coalescing."""
+    try:
+        return jsonify({
+            "cache": voice_service.get_cache_stats(),
+            "coalescing": voice_service.get_coalescing_stats(),
+            "voices": voice_service.get_voices_cache_stats(),
+            "history": db.history_cache.stats() if db.history_cache else None
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/admin/outputs/stats', methods=['GET'])
+def get_output_stats():
+    """Get disk usage and retention sweeper statistics for generated audio."""
+    try:
+        return jsonify({"retention": voice_service.get_retention_stats()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/admin/db/indexes', methods=['GET'])
+def get_index_report():
+    """
+    Compare MongoDB indexes with the ones the hot queries need.
+    
+    drift is true when an index is missing, changed, failed to build or
+    isn't in the expected set. Missing indexes are created on startup.
+    """
+    try:
+        return jsonify({"indexes": db.check_indexes()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/transport/stats', methods=['GET'])
+def get_transport_stats():
+    """Get connection pool statistics for Fish.Audio calls."""
+    try:
+        return jsonify({"transport": voice_service.get_transport_stats()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _reference_upload_response(result, name, filename, user_id=None, echo_id=None, file_type='audio'):
+    """
+    Save the voice model to the database (when a user is given) and build
+    the upload response.
+    
+    A de-duplicated upload reuses an existing model; its record is upserted
+    in case the earlier upload never saved one.
+    
+    Returns:
+        (response dict, HTTP status)
+    """
+    deduplicated = bool(result.get('deduplicated'))
+    
+    # Extract model_id from result (voice_service returns a dict)
+    model_id = result.get('model_id') or result.get('reference_id') if isinstance(result, dict) else result
+    
+    # Save to database if user_id provided and MongoDB is configured
+    db_record = None
+    if user_id and db.voice_models:
+        try:
+            from bson.objectid import ObjectId
+            user_obj_id = ObjectId(user_id)
+            echo_obj_id = ObjectId(echo_id) if echo_id else None
+            
+            save = db.ensure_voice_model if deduplicated else db.create_voice_model
+            db_record = save(
+                user_id=user_obj_id,
+                model_id=model_id,
+                name=name,
+                audio_file_path=filename,  # Original filename
+                file_type=file_type,
+                echo_id=echo_obj_id,
+                duration_seconds=result.get('duration_seconds')
+            )
+            
+            # Convert ObjectIds to strings for JSON response
+            if db_record:
+                db_record['_id'] = str(db_record['_id'])
+                db_record['user_id'] = str(db_record['user_id'])
+                if db_record.get('echo_id'):
+                    db_record['echo_id'] = str(db_record['echo_id'])
+                db_record['created_at'] = db_record['created_at'].isoformat()
+                
+        except Exception as db_error:
+            print(f"Warning: Could not save to database: {db_error}")
+            # Continue anyway - Fish.Audio upload was successful
+    
+    response = {
+        "success": True,
+        "model_id": model_id,
+        "reference_id": model_id,
+        "duration_seconds": result.get('duration_seconds'),
+        "deduplicated": deduplicated,
+        "message": "Reference audio uploaded successfully"
+    }
+    if result.get('normalization'):
+        # Before/after sizes of the mono, resampled clip that was actually sent
+        response["normalization"] = result['normalization']
+    
+    if db_record:
+        response["database_record"] = db_record
+        response["message"] += " and saved to database"
+    
+    if deduplicated:
+        response["message"] = "Voice model already exists for this audio"
+        return response, 200
+    
+    return response, 201
+
+
+def _create_voice_model_job(payload):
+    """Job handler: create the voice model for a stored upload session."""
+    upload_id = payload['session_id']
+    session = upload_sessions.get(upload_id)
+    with open(upload_sessions.completed_path(upload_id), 'rb') as audio_file:
+        result = voice_service.upload_reference_audio(
+            audio_file,
+            session['name'],
+            filename=session['filename'],
+            owner=session.get('user_id')
+        )
+    upload_sessions.delete(upload_id)
+    
+    response, _ = _reference_upload_response(
+        result,
+        session['name'],
+        session['filename'],
+        session.get('user_id'),
+        session.get('echo_id'),
+        session.get('file_type', 'audio')
+    )
+    return response
+
+
+def _queue_voice_model(session):
+    """Queue model creation for a stored upload and build the 202 response."""
+    job = model_queue.submit("create_voice_model", {"session_id": session['upload_id']})
+    status_url = f"/api/upload-reference/{job['job_id']}"
+    response = {
+        "upload_id": job['job_id'],
+        "status": job['status'],
+        "status_url": status_url,
+        "message": "Upload received - the voice model is being created"
+    }
+    return jsonify(response), 202, {"Location": status_url}
+
+
+def _is_async(form):
+    return str(form.get('async', request.args.get('async', ''))).lower() in ('1', 'true')
+
+
 @app.route('/api/upload-reference', methods=['POST'])
 def upload_reference():
     """
@@ -102,6 +449,8 @@ def upload_reference():
     - user_id: optional user ID to link the voice model (recommended)
     - echo_id: optional echo ID to link the voice model
     - file_type: 'audio' or 'video' (default: 'audio')
+    - async: 'true' to answer 202 right away with an upload_id and create the
+      model in the background (poll /api/upload-reference/<upload_id>)
     """
     try:
         if 'audio' not in request.files:
@@ -113,62 +462,188 @@ def upload_reference():
         echo_id = request.form.get('echo_id')  # Optional
         file_type = request.form.get('file_type', 'audio')
         
-        # Save temporarily
-        temp_path = Path("temp") / audio_file.filename
-        temp_path.parent.mkdir(exist_ok=True)
-        audio_file.save(str(temp_path))
-        
-        # Upload to Fish.Audio
-        result = voice_service.upload_reference_audio(str(temp_path), name)
+        if _is_async(request.form):
+            # Keep the file on local disk until a worker has created the model
+            session = upload_sessions.create_from_file(
+                audio_file.stream,
+                audio_file.filename,
+                name=name,
+                user_id=user_id,
+                echo_id=echo_id,
+                file_type=file_type
+            )
+            return _queue_voice_model(session)
         
-        # Extract model_id from result (voice_service returns a dict)
-        model_id = result.get('model_id') or result.get('reference_id') if isinstance(result, dict) else result
+        # Stream the upload straight into the Fish.Audio request (no temp file).
+        # A re-upload of audio this user already cloned returns the existing model.
+        result = voice_service.upload_reference_audio(
+            audio_file.stream,
+            name,
+            filename=audio_file.filename,
+            owner=user_id
+        )
+        response, status = _reference_upload_response(
+            result, name, audio_file.filename, user_id, echo_id, file_type
+        )
+        return jsonify(response), status
         
-        # Save to database if user_id provided and MongoDB is configured
-        db_record = None
-        if user_id and db.voice_models:
-            try:
-                from bson.objectid import ObjectId
-                user_obj_id = ObjectId(user_id)
-                echo_obj_id = ObjectId(echo_id) if echo_id else None
-                
-                db_record = db.create_voice_model(
-                    user_id=user_obj_id,
-                    model_id=model_id,
-                    name=name,
-                    audio_file_path=audio_file.filename,  # Original filename
-                    file_type=file_type,
-                    echo_id=echo_obj_id
-                )
-                
-                # Convert ObjectIds to strings for JSON response
-                if db_record:
-                    db_record['_id'] = str(db_record['_id'])
-                    db_record['user_id'] = str(db_record['user_id'])
-                    if db_record.get('echo_id'):
-                        db_record['echo_id'] = str(db_record['echo_id'])
-                    db_record['created_at'] = db_record['created_at'].isoformat()
-                    
-            except Exception as db_error:
-                print(f"Warning: Could not save to database: {db_error}")
-                # Continue anyway - Fish.Audio upload was successful
-        
-        # Clean up temp file
-        temp_path.unlink()
+    except ValueError as e:
+        # Rejected audio (e.g. too long) - the client needs to send a different clip
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/upload-reference/<upload_id>', methods=['GET'])
+def get_upload_status(upload_id):
+    """
+    Status of an async reference upload (poll until succeeded or failed).
+    
+    status is queued, running, succeeded or failed. Once succeeded the
+    response also has the /api/upload-reference fields (model_id,
+    reference_id, duration_seconds, ...); a failed upload has error.
+    """
+    try:
+        job = model_queue.get(upload_id, kinds=('create_voice_model',))
+        if not job:
+            return jsonify({"error": "Upload not found"}), 404
         
         response = {
-            "success": True,
-            "model_id": model_id,
-            "reference_id": model_id,
-            "message": "Reference audio uploaded successfully"
+            **(job['result'] or {}),
+            "upload_id": upload_id,
+            "status": job['status'],
+            "error": job['error'],
+            "created_at": job['created_at'],
+            "updated_at": job['updated_at']
         }
+        return jsonify(response), 200, {"Cache-Control": "no-store"}
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _upload_session_response(session, status=200):
+    """JSON session plus the Upload-Offset header clients resume from."""
+    response = jsonify({"upload": session})
+    response.headers["Upload-Offset"] = str(session["offset"])
+    response.headers["Cache-Control"] = "no-store"
+    return response, status
+
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload_session():
+    """
+    Start a resumable reference upload (for flaky mobile connections).
+    
+    Expects JSON with:
+    - filename: original filename, e.g. "clip.mp3"
+    - total_size: optional size in bytes (finalize then checks every byte arrived)
+    - name, user_id, echo_id, file_type: as for /api/upload-reference
+    
+    Then PUT chunks to /api/uploads/<upload_id> with an Upload-Offset header,
+    GET (or HEAD) it after a dropped connection to find where to resume,
+    and POST /api/uploads/<upload_id>/finalize to create the voice model.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        session = upload_sessions.create(
+            data.get('filename'),
+            total_size=data.get('total_size'),
+            name=data.get('name', 'Reference Audio'),
+            user_id=data.get('user_id'),
+            echo_id=data.get('echo_id'),
+            file_type=data.get('file_type', 'audio')
+        )
+        response, status = _upload_session_response(session, 201)
+        response.headers["Location"] = f"/api/uploads/{session['upload_id']}"
+        return response, status
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def manage_upload_session(upload_id):
+    """
+    GET/HEAD: Current offset (also in the Upload-Offset header)
+    PUT: Append the raw request body at the Upload-Offset header's offset
+         (409 with the server's offset if it doesn't match)
+    DELETE: Abandon the upload
+    """
+    try:
+        if request.method in ('GET', 'HEAD'):
+            return _upload_session_response(upload_sessions.get(upload_id))
+        
+        if request.method == 'DELETE':
+            upload_sessions.delete(upload_id)
+            return jsonify({"success": True, "message": "Upload cancelled"}), 200
         
-        if db_record:
-            response["database_record"] = db_record
-            response["message"] += " and saved to database"
+        offset = request.headers.get('Upload-Offset', request.args.get('offset'))
+        if offset is None or not offset.isdigit():
+            return jsonify({"error": "Upload-Offset header is required"}), 400
         
-        return jsonify(response), 201
+        # Written to disk as it arrives - a dropped connection keeps what was received
+        session = upload_sessions.append(
+            upload_id,
+            int(offset),
+            request.stream,
+            length=request.content_length
+        )
+        return _upload_session_response(session)
         
+    except UploadSessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except UploadOffsetMismatch as e:
+        response = jsonify({"error": str(e), "offset": e.offset})
+        response.headers["Upload-Offset"] = str(e.offset)
+        return response, 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/uploads/<upload_id>/finalize', methods=['POST'])
+def finalize_upload_session(upload_id):
+    """
+    Create the voice model from a completed resumable upload.
+    
+    Responds like /api/upload-reference. The session is removed once the
+    model exists; if model creation fails it is kept so finalize can be
+    retried without uploading again. With {"async": true} (or ?async=1) it
+    answers 202 like an async /api/upload-reference.
+    """
+    try:
+        session = upload_sessions.get(upload_id)
+        path = upload_sessions.completed_path(upload_id)
+        
+        if _is_async(request.get_json(silent=True) or {}):
+            return _queue_voice_model(session)
+        
+        with open(path, 'rb') as audio_file:
+            result = voice_service.upload_reference_audio(
+                audio_file,
+                session['name'],
+                filename=session['filename'],
+                owner=session.get('user_id')
+            )
+        upload_sessions.delete(upload_id)
+        
+        response, status = _reference_upload_response(
+            result,
+            session['name'],
+            session['filename'],
+            session.get('user_id'),
+            session.get('echo_id'),
+            session.get('file_type', 'audio')
+        )
+        return jsonify(response), status
+        
+    except UploadSessionNotFound as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        # Incomplete upload or rejected audio
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -222,9 +697,24 @@ def create_echo():
         return jsonify({"error": str(e)}), 500
 
 
+# Largest page /api/conversation/<echo_id> returns
+MAX_CONVERSATION_PAGE = 100
+
+
 @app.route('/api/conversation/<echo_id>', methods=['GET', 'POST'])
 def manage_conversation(echo_id):
-    """Get conversation history or add a new message."""
+    """
+    Get conversation history or add a new message.
+    
+    GET query parameters (all optional):
+        limit: Messages per page (default 10, at most 100)
+        before: Cursor - page back to older messages
+        after: Cursor - page forward to newer messages
+    
+    Messages come oldest first. Pass next_cursor from the response as the
+    same parameter (before or after) to get the next page; it is null when
+    there are no more messages in that direction.
+    """
     try:
         from bson.objectid import ObjectId
         echo_obj_id = ObjectId(echo_id)
@@ -240,17 +730,26 @@ def manage_conversation(echo_id):
             db.add_message_to_history(echo_obj_id, role, content)
             return jsonify({"success": True, "message": "Message added"}), 201
         else:
-            # GET request
-            limit = request.args.get('limit', 10, type=int)
-            messages = db.get_message_history(echo_obj_id, limit)
+            # GET request - newest page, or keyset paging with before/after
+            limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_CONVERSATION_PAGE)
+            page = db.get_message_page(
+                echo_obj_id,
+                limit,
+                before=request.args.get('before'),
+                after=request.args.get('after')
+            )
+            messages = page['messages']
             
             # Convert ObjectIds to strings
             for msg in messages:
                 msg['_id'] = str(msg['_id'])
                 msg['echo_id'] = str(msg['echo_id'])
             
-            return jsonify({"messages": messages}), 200
+            return jsonify({"messages": messages, "next_cursor": page['next_cursor']}), 200
             
+    except ValueError as e:
+        # Bad cursor (or both before and after)
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -299,6 +798,9 @@ def manage_voice_model(model_id):
     try:
         if request.method == 'DELETE':
             success = db.delete_voice_model(model_id)
+            # Re-uploading the same audio must create a fresh model from now on
+            if voice_service.references:
+                voice_service.references.forget(model_id)
             if success:
                 return jsonify({"success": True, "message": "Voice model deleted"}), 200
             else:
@@ -348,6 +850,9 @@ def get_echo_voice_model(echo_id):
         return jsonify({"error": str(e)}), 500
 
 
+model_queue.start()
+
+
 if __name__ == '__main__':
     print("=" * 60)
     print("🚀 Starting Echo Backend API Server")
@@ -367,6 +872,11 @@ if __name__ == '__main__':
             threaded=True
         )
     except KeyboardInterrupt:
+        voice_service.retention.stop()
+        upload_sessions.stop()
+        job_queue.stop()
+        model_queue.stop()
+        db.close()
         print("\n\n👋 Server stopped by user")
     except Exception as e:
         print(f"\n❌ Server error: {e}")
@@ -0,0 +1,597 @@
+"""
+Async Voice Service Client for Fish.Audio API
+asyncio version of VoiceServiceWrapper for the FastAPI app, so a slow
+Fish.Audio call never blocks the event loop.
+"""
+import asyncio
+import io
+from pathlib import Path
+
+from config import Config
+from http_transport import AsyncFishAudioTransport
+from mp3_frames import audio_frames
+from multipart_stream import MultipartStream
+from singleflight import AsyncFlight, FlightRegistry
+from tts_cache import TTSCache
+from ttl_cache import TTLCache
+from voice_service import STREAM_CHUNK_SIZE, VoiceServiceBase
+
+
+class AsyncSynthesisStream:
+    """
+    Async iterable of audio chunks for one synthesis request.
+
+    Async counterpart of SynthesisStream: iterate with ``async for``, and
+    await aclose() if you stop early.
+    """
+
+    def __init__(self, chunks, result: dict, on_abandon=None):
+        self._chunks = chunks
+        self._result = result
+        self._on_abandon = on_abandon
+        self._started = False
+        self.audio_url = result["audio_url"]
+        self.cached = result["cached"]
+
+    def __aiter__(self):
+        self._started = True
+        return self._chunks
+
+    async def aclose(self):
+        if not self._started and self._on_abandon:
+            await self._on_abandon()
+        await self._chunks.aclose()
+
+    def result(self) -> dict:
+        return dict(self._result)
+
+
+class AsyncVoiceServiceWrapper(VoiceServiceBase):
+    """
+    Async wrapper around Fish.Audio API for text-to-speech synthesis.
+
+    Same methods as VoiceServiceWrapper, but synthesize, synthesize_stream,
+    get_available_voices and upload_reference_audio are coroutines. HTTP
+    goes through a shared httpx connection pool; file writes run in worker
+    threads. Cancelling a call (e.g. when the client disconnects) aborts the
+    upstream request and removes any partially written file.
+    """
+
+    def __init__(self):
+        """Initialize the voice service with API configuration from environment."""
+        super().__init__()
+
+        self.async_transport = AsyncFishAudioTransport(
+            self.api_key,
+            pool_size=Config.FISH_AUDIO_ASYNC_POOL_SIZE,
+            connect_timeout=Config.FISH_AUDIO_CONNECT_TIMEOUT,
+            read_timeout=Config.FISH_AUDIO_READ_TIMEOUT,
+            max_retries=Config.FISH_AUDIO_MAX_RETRIES,
+            backoff_base=Config.FISH_AUDIO_BACKOFF_BASE
+        )
+
+        # Followers wait with asyncio primitives instead of blocking threads
+        self.flights = FlightRegistry(AsyncFlight)
+        self.reference_flights = FlightRegistry(AsyncFlight)
+
+        # Bounds concurrent chunk requests for long texts (like the sync thread pool)
+        self._chunk_slots = asyncio.Semaphore(Config.TTS_LONG_TEXT_WORKERS)
+
+        # Keeps background refresh tasks referenced until they finish
+        self._background_tasks = set()
+
+    async def synthesize(
+        self,
+        text: str,
+        output_path: str = None,
+        reference_id: str = None,
+        voice_id: str = None,
+        format: str = "mp3",
+        **kwargs
+    ) -> dict:
+        """
+        Synthesize speech from text using Fish.Audio API.
+
+        Args:
+            Same as VoiceServiceWrapper.synthesize()
+
+        Returns:
+            Dict with audio_path and audio_url of the generated file
+        """
+        stream = await self.synthesize_stream(
+            text,
+            output_path=output_path,
+            reference_id=reference_id,
+            voice_id=voice_id,
+            format=format,
+            **kwargs
+        )
+
+        try:
+            if not stream.cached:
+                async for _ in stream:
+                    pass
+        finally:
+            await stream.aclose()
+
+        return stream.result()
+
+    async def synthesize_stream(
+        self,
+        text: str,
+        output_path: str = None,
+        reference_id: str = None,
+        voice_id: str = None,
+        format: str = "mp3",
+        **kwargs
+    ) -> AsyncSynthesisStream:
+        """
+        Start synthesizing speech and return the audio as it arrives.
+
+        Args:
+            Same as VoiceServiceWrapper.synthesize()
+
+        Returns:
+            AsyncSynthesisStream yielding audio bytes
+        """
+        payload = self._build_payload(text, reference_id, voice_id, kwargs)
+
+        cache_key, cached_path = await asyncio.to_thread(
+            self._cache_lookup, payload, format, output_path
+        )
+        if cached_path:
+            return AsyncSynthesisStream(
+                self._aiter_file(cached_path),
+                self._synthesis_result(cached_path, cached=True)
+            )
+
+        # Identical requests already in flight share one upstream call
+        flight = None
+        if output_path is None:
+            flight_key = cache_key or TTSCache.make_key(payload, format)
+            flight, leader = self.flights.join(flight_key)
+            if not leader:
+                return await self._follow_flight_async(flight)
+
+        try:
+            stream = await self._start_synthesis_async(payload, format, output_path, cache_key)
+        except BaseException as e:
+            if flight:
+                flight.fail(e)
+                self.flights.land(flight_key, flight)
+            raise
+
+        if flight:
+            return self._lead_flight_async(stream, flight, flight_key)
+        return stream
+
+    async def _start_synthesis_async(
+        self,
+        payload: dict,
+        format: str,
+        output_path: str = None,
+        cache_key: str = None
+    ) -> AsyncSynthesisStream:
+        """Send the upstream request(s) for a cache miss."""
+        output_path, reserved = await asyncio.to_thread(self._prepare_output, output_path, format)
+
+        chunks = self._long_text_chunks(payload["text"])
+        if chunks:
+            return await self._synthesize_long_stream(payload, chunks, output_path, cache_key)
+
+        httpx = self.async_transport._httpx
+        try:
+            response = await self.async_transport.post(
+                f"{self.api_url}/tts",
+                json=payload,
+                stream=True,
+                idempotent=True
+            )
+        except BaseException as e:
+            if reserved:
+                await asyncio.to_thread(self.allocator.release, output_path)
+            if isinstance(e, httpx.HTTPError):
+                raise RuntimeError(f"Fish.Audio API request failed: {str(e)}")
+            raise
+
+        if response.is_error:
+            await response.aread()
+            await response.aclose()
+            if reserved:
+                await asyncio.to_thread(self.allocator.release, output_path)
+            raise RuntimeError(
+                f"Fish.Audio API request failed: {response.status_code} {response.text}"
+            )
+
+        async def abandon():
+            await response.aclose()
+            await asyncio.to_thread(Path(output_path).unlink, missing_ok=True)
+
+        return AsyncSynthesisStream(
+            self._tee_to_disk_async(response, output_path, cache_key),
+            self._synthesis_result(output_path),
+            on_abandon=abandon
+        )
+
+    def _lead_flight_async(self, stream: AsyncSynthesisStream, flight, key: str) -> AsyncSynthesisStream:
+        """Wrap the leader's stream so coalesced followers can track its progress."""
+        flight.start(stream.result())
+
+        async def abandon():
+            await stream.aclose()
+            flight.fail(RuntimeError("Synthesis was cancelled"))
+            self.flights.land(key, flight)
+
+        return AsyncSynthesisStream(
+            self._report_progress_async(stream, flight, key),
+            stream.result(),
+            on_abandon=abandon
+        )
+
+    async def _report_progress_async(self, stream: AsyncSynthesisStream, flight, key: str):
+        try:
+            async for chunk in stream:
+                # Resuming the inner stream wrote the previous chunk to disk
+                flight.progress()
+                yield chunk
+            flight.finish()
+        except (GeneratorExit, asyncio.CancelledError):
+            flight.fail(RuntimeError("Synthesis was cancelled"))
+            raise
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        finally:
+            await stream.aclose()
+            self.flights.land(key, flight)
+
+    async def _follow_flight_async(self, flight) -> AsyncSynthesisStream:
+        """Attach to an identical synthesis that is already in progress."""
+        await flight.wait_started()
+        return AsyncSynthesisStream(self._tail_file_async(flight), flight.result)
+
+    @staticmethod
+    async def _tail_file_async(flight):
+        """Yield the leader's output file as it grows, until the leader finishes."""
+        f = await asyncio.to_thread(open, flight.result["audio_path"], 'rb')
+        try:
+            while True:
+                done = flight.done
+                chunk = await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                    continue
+                if flight.error is not None:
+                    raise RuntimeError(f"Coalesced synthesis failed: {flight.error}")
+                if done:
+                    break
+                await flight.wait_progress(timeout=0.25)
+        finally:
+            await asyncio.to_thread(f.close)
+
+    async def synthesize_batch(self, items: list, concurrency: int = None):
+        """
+        Synthesize many texts with bounded concurrency.
+
+        Args:
+            Same as VoiceServiceWrapper.synthesize_batch()
+
+        Yields:
+            One result dict per item, in input order
+        """
+        slots = asyncio.Semaphore(self._batch_concurrency(concurrency))
+
+        async def run(index, item):
+            async with slots:
+                try:
+                    result = await self.synthesize(**self._batch_item_args(item))
+                    return {"index": index, "success": True, **result}
+                except Exception as e:
+                    return {"index": index, "success": False, "error": str(e)}
+
+        tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            # Stop remaining items if the client goes away early
+            for task in tasks:
+                task.cancel()
+
+    async def _tee_to_disk_async(self, response, output_path: Path, cache_key: str = None):
+        """Yield upstream audio chunks while saving them to output_path."""
+        httpx = self.async_transport._httpx
+        completed = False
+        f = await asyncio.to_thread(open, output_path, 'wb', buffering=0)
+        try:
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                yield chunk
+                await asyncio.to_thread(f.write, chunk)
+            completed = True
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Fish.Audio API request failed: {str(e)}")
+        finally:
+            await response.aclose()
+            await asyncio.to_thread(f.close)
+            if not completed:
+                # Client went away or upstream failed - don't leave a truncated clip
+                await asyncio.to_thread(Path(output_path).unlink, missing_ok=True)
+
+        await asyncio.to_thread(self._finish_output, output_path, cache_key)
+
+    async def _synthesize_long_stream(
+        self,
+        payload: dict,
+        chunks: list,
+        output_path: Path,
+        cache_key: str = None
+    ) -> AsyncSynthesisStream:
+        """Synthesize text chunks concurrently and stream them back in order."""
+        tasks = [
+            asyncio.create_task(self._fetch_audio_async({**payload, "text": chunk}))
+            for chunk in chunks
+        ]
+
+        async def abandon():
+            for task in tasks:
+                task.cancel()
+            await asyncio.to_thread(Path(output_path).unlink, missing_ok=True)
+
+        # The first chunk is short - wait for it so API errors surface before streaming
+        try:
+            await asyncio.shield(tasks[0])
+        except BaseException:
+            await abandon()
+            raise
+
+        return AsyncSynthesisStream(
+            self._stitch_to_disk_async(tasks, output_path, cache_key),
+            self._synthesis_result(output_path),
+            on_abandon=abandon
+        )
+
+    async def _fetch_audio_async(self, payload: dict) -> bytes:
+        """Synthesize one payload and return the whole MP3 in memory."""
+        httpx = self.async_transport._httpx
+        async with self._chunk_slots:
+            try:
+                response = await self.async_transport.post(
+                    f"{self.api_url}/tts",
+                    json=payload,
+                    idempotent=True
+                )
+                response.raise_for_status()
+                return response.content
+            except httpx.HTTPError as e:
+                raise RuntimeError(f"Fish.Audio API request failed: {str(e)}")
+
+    async def _stitch_to_disk_async(self, tasks: list, output_path: Path, cache_key: str = None):
+        """Yield each chunk's audio frames in order while saving them to output_path."""
+        completed = False
+        f = await asyncio.to_thread(open, output_path, 'wb', buffering=0)
+        try:
+            for task in tasks:
+                frames = audio_frames(await task)
+                yield frames
+                await asyncio.to_thread(f.write, frames)
+            completed = True
+        finally:
+            await asyncio.to_thread(f.close)
+            if not completed:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.to_thread(Path(output_path).unlink, missing_ok=True)
+
+        await asyncio.to_thread(self._finish_output, output_path, cache_key)
+
+    @staticmethod
+    async def _aiter_file(path: Path):
+        """Yield a file's contents in stream-sized chunks without blocking the loop."""
+        f = await asyncio.to_thread(open, path, 'rb')
+        try:
+            while True:
+                chunk = await asyncio.to_thread(f.read, STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+    async def get_available_voices(self, page_size: int = None, offset: int = 0, title: str = None):
+        """
+        Get list of voice models from Fish.Audio API.
+
+        Same paging and caching as the sync version; stale listings are
+        refreshed by a background task.
+
+        Returns:
+            Dict with models list (and total/next_offset when paging)
+        """
+        httpx = self.async_transport._httpx
+        try:
+            if page_size is None and not offset and not title:
+                return self._voices_result(await self._cached_voices_page_async({}))
+            return await self._voices_slice_async(page_size, offset, title)
+        except httpx.HTTPError:
+            return self._voices_unavailable()
+
+    async def iter_voices(self, title: str = None):
+        """Async generator over every voice model, one page at a time."""
+        offset = 0
+        while offset is not None:
+            page = await self._voices_slice_async(Config.VOICES_MAX_PAGE_SIZE, offset, title)
+            for model in page["models"]:
+                yield model
+            offset = page["next_offset"]
+
+    async def _voices_slice_async(self, page_size: int, offset: int, title: str = None) -> dict:
+        page_size = self._voices_page_size(page_size)
+        offset = max(offset or 0, 0)
+        first, skip = divmod(offset, page_size)
+        data = await self._cached_voices_page_async(self._voices_params(page_size, first + 1, title))
+        models, whole = self._listing_items(data, page_size, title)
+        if whole:
+            return self._paged_voices_result(models[offset:offset + page_size], len(models), offset, page_size)
+
+        models, total = models[skip:skip + page_size], data.get("total", 0)
+        if skip and offset + len(models) < total:
+            more = await self._cached_voices_page_async(self._voices_params(page_size, first + 2, title))
+            models += more.get("items", [])[:page_size - len(models)]
+        return self._paged_voices_result(models, total, offset, page_size)
+
+    async def _cached_voices_page_async(self, params: dict):
+        key = self._voices_cache_key(params)
+        data, state = self.voices_cache.get(key)
+        if state == TTLCache.STALE and self.voices_cache.begin_refresh(key):
+            task = asyncio.create_task(self._refresh_voices_async(key, params))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        if state != TTLCache.MISSING:
+            return data
+
+        generation = self.voices_cache.generation(key)
+        data = await self._fetch_voices_async(params)
+        self.voices_cache.put(key, data, generation)
+        return data
+
+    async def _fetch_voices_async(self, params: dict):
+        response = await self.async_transport.get(
+            "https://api.fish.audio/model",
+            params=params,
+            read_timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _refresh_voices_async(self, key: tuple, params: dict):
+        httpx = self.async_transport._httpx
+        try:
+            generation = self.voices_cache.generation(key)
+            self.voices_cache.put(key, await self._fetch_voices_async(params), generation)
+        except httpx.HTTPError as e:
+            print(f"Warning: Could not refresh voice models: {e}")
+        finally:
+            self.voices_cache.end_refresh(key)
+
+    async def upload_reference_audio(
+        self,
+        audio_file_path,
+        name: str = None,
+        filename: str = None,
+        owner: str = None
+    ):
+        """
+        Upload reference audio to Fish.Audio and create a voice model.
+
+        Args:
+            audio_file_path: Path to audio file, bytes, or a binary file object
+                (e.g. UploadFile.file) - file objects are streamed by httpx
+            name: Optional name for the voice model
+            filename: Filename to send for bytes / file objects (sets the content type)
+            owner: User the model is for - their earlier upload of the same
+                audio is reused instead of creating a new model (uploads
+                without an owner are never de-duplicated)
+
+        Returns:
+            Dict with model_id (reference_id) and the measured duration_seconds;
+            deduplicated is True when an existing model was reused
+        """
+        if isinstance(audio_file_path, (str, Path)):
+            audio_path = Path(audio_file_path)
+            if not audio_path.exists():
+                raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+            content = await asyncio.to_thread(open, audio_path, 'rb')
+            filename = audio_path.name
+        elif isinstance(audio_file_path, (bytes, bytearray)):
+            content = io.BytesIO(audio_file_path)
+        else:
+            content = audio_file_path
+        filename = filename or "reference.wav"
+
+        try:
+            if not self.references or not owner:
+                # Anonymous uploads can't be matched to anyone's earlier model
+                return await self._create_model_async(content, name, filename)
+
+            # Same audio from the same user (e.g. a mobile retry) reuses its model
+            owner = str(owner)
+            identity = await asyncio.to_thread(self._reference_identity, content)
+            match = await asyncio.to_thread(self.references.find, owner, **identity)
+            if match:
+                return self._existing_model_result(match["model_id"], match["duration_seconds"])
+
+            # Identical uploads still in progress wait for the first one
+            key = f"{owner}:{identity['sha256']}"
+            flight, is_leader = self.reference_flights.join(key)
+            if not is_leader:
+                await flight.wait_started()
+                return self._existing_model_result(
+                    flight.result["model_id"], flight.result["duration_seconds"]
+                )
+            try:
+                result = await self._create_model_async(content, name, filename)
+                await asyncio.to_thread(
+                    self.references.add,
+                    owner,
+                    model_id=result["model_id"],
+                    model_duration=result["duration_seconds"],
+                    **identity
+                )
+                flight.start(result)
+                flight.finish()
+                return result
+            except BaseException as e:
+                flight.fail(e)
+                raise
+            finally:
+                self.reference_flights.land(key, flight)
+        finally:
+            if content is not audio_file_path:
+                content.close()
+
+    async def _create_model_async(self, content, name: str, filename: str) -> dict:
+        """Create a Fish.Audio voice model from an open reference clip."""
+        httpx = self.async_transport._httpx
+        try:
+            # Measure (and if needed trim) the clip before sending it, so bad audio fails fast
+            upload_file, duration, segment = await asyncio.to_thread(self._prepare_reference, content)
+            upload_file, filename, duration, normalization = await asyncio.to_thread(
+                self._normalize_reference, upload_file, filename, duration
+            )
+            # Streamed from the file in worker threads (httpx would read it on the event loop)
+            body = MultipartStream(
+                self._model_form_data(name),
+                {'voices': (filename, upload_file, self._audio_content_type(filename))}
+            )
+
+            # Model creation is not idempotent - only connect failures are retried
+            response = await self.async_transport.post(
+                "https://api.fish.audio/model",
+                content=body.aiter_chunks(),
+                headers={"Content-Type": body.content_type, "Content-Length": str(len(body))},
+                read_timeout=60
+            )
+
+            self._check_model_response(response.status_code, response.text)
+            response.raise_for_status()
+
+            # The new model must show up in the next listing
+            self.voices_cache.invalidate(self._voices_account())
+            return self._model_result(response.json(), duration, segment, normalization)
+
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"Failed to create voice model: {str(e)}")
+
+    def get_transport_stats(self) -> dict:
+        """
+        Get connection pool and retry statistics for Fish.Audio calls.
+
+        Returns:
+            Dict with request counters and pool usage
+        """
+        return self.async_transport.stats()
+
+    async def aclose(self):
+        """Close pooled connections (call on application shutdown)."""
+        self.retention.stop()
+        await self.async_transport.aclose()
@@ -0,0 +1,140 @@
+"""
+Reference audio normalization before upload.
+Voice cloning only needs mono speech at a modest sample rate, so stereo
+44.1/48 kHz uploads are downmixed, resampled, trimmed of leading/trailing
+silence and re-encoded compactly before they are sent to Fish.Audio.
+"""
+import io
+import shutil
+import subprocess
+import wave
+from typing import BinaryIO, Optional
+
+from audio_segment import decode_pcm
+from config import Config
+from multipart_stream import file_size
+
+
+# Frame length for finding leading/trailing silence
+FRAME_SECONDS = 0.02
+# Frames this far below the loudest frame count as silence (dB)
+SILENCE_BELOW_PEAK_DB = 40.0
+# Silence kept at each end so words aren't clipped
+EDGE_PADDING_SECONDS = 0.1
+
+
+def resample(samples, rate: int, target_rate: int):
+    """
+    Band-limited resampling of a whole clip in one FFT.
+
+    Downsampling drops the spectrum above the new Nyquist frequency (so
+    nothing aliases); upsampling zero-pads it.
+    """
+    import numpy as np
+
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    count = int(round(len(samples) * target_rate / rate))
+    spectrum = np.fft.rfft(samples)
+    bins = count // 2 + 1
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.concatenate((spectrum, np.zeros(bins - len(spectrum), dtype=spectrum.dtype)))
+    return (np.fft.irfft(spectrum, count) * (count / len(samples))).astype(np.float32)
+
+
+def trim_silence(samples, rate: int):
+    """
+    Cut leading and trailing silence (relative to the clip's loudest frame).
+
+    Returns:
+        (samples, trimmed_seconds)
+    """
+    import numpy as np
+
+    frame = max(1, int(rate * FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return samples, 0.0
+
+    frames = samples[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    loud = np.flatnonzero(energy_db > energy_db.max() - SILENCE_BELOW_PEAK_DB)
+    pad = int(EDGE_PADDING_SECONDS / FRAME_SECONDS)
+    start = max(int(loud[0]) - pad, 0) * frame
+    end = min((int(loud[-1]) + 1 + pad) * frame, len(samples))
+    return samples[start:end], (len(samples) - (end - start)) / rate
+
+
+def encode(samples, rate: int):
+    """
+    Encode mono samples as MP3 with the local encoder binary, or 16-bit WAV
+    if it isn't installed.
+
+    Returns:
+        (audio bytes, "mp3" or "wav")
+    """
+    import numpy as np
+
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+    encoder = shutil.which(Config.FFMPEG_BINARY)
+    if encoder:
+        result = subprocess.run(
+            [encoder, "-v", "error", "-f", "s16le", "-ac", "1", "-ar", str(rate), "-i", "pipe:0",
+             "-codec:a", "libmp3lame", "-b:a", Config.REFERENCE_MP3_BITRATE, "-f", "mp3", "pipe:1"],
+            input=pcm,
+            capture_output=True,
+            timeout=120
+        )
+        if result.returncode == 0 and result.stdout:
+            return result.stdout, "mp3"
+        print(f"Warning: Could not encode MP3, sending WAV: {result.stderr.decode(errors='replace').strip()}")
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return out.getvalue(), "wav"
+
+
+def normalize_reference(source: BinaryIO, target_rate: int) -> Optional[dict]:
+    """
+    Downmix, resample, trim and re-encode a reference clip.
+
+    source is a seekable file object, decoded from its current position
+    (which is restored) without reading it into memory; only the
+    re-encoded result is held in memory.
+
+    Returns:
+        {"data", "format", "sample_rate", "trimmed_seconds"}, or None if
+        the clip can't be decoded here or re-encoding wouldn't make it smaller
+    """
+    try:
+        samples, rate = decode_pcm(source, ffmpeg_rate=target_rate)
+    except (ImportError, RuntimeError, ValueError, OSError, wave.Error, subprocess.SubprocessError) as e:
+        print(f"Warning: Could not normalize reference audio: {e}")
+        return None
+
+    # decode_pcm already mixed the channels down to mono
+    if rate > target_rate:
+        samples, rate = resample(samples, rate, target_rate), target_rate
+    samples, trimmed = trim_silence(samples, rate)
+
+    try:
+        encoded, audio_format = encode(samples, rate)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Warning: Could not re-encode reference audio: {e}")
+        return None
+    if len(encoded) >= file_size(source):
+        return None
+
+    return {
+        "data": encoded,
+        "format": audio_format,
+        "sample_rate": rate,
+        "trimmed_seconds": round(trimmed, 2)
+    }
@@ -0,0 +1,95 @@
+"""
+Audio duration probe for reference uploads.
+Reads WAV headers and MP3 frame headers only - no decoding and no
+dependencies - so over-long clips can be rejected before they are uploaded.
+"""
+import os
+import struct
+from typing import BinaryIO, Optional
+
+from mp3_frames import find_sync, id3v2_size, parse_frame_header, vbr_header
+
+
+# How much of an MP3 to read when looking for the first frame (and its Xing/VBRI header)
+_MP3_HEAD_BYTES = 64 * 1024
+
+
+def probe_duration(fileobj: BinaryIO) -> Optional[float]:
+    """
+    Duration in seconds of a WAV or MP3 file object.
+
+    The file is read from its current position, which is restored
+    afterwards.
+
+    Returns:
+        Duration in seconds, or None if the format isn't recognized
+    """
+    start = fileobj.tell()
+    try:
+        head = fileobj.read(12)
+        fileobj.seek(start)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _wav_duration(fileobj, start)
+        if head[:3] == b"ID3" or parse_frame_header(head):
+            return _mp3_duration(fileobj, start)
+        return None
+    finally:
+        fileobj.seek(start)
+
+
+def _wav_duration(f: BinaryIO, start: int) -> Optional[float]:
+    """data chunk size / byte rate, walking the RIFF chunk list."""
+    end = f.seek(0, os.SEEK_END)
+    f.seek(start + 12)
+    byte_rate = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+            if len(fmt) < 12:
+                return None
+            byte_rate = struct.unpack("<I", fmt[8:12])[0]
+            if chunk_size & 1:
+                f.seek(1, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed WAVs may leave the size at 0 / 0xFFFFFFFF - use what's on disk
+            data_size = min(chunk_size, end - f.tell()) if chunk_size else end - f.tell()
+            return data_size / byte_rate
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def _mp3_duration(f: BinaryIO, start: int) -> Optional[float]:
+    """Frame count from a Xing/VBRI header, or by walking every frame header."""
+    tag_size = id3v2_size(f.read(10))
+    f.seek(start + tag_size)
+    head = f.read(_MP3_HEAD_BYTES)
+    offset = find_sync(head)
+    if offset < 0:
+        return None
+    first = parse_frame_header(head, offset)
+
+    position = start + tag_size + offset
+    vbr = vbr_header(head, offset, first)
+    if vbr:
+        _, frames = vbr
+        if frames:
+            return frames * first.samples / first.sample_rate
+        # Header without a frame count - skip it and count the audio frames
+        position += first.frame_length
+
+    # No usable header: sum the samples of every frame, reading 4 bytes per frame
+    samples = 0
+    while True:
+        f.seek(position)
+        header = parse_frame_header(f.read(4))
+        if header is None or header.frame_length <= 4:
+            break  # End of audio (or a trailing ID3v1/APE tag)
+        samples += header.samples
+        position += header.frame_length
+    return samples / first.sample_rate
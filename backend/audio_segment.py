@@ -0,0 +1,314 @@
+"""
+Best-segment extraction for long reference audio.
+Finds the stretch of a clip with the most speech and cuts it out, so only a
+short, dense window is uploaded for voice cloning.
+"""
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import wave
+from typing import BinaryIO, Optional, Tuple
+
+from config import Config
+from mp3_frames import find_sync, id3v2_size, parse_frame_header, vbr_header
+
+
+# Analysis frame length for the energy/VAD pass
+FRAME_SECONDS = 0.02
+# Sample rate ffmpeg decodes compressed audio to for analysis
+ANALYSIS_RATE = 16000
+# Speech must be this far above the noise floor (dB)
+VAD_MARGIN_DB = 10.0
+# Silence kept around the speech at each end of the window
+EDGE_PADDING_SECONDS = 0.25
+# WAV frames decoded per read, and bytes per write into ffmpeg's stdin
+WAV_BLOCK_FRAMES = 64 * 1024
+PIPE_CHUNK_SIZE = 64 * 1024
+# How much of an MP3 to read when looking for its first frame
+MP3_HEAD_BYTES = 64 * 1024
+# ffmpeg is killed if decoding takes longer than this
+FFMPEG_TIMEOUT_SECONDS = 120
+
+
+def decode_pcm(source, ffmpeg_rate: int = ANALYSIS_RATE, max_seconds: float = None):
+    """
+    Decode audio to mono float samples for analysis.
+
+    WAV is read with the standard library (at its own sample rate); anything
+    else is decoded by the ffmpeg binary (FFMPEG_BINARY) at ffmpeg_rate.
+    File objects are never loaded whole: WAV frames are read block by block
+    and compressed audio is piped to ffmpeg (or ffmpeg opens the file's path).
+
+    Args:
+        source: bytes, or a seekable binary file object read from its
+            current position (which is restored)
+        max_seconds: Only decode the start of the clip
+
+    Returns:
+        (samples, sample_rate) - samples is a float32 NumPy array in [-1, 1]
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    position = source.tell()
+    try:
+        head = source.read(12)
+        source.seek(position)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _decode_wav(source, max_seconds)
+        return _decode_ffmpeg(source, ffmpeg_rate, max_seconds)
+    finally:
+        source.seek(position)
+
+
+def _decode_wav(f: BinaryIO, max_seconds: float = None):
+    import numpy as np
+
+    # Explicit mode - wave would reject a file object whose .mode is e.g. "rb+"
+    with wave.open(f, "rb") as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        if width not in (1, 2, 4):
+            raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+        total = w.getnframes()
+        if max_seconds is not None:
+            total = min(total, int(max_seconds * rate))
+        samples = np.empty(total, dtype=np.float32)
+        done = 0
+        while done < total:
+            raw = w.readframes(min(WAV_BLOCK_FRAMES, total - done))
+            if not raw:
+                break
+            if width == 1:
+                block = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+            else:
+                dtype = np.int16 if width == 2 else np.int32
+                block = np.frombuffer(raw, dtype=dtype).astype(np.float32) / np.iinfo(dtype).max
+            # Interleaved channels -> mono
+            block = block[:len(block) // channels * channels].reshape(-1, channels).mean(axis=1)
+            samples[done:done + len(block)] = block
+            done += len(block)
+    return samples[:done], rate
+
+
+def _decode_ffmpeg(f: BinaryIO, rate: int, max_seconds: float = None):
+    import numpy as np
+
+    ffmpeg = shutil.which(Config.FFMPEG_BINARY)
+    if not ffmpeg:
+        raise RuntimeError(f"{Config.FFMPEG_BINARY} not found - needed to decode compressed audio")
+
+    # A file on disk read from its start can be opened by ffmpeg itself
+    path = getattr(f, "name", None)
+    on_disk = isinstance(path, str) and f.tell() == 0 and os.path.isfile(path)
+    args = [ffmpeg, "-v", "error", "-i", path if on_disk else "pipe:0"]
+    if max_seconds is not None:
+        args += ["-t", str(max_seconds)]
+    args += ["-f", "s16le", "-ac", "1", "-ar", str(rate), "pipe:1"]
+
+    returncode, stdout, stderr = _run_piped(args, None if on_disk else f)
+    if returncode != 0:
+        raise RuntimeError(f"Could not decode audio: {stderr.decode(errors='replace').strip()}")
+    samples = np.frombuffer(stdout, dtype=np.int16).astype(np.float32) / 32767
+    return samples, rate
+
+
+def _run_piped(args: list, source: Optional[BinaryIO]):
+    """
+    Run a command, copying source to its stdin chunk by chunk.
+
+    Returns:
+        (returncode, stdout, stderr)
+    """
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            args,
+            stdin=subprocess.PIPE if source is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=stderr
+        )
+
+        def feed():
+            try:
+                for block in iter(lambda: source.read(PIPE_CHUNK_SIZE), b""):
+                    process.stdin.write(block)
+            except (BrokenPipeError, ValueError):
+                pass  # ffmpeg stopped reading (e.g. -t reached) or was killed
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        feeder = None
+        if source is not None:
+            feeder = threading.Thread(target=feed, name="ffmpeg-stdin", daemon=True)
+            feeder.start()
+        timer = threading.Timer(FFMPEG_TIMEOUT_SECONDS, process.kill)
+        timer.start()
+        try:
+            stdout = process.stdout.read()
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            process.stdout.close()
+            if feeder is not None:
+                feeder.join()
+        stderr.seek(0)
+        return returncode, stdout, stderr.read()
+
+
+def find_speech_window(samples, sample_rate: int, min_seconds: float, max_seconds: float) -> Tuple[float, float]:
+    """
+    Find the max_seconds window containing the most speech.
+
+    Speech is detected per 20 ms frame by energy above an adaptive noise
+    floor; a cumulative sum then scores every window position at once.
+    Silence at the window edges is trimmed as long as at least min_seconds
+    remain.
+
+    Returns:
+        (start_seconds, end_seconds)
+    """
+    import numpy as np
+
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return 0.0, len(samples) / sample_rate
+
+    frames = samples[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    noise_floor = np.percentile(energy_db, 10)
+    speech = energy_db > noise_floor + VAD_MARGIN_DB
+
+    window = min(count, int(max_seconds / FRAME_SECONDS))
+    totals = np.concatenate(([0], np.cumsum(speech)))
+    start = int(np.argmax(totals[window:] - totals[:-window]))
+    end = start + window
+
+    # Tighten to the speech inside the window (with a little padding)
+    voiced = np.flatnonzero(speech[start:end])
+    if voiced.size:
+        pad = int(EDGE_PADDING_SECONDS / FRAME_SECONDS)
+        tight_start = start + max(int(voiced[0]) - pad, 0)
+        tight_end = min(start + int(voiced[-1]) + 1 + pad, end)
+        if (tight_end - tight_start) * FRAME_SECONDS >= min_seconds:
+            start, end = tight_start, tight_end
+
+    return start * FRAME_SECONDS, end * FRAME_SECONDS
+
+
+def cut_segment(source, start: float, end: float) -> bytes:
+    """
+    Cut [start, end) seconds out of a WAV or MP3 clip without re-encoding.
+
+    WAV is sliced by sample frames; MP3 is cut at frame boundaries. Only
+    the window is read: the file is seeked to it (MP3 frames before it are
+    skipped by reading their 4-byte headers).
+
+    Args:
+        source: bytes, or a seekable binary file object read from its
+            current position (which is restored)
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    position = source.tell()
+    try:
+        head = source.read(12)
+        source.seek(position)
+        if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+            return _cut_wav(source, start, end)
+        return _cut_mp3(source, start, end)
+    finally:
+        source.seek(position)
+
+
+def _cut_wav(f: BinaryIO, start: float, end: float) -> bytes:
+    with wave.open(f, "rb") as w:
+        params = w.getparams()
+        first = int(start * params.framerate)
+        w.setpos(min(first, params.nframes))
+        frames = w.readframes(int(end * params.framerate) - first)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setparams(params)
+        w.writeframes(frames)
+    return out.getvalue()
+
+
+def _cut_mp3(f: BinaryIO, start: float, end: float) -> bytes:
+    offset = _mp3_first_frame(f)
+    if offset is None:
+        return b""
+
+    parts = []
+    elapsed = 0.0
+    first = True
+    while elapsed < end:
+        f.seek(offset)
+        header = parse_frame_header(f.read(4))
+        if header is None or header.frame_length <= 4:
+            break  # End of audio (or a trailing ID3v1/APE tag)
+        if first or elapsed >= start:
+            f.seek(offset)
+            frame = f.read(header.frame_length)
+            if len(frame) < header.frame_length:
+                break  # Truncated final frame
+            if first and vbr_header(frame, 0, header):
+                # Xing/Info header would describe the whole clip
+                first = False
+                offset += header.frame_length
+                continue
+            if elapsed >= start:
+                parts.append(frame)
+        first = False
+        elapsed += header.samples / header.sample_rate
+        offset += header.frame_length
+    return b"".join(parts)
+
+
+def _mp3_first_frame(f: BinaryIO) -> Optional[int]:
+    """File offset of the first MP3 frame (after any ID3v2 tag), or None."""
+    base = f.tell()
+    tag_size = id3v2_size(f.read(10))
+    f.seek(base + tag_size)
+    offset = find_sync(f.read(MP3_HEAD_BYTES))
+    return None if offset < 0 else base + tag_size + offset
+
+
+def extract_best_segment(
+    source: BinaryIO,
+    min_seconds: float,
+    max_seconds: float
+) -> Optional[Tuple[bytes, float, float]]:
+    """
+    Cut the densest min_seconds-max_seconds of speech out of a clip.
+
+    The clip is decoded from the file object for analysis and only the
+    chosen window is read back out of it; its position is restored.
+
+    Returns:
+        (segment_bytes, start_seconds, end_seconds), or None if the clip
+        isn't WAV/MP3 or can't be decoded here
+    """
+    position = source.tell()
+    head = source.read(12)
+    source.seek(position)
+    is_wav = head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+    if not is_wav:
+        first_frame = _mp3_first_frame(source)
+        source.seek(position)
+        if first_frame is None:
+            return None
+    try:
+        samples, sample_rate = decode_pcm(source)
+    except (ImportError, RuntimeError, ValueError, OSError, wave.Error, subprocess.SubprocessError) as e:
+        print(f"Warning: Could not analyze reference audio: {e}")
+        return None
+
+    start, end = find_speech_window(samples, sample_rate, min_seconds, max_seconds)
+    # The decoded samples can go before the segment is read
+    del samples
+    return cut_segment(source, start, end), start, end
@@ -0,0 +1,159 @@
+"""
+Benchmark MongoDB Query Latency vs. Collection Size
+Seeds a scratch database with growing numbers of documents and times the
+DatabaseManager hot queries with and without the indexes from database.py.
+
+With indexes the latency should stay flat as the collections grow (each
+query examines only the documents it returns); without them every query
+is a collection scan and gets slower in proportion to the data.
+
+Usage:
+    python benchmark_mongodb_indexes.py                      # 10k, 100k, 1M messages
+    python benchmark_mongodb_indexes.py --sizes 10000 100000 --uri mongodb://localhost:27017
+
+The scratch database (echo_index_benchmark by default) is dropped at the end.
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import time
+from pathlib import Path
+
+from bson.objectid import ObjectId
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+from database import INDEXES, MESSAGE_FIELDS, ensure_indexes, message_page_query
+
+# Load environment variables
+env_path = Path(__file__).parent / '.env'
+load_dotenv(dotenv_path=env_path)
+
+INSERT_BATCH = 10000
+MESSAGES_PER_ECHO = 100
+PAGE_SIZE = 20
+
+
+def seed(db, start: int, end: int):
+    """Grow every collection so messages holds `end` documents."""
+    base = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    echo_ids = []
+    for first in range(start, end, INSERT_BATCH):
+        last = min(first + INSERT_BATCH, end)
+        users, echos, models, messages = [], [], [], []
+        for i in range(first, last):
+            if i % MESSAGES_PER_ECHO == 0:
+                user_id, echo_id = ObjectId(), ObjectId()
+                echo_ids.append(echo_id)
+                users.append({"_id": user_id, "auth0_user_id": f"auth0|{i}", "email": f"user{i}@example.com",
+                              "created_at": base})
+                echos.append({"_id": echo_id, "user_id": user_id, "name": f"Echo {i}",
+                              "persona_prompt": "", "voice_model_id": f"model-{i}", "created_at": base})
+                models.append({"user_id": user_id, "model_id": f"model-{i}", "name": "Voice",
+                               "audio_file_path": "clip.mp3", "file_type": "audio", "echo_id": echo_id,
+                               "created_at": base})
+            # Pairs share a timestamp, so pages depend on the _id tie-break like real bursts do
+            messages.append({"echo_id": echo_ids[-1] if echo_ids else None, "role": random.choice(["user", "assistant"]),
+                             "content": "x" * 200, "created_at": base + datetime.timedelta(seconds=i // 2)})
+        if users:
+            db.users.insert_many(users, ordered=False)
+            db.echos.insert_many(echos, ordered=False)
+            db.voice_models.insert_many(models, ordered=False)
+        db.messages.insert_many(messages, ordered=False)
+
+
+def hot_queries(db, n: int):
+    """The DatabaseManager queries, aimed at a random existing document."""
+    i = random.randrange(0, n, MESSAGES_PER_ECHO)
+    user = db.users.find_one({"auth0_user_id": f"auth0|{i}"})
+    echo = db.echos.find_one({"user_id": user["_id"]})
+    # Cursor from the middle of the conversation, as when scrolling back
+    middle = db.messages.find_one({"echo_id": echo["_id"]}, sort=[("created_at", 1), ("_id", 1)],
+                                  skip=MESSAGES_PER_ECHO // 2)
+    bound = (middle["created_at"], middle["_id"])
+
+    def page(bound=None, newest_first=True):
+        # Same filter, sort and projection as DatabaseManager.get_message_page
+        query, sort = message_page_query(echo["_id"], bound, newest_first)
+        return list(db.messages.find(query, MESSAGE_FIELDS).sort(sort).limit(PAGE_SIZE + 1))
+
+    return {
+        "users.auth0_user_id": lambda: db.users.find_one({"auth0_user_id": f"auth0|{i}"}),
+        "echos.user_id": lambda: db.echos.find_one({"user_id": user["_id"]}),
+        "messages.latest_page": lambda: page(),
+        "messages.page_before": lambda: page(bound),
+        "messages.page_after": lambda: page(bound, newest_first=False),
+        "voice_models.model_id": lambda: db.voice_models.find_one({"model_id": f"model-{i}"}),
+        "voice_models.user_id+created_at": lambda: list(
+            db.voice_models.find({"user_id": user["_id"]}).sort("created_at", -1)
+        ),
+        "voice_models.echo_id": lambda: db.voice_models.find_one({"echo_id": echo["_id"]}),
+    }
+
+
+def time_queries(db, n: int, repeats: int) -> dict:
+    """Median latency in ms per query (a fresh random target each repeat)."""
+    samples = {}
+    for _ in range(repeats):
+        for name, query in hot_queries(db, n).items():
+            started = time.perf_counter()
+            query()
+            samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def drop_indexes(db):
+    for collection in INDEXES:
+        db[collection].drop_indexes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="echo_index_benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Message counts to measure at")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--skip-unindexed", action="store_true",
+                        help="Only time the indexed queries (scans get slow at millions)")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=5000)
+    client.drop_database(args.database)
+    db = client[args.database]
+
+    print(f"📊 Benchmarking hot queries in {args.database} (median ms over {args.repeats} runs)\n")
+    results = []
+    seeded = 0
+    try:
+        for size in sorted(args.sizes):
+            print(f"🔄 Seeding up to {size:,} messages...")
+            seed(db, seeded, size)
+            seeded = size
+
+            row = {"size": size}
+            if not args.skip_unindexed:
+                drop_indexes(db)
+                row["unindexed"] = time_queries(db, size, args.repeats)
+            ensure_indexes(db)
+            row["indexed"] = time_queries(db, size, args.repeats)
+            results.append(row)
+    finally:
+        client.drop_database(args.database)
+        client.close()
+
+    names = list(results[0]["indexed"])
+    header = f"{'query':<34}" + "".join(f"{row['size']:>14,}" for row in results)
+    for mode in ("indexed", "unindexed"):
+        if mode not in results[0]:
+            continue
+        print(f"\n{mode.upper()}")
+        print(header)
+        for name in names:
+            print(f"{name:<34}" + "".join(f"{row[mode][name]:>12.2f}ms" for row in results))
+
+
+if __name__ == "__main__":
+    main()
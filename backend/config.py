@@ -16,9 +16,100 @@ class Config:
     FISH_AUDIO_API_KEY = os.getenv("FISH_AUDIO_API_KEY")
     FISH_AUDIO_API_URL = os.getenv("FISH_AUDIO_API_URL", "https://api.fish.audio/v1")
     
+    # Fish.Audio HTTP transport (connection pool, timeouts in seconds, retries)
+    FISH_AUDIO_POOL_SIZE = int(os.getenv("FISH_AUDIO_POOL_SIZE", 10))
+    FISH_AUDIO_ASYNC_POOL_SIZE = int(os.getenv("FISH_AUDIO_ASYNC_POOL_SIZE", 100))  # FastAPI app
+    FISH_AUDIO_CONNECT_TIMEOUT = float(os.getenv("FISH_AUDIO_CONNECT_TIMEOUT", 5))
+    FISH_AUDIO_READ_TIMEOUT = float(os.getenv("FISH_AUDIO_READ_TIMEOUT", 60))
+    FISH_AUDIO_MAX_RETRIES = int(os.getenv("FISH_AUDIO_MAX_RETRIES", 3))
+    FISH_AUDIO_BACKOFF_BASE = float(os.getenv("FISH_AUDIO_BACKOFF_BASE", 0.5))
+    
     # API Server Configuration
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
     API_PORT = int(os.getenv("API_PORT", 5000))
+    # Let a front-end server (Apache mod_xsendfile, lighttpd) send /outputs files
+    USE_X_SENDFILE = os.getenv("USE_X_SENDFILE", "false").lower() == "true"
+    
+    # TTS Result Cache Configuration
+    TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+    TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+    
+    # Long-text synthesis (texts longer than the threshold are chunked and synthesized in parallel)
+    TTS_LONG_TEXT_THRESHOLD = int(os.getenv("TTS_LONG_TEXT_THRESHOLD", 500))
+    TTS_FIRST_CHUNK_CHARS = int(os.getenv("TTS_FIRST_CHUNK_CHARS", 120))
+    TTS_MAX_CHUNK_CHARS = int(os.getenv("TTS_MAX_CHUNK_CHARS", 400))
+    TTS_LONG_TEXT_WORKERS = int(os.getenv("TTS_LONG_TEXT_WORKERS", 4))
+    
+    # Batch synthesis (/api/synthesize/batch)
+    TTS_BATCH_CONCURRENCY = int(os.getenv("TTS_BATCH_CONCURRENCY", 4))
+    TTS_BATCH_MAX_ITEMS = int(os.getenv("TTS_BATCH_MAX_ITEMS", 500))
+    
+    # Reference audio length accepted for voice cloning (seconds; Fish.Audio's limit is 270)
+    REFERENCE_MIN_SECONDS = float(os.getenv("REFERENCE_MIN_SECONDS", 1))
+    REFERENCE_MAX_SECONDS = float(os.getenv("REFERENCE_MAX_SECONDS", 270))
+    # Longer clips are cut down to their densest window of speech (0 disables)
+    REFERENCE_TRIM_SECONDS = float(os.getenv("REFERENCE_TRIM_SECONDS", 30))
+    REFERENCE_WINDOW_MIN_SECONDS = float(os.getenv("REFERENCE_WINDOW_MIN_SECONDS", 10))
+    # Used to decode compressed audio for analysis (and to encode normalized MP3)
+    FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+    # Reference clips are sent as mono at this sample rate, silence trimmed
+    REFERENCE_NORMALIZE_ENABLED = os.getenv("REFERENCE_NORMALIZE_ENABLED", "true").lower() == "true"
+    REFERENCE_SAMPLE_RATE = int(os.getenv("REFERENCE_SAMPLE_RATE", 24000))
+    REFERENCE_MP3_BITRATE = os.getenv("REFERENCE_MP3_BITRATE", "64k")
+    
+    # Re-uploads of the same reference audio reuse the existing model (SQLite index)
+    REFERENCE_DEDUP_ENABLED = os.getenv("REFERENCE_DEDUP_ENABLED", "true").lower() == "true"
+    REFERENCE_INDEX_DB = os.getenv("REFERENCE_INDEX_DB", "references.db")
+    
+    # Uploads up to this size stay in memory; larger ones spill to an anonymous temp file
+    UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", 2 * 1024 * 1024))
+    
+    # Resumable uploads (/api/uploads): chunks are assembled below the backend directory
+    UPLOAD_SESSIONS_DIR = os.getenv("UPLOAD_SESSIONS_DIR", "uploads")
+    UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))
+    UPLOAD_SESSION_SWEEP_INTERVAL = float(os.getenv("UPLOAD_SESSION_SWEEP_INTERVAL", 600))
+    UPLOAD_SESSION_MAX_BYTES = int(os.getenv("UPLOAD_SESSION_MAX_BYTES", 200 * 1024 * 1024))
+    UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("UPLOAD_CHUNK_MAX_BYTES", 8 * 1024 * 1024))
+    
+    # Voice model listing cache (seconds; stale listings are served while refreshing)
+    VOICES_CACHE_TTL = float(os.getenv("VOICES_CACHE_TTL", 60))
+    VOICES_CACHE_STALE_TTL = float(os.getenv("VOICES_CACHE_STALE_TTL", 600))
+    # Most listings (account/page/title combinations) kept in memory
+    VOICES_CACHE_MAX_ENTRIES = int(os.getenv("VOICES_CACHE_MAX_ENTRIES", 1000))
+    VOICES_PAGE_SIZE = int(os.getenv("VOICES_PAGE_SIZE", 50))
+    VOICES_MAX_PAGE_SIZE = int(os.getenv("VOICES_MAX_PAGE_SIZE", 100))
+    
+    # Output retention (generated clips outside the TTS cache; 0 disables a limit)
+    OUTPUT_MAX_AGE_HOURS = float(os.getenv("OUTPUT_MAX_AGE_HOURS", 24 * 7))
+    OUTPUT_MAX_BYTES = int(os.getenv("OUTPUT_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+    OUTPUT_SWEEP_INTERVAL = float(os.getenv("OUTPUT_SWEEP_INTERVAL", 300))
+    
+    # Background job queue (SQLite file, relative paths are inside the backend directory)
+    JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", "jobs.db")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+    # Running jobs are leased (and the lease renewed); a crashed worker's jobs rerun once it expires
+    JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 300))
+    # Finished jobs are deleted after this many hours (0 keeps them)
+    JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 24))
+    # Comma-separated hosts callback_url may use; empty allows any public address
+    JOB_CALLBACK_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+    # Workers creating voice models for async reference uploads
+    VOICE_MODEL_WORKERS = int(os.getenv("VOICE_MODEL_WORKERS", 2))
+    
+    # Write-behind for conversation messages (batched insert_many; flushed on shutdown)
+    MESSAGE_WRITE_BEHIND = os.getenv("MESSAGE_WRITE_BEHIND", "false").lower() == "true"
+    MESSAGE_BATCH_SIZE = int(os.getenv("MESSAGE_BATCH_SIZE", 100))
+    MESSAGE_FLUSH_INTERVAL = float(os.getenv("MESSAGE_FLUSH_INTERVAL", 0.5))
+    # Transient failures are retried this many times; rejected messages are logged and dropped
+    MESSAGE_WRITE_MAX_ATTEMPTS = int(os.getenv("MESSAGE_WRITE_MAX_ATTEMPTS", 10))
+    
+    # Recent-history cache per Echo (ring buffer of N messages, LRU within a memory budget).
+    # Off by default: with invalidation "none" it is only coherent in a single process -
+    # with several workers/replicas set HISTORY_CACHE_INVALIDATION=change_stream (needs a replica set).
+    HISTORY_CACHE_ENABLED = os.getenv("HISTORY_CACHE_ENABLED", "false").lower() == "true"
+    HISTORY_CACHE_MESSAGES = int(os.getenv("HISTORY_CACHE_MESSAGES", 50))
+    HISTORY_CACHE_MAX_BYTES = int(os.getenv("HISTORY_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+    HISTORY_CACHE_INVALIDATION = os.getenv("HISTORY_CACHE_INVALIDATION", "none").lower()
     
     @classmethod
     def validate(cls):
@@ -1,4 +1,6 @@
 import os
+import atexit
+import base64
 import datetime
 # MongoDB disabled - not needed for voice routing
 # import certifi
@@ -7,10 +9,172 @@ import datetime
 from typing import Optional, Any
 from dotenv import load_dotenv
 from config import Config
+from history_cache import ChangeStreamInvalidator, HistoryCache
+from write_behind import MessageWriteBuffer, sort_key
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Indexes behind every hot query: collection -> [(keys, options)].
+# Each one is named so drift (a missing or changed index) can be reported.
+INDEXES = {
+    "users": [
+        # get_or_create_user
+        ([("auth0_user_id", 1)], {"name": "auth0_user_id_unique", "unique": True}),
+    ],
+    "echos": [
+        # get_echo_for_user
+        ([("user_id", 1)], {"name": "user_id"}),
+    ],
+    "messages": [
+        # get_message_history / get_message_page: equality on echo_id, then the
+        # (created_at, _id) keyset cursor in either direction
+        ([("echo_id", 1), ("created_at", -1), ("_id", -1)], {"name": "echo_id_created_at_id"}),
+    ],
+    "voice_models": [
+        # get_voice_model_by_id, link_voice_model_to_echo, delete_voice_model
+        ([("model_id", 1)], {"name": "model_id_unique", "unique": True}),
+        # get_voice_models_for_user
+        ([("user_id", 1), ("created_at", -1)], {"name": "user_id_created_at"}),
+        # get_voice_model_for_echo
+        ([("echo_id", 1)], {"name": "echo_id"}),
+    ],
+}
+
+# Projections for the read paths: only the fields the APIs return
+ECHO_FIELDS = {"user_id": 1, "name": 1, "persona_prompt": 1, "voice_model_id": 1, "created_at": 1}
+MESSAGE_FIELDS = {"echo_id": 1, "role": 1, "content": 1, "created_at": 1}
+VOICE_MODEL_FIELDS = {
+    "user_id": 1, "model_id": 1, "name": 1, "audio_file_path": 1, "file_type": 1,
+    "echo_id": 1, "duration_seconds": 1, "created_at": 1
+}
+
+
+def _now_ms() -> datetime.datetime:
+    """Current UTC time at MongoDB's (millisecond) precision, so documents
+    returned without a read-back match what was stored."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def encode_cursor(message: dict) -> str:
+    """Opaque page cursor for a message: its created_at (ms) and _id."""
+    created_at = message["created_at"]
+    if created_at.tzinfo is None:
+        # pymongo returns naive UTC datetimes
+        created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+    millis = int(created_at.timestamp() * 1000)
+    raw = f"{millis}:{message['_id']}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Inverse of encode_cursor().
+    
+    Returns:
+        (created_at, _id)
+        
+    Raises:
+        ValueError: Malformed cursor
+    """
+    from bson.objectid import ObjectId
+    
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        millis, object_id = raw.split(":")
+        created_at = datetime.datetime.fromtimestamp(int(millis) / 1000, datetime.timezone.utc)
+        return created_at, ObjectId(object_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def message_page_query(echo_id: Any, bound: tuple = None, newest_first: bool = True):
+    """
+    Filter and sort for one page of a conversation.
+    
+    The sort is (created_at, _id) so messages with the same timestamp still
+    have a stable order, and the cursor bound is the matching keyset $or.
+    Both run as a range scan of the echo_id_created_at_id index.
+    
+    Args:
+        bound: Decoded cursor (created_at, _id) - only messages past it match
+        newest_first: Page back in time (True) or forward (False)
+        
+    Returns:
+        (query, sort) for collection.find(query).sort(sort)
+    """
+    query = {"echo_id": echo_id}
+    if bound is not None:
+        created_at, object_id = bound
+        op = "$lt" if newest_first else "$gt"
+        query["$or"] = [
+            {"created_at": {op: created_at}},
+            {"created_at": created_at, "_id": {op: object_id}}
+        ]
+    direction = -1 if newest_first else 1
+    return query, [("created_at", direction), ("_id", direction)]
+
+
+def ensure_indexes(db, create: bool = True) -> dict:
+    """
+    Create (or just verify) the indexes in INDEXES. Safe to run on every start.
+    
+    Existing indexes are matched by key pattern, so one created by hand
+    under another name still counts. Indexes whose options changed are
+    reported, never dropped - rebuilding one on a large collection is a
+    deliberate operation.
+    
+    Args:
+        db: pymongo Database
+        create: False to only report what's missing
+        
+    Returns:
+        {"drift": bool, "collections": {name: {"ok", "created", "missing",
+        "changed", "unexpected", "failed"}}}
+    """
+    report = {"drift": False, "collections": {}}
+    for collection_name, specs in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        by_key = {tuple(tuple(k) for k in info["key"]): name for name, info in existing.items()}
+        status = {"ok": [], "created": [], "missing": [], "changed": [], "unexpected": [], "failed": []}
+        expected = {"_id_"}
+        
+        for keys, options in specs:
+            name = options["name"]
+            found = by_key.get(tuple(keys))
+            if found is None and name in existing:
+                # Same name, different keys
+                status["changed"].append(name)
+                expected.add(name)
+                continue
+            if found is not None:
+                expected.add(found)
+                if bool(existing[found].get("unique")) != bool(options.get("unique")):
+                    status["changed"].append(found)
+                else:
+                    status["ok"].append(found)
+                continue
+            
+            if not create:
+                status["missing"].append(name)
+                continue
+            try:
+                collection.create_index(keys, **options)
+                status["created"].append(name)
+                expected.add(name)
+            except Exception as e:
+                # e.g. duplicate values blocking a unique index
+                status["failed"].append({"name": name, "error": str(e)})
+        
+        status["unexpected"] = sorted(set(existing) - expected)
+        if status["missing"] or status["changed"] or status["failed"] or status["unexpected"]:
+            report["drift"] = True
+        report["collections"][collection_name] = status
+    return report
+
+
 class DatabaseManager:
     def __init__(self):
         """
@@ -23,29 +187,77 @@ class DatabaseManager:
         self.echos = None
         self.messages = None
         self.voice_models = None
-    
-    def get_or_create_user(self, auth0_user_id: str, email: str) -> Any:
-        self.messages = self.db.messages
+        self.index_report = self.ensure_indexes()
+        
+        # Optional write-behind for conversation messages (batched insert_many)
+        self.message_buffer = None
+        if Config.MESSAGE_WRITE_BEHIND and self.messages is not None:
+            self.message_buffer = MessageWriteBuffer(
+                self.messages,
+                max_batch=Config.MESSAGE_BATCH_SIZE,
+                flush_interval=Config.MESSAGE_FLUSH_INTERVAL,
+                max_attempts=Config.MESSAGE_WRITE_MAX_ATTEMPTS,
+                on_dead_letter=self._message_dropped
+            )
+            self.message_buffer.start()
+            # Queued messages must not be lost when the process exits
+            atexit.register(self.close)
         
-        print("DatabaseManager initialized. Connection successful.")
+        # Recent messages per Echo, so chat turns don't re-read what they just wrote
+        self.history_cache = None
+        self.history_invalidator = None
+        if Config.HISTORY_CACHE_ENABLED and self.messages is not None:
+            self.history_cache = HistoryCache(Config.HISTORY_CACHE_MESSAGES, Config.HISTORY_CACHE_MAX_BYTES)
+            if Config.HISTORY_CACHE_INVALIDATION == "change_stream":
+                # Several workers/replicas: drop Echoes that other processes write to
+                self.history_invalidator = ChangeStreamInvalidator(self.messages, self.history_cache)
+                self.history_invalidator.start()
+            else:
+                print(
+                    "⚠️  HISTORY_CACHE_ENABLED without HISTORY_CACHE_INVALIDATION=change_stream: "
+                    "conversation history is only coherent if this is the ONLY process serving "
+                    "the API (one worker, one replica). Other workers' messages will be missed."
+                )
+    
+    def _message_dropped(self, message: dict, reason: str):
+        """A buffered message could not be written - stop serving it from the cache."""
+        if self.history_cache is not None:
+            self.history_cache.invalidate(message.get("echo_id"))
+    
+    def close(self):
+        """Write any buffered messages and close the connection (call on shutdown)."""
+        if self.history_invalidator is not None:
+            self.history_invalidator.stop()
+        if self.message_buffer is not None:
+            self.message_buffer.close()
+        if self.client is not None:
+            self.client.close()
+            self.client = None
     
     def get_or_create_user(self, auth0_id: str, email: str) -> dict:
         """
         Finds a user by their Auth0 ID. If they don't exist, creates them.
         Returns the user document.
+        
+        One atomic upsert, so concurrent first logins can't create the user twice.
         """
-        user = self.users.find_one({"auth0_user_id": auth0_id})
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
         
-        if user:
-            return user
-        else:
-            new_user = {
-                "auth0_user_id": auth0_id,
-                "email": email,
-                "created_at": datetime.datetime.now(datetime.timezone.utc)
-            }
-            self.users.insert_one(new_user)
-            return new_user
+        query = {"auth0_user_id": auth0_id}
+        update = {"$setOnInsert": {
+            "auth0_user_id": auth0_id,
+            "email": email,
+            "created_at": datetime.datetime.now(datetime.timezone.utc)
+        }}
+        try:
+            return self.users.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lost the insert race to another request (servers before 4.2
+            # don't retry it themselves) - the user exists now
+            return self.users.find_one(query)
         
     def create_echo(self, user_id: Any, name: str, persona_prompt: str, voice_model_id: str) -> dict:
         """
@@ -56,15 +268,16 @@ class DatabaseManager:
             "name": name,
             "persona_prompt": persona_prompt,
             "voice_model_id": voice_model_id,
-            "created_at": datetime.datetime.now(datetime.timezone.utc)
+            "created_at": _now_ms()
         }
         result = self.echos.insert_one(new_echo)
-        # Find and return the full document we just created
-        return self.echos.find_one({"_id": result.inserted_id})
+        # The document as stored - no need to read it back
+        new_echo["_id"] = result.inserted_id
+        return new_echo
     
     def get_echo_for_user(self, user_id: Any) -> dict:
         """Retrieves the Echo associated with a given user."""
-        return self.echos.find_one({"user_id": user_id})
+        return self.echos.find_one({"user_id": user_id}, ECHO_FIELDS)
 
     def add_message_to_history(self, echo_id: Any, role: str, content: str):
         """
@@ -75,28 +288,143 @@ class DatabaseManager:
             "echo_id": echo_id,
             "role": role,
             "content": content,
-            "created_at": datetime.datetime.now(datetime.timezone.utc)
+            # MongoDB keeps milliseconds - buffered copies must sort and page the same way
+            "created_at": _now_ms()
         }
-        self.messages.insert_one(new_message)
+        if self.message_buffer is not None:
+            # Written in the next batch; readers see it through the buffer meanwhile
+            self.message_buffer.add(new_message)
+        else:
+            self.messages.insert_one(new_message)
+        if self.history_cache is not None:
+            self.history_cache.append(echo_id, new_message)
 
     def get_message_history(self, echo_id: Any, limit: int = 10) -> list:
         """
         Retrieves the last N messages for a conversation, in chronological order.
+        
+        Served from the history cache when the Echo is cached; a miss loads
+        (at least) a full ring buffer's worth so later turns hit.
         """
+        fetch = limit
+        if self.history_cache is not None:
+            cached = self.history_cache.get(echo_id, limit)
+            if cached is not None:
+                return cached
+            generation = self.history_cache.generation(echo_id)
+            fetch = max(limit, self.history_cache.capacity)
+        
         # Find messages, sort by newest first, limit the count
-        messages_cursor = self.messages.find({"echo_id": echo_id}).sort("created_at", -1).limit(limit)
+        query, sort = message_page_query(echo_id)
+        messages_cursor = self.messages.find(query, MESSAGE_FIELDS).sort(sort).limit(fetch)
         
-        # Convert cursor to a list
-        messages = list(messages_cursor)
+        # Convert cursor to a list (plus messages still in the write-behind buffer)
+        messages = self._with_pending(echo_id, list(messages_cursor), fetch, newest_first=True)
         
         # Reverse the list to get chronological order (oldest to newest)
-        return messages[::-1]
+        messages = messages[::-1]
+        
+        if self.history_cache is not None:
+            self.history_cache.fill(echo_id, messages, complete=len(messages) < fetch, generation=generation)
+        return messages[-limit:] if limit > 0 else []
+    
+    def get_message_page(self, echo_id: Any, limit: int = 20, before: str = None, after: str = None) -> dict:
+        """
+        One page of a conversation, by keyset cursor.
+        
+        Without a cursor this is the newest page. before pages back in time
+        from a cursor, after pages forward. Each page is a range scan of
+        the (echo_id, created_at, _id) index starting at the cursor, so it
+        costs O(limit) however deep into the history it is.
+        
+        Args:
+            echo_id: The Echo whose conversation to read
+            limit: Messages per page
+            before: Cursor - return messages older than it
+            after: Cursor - return messages newer than it
+            
+        Returns:
+            {"messages": [...] (chronological), "next_cursor": cursor to
+            continue in the same direction, or None at the end}
+        """
+        if before and after:
+            raise ValueError("Use either before or after, not both")
+        
+        newest_first = not after
+        cursor = before or after
+        bound = decode_cursor(cursor) if cursor else None
+        query, sort = message_page_query(echo_id, bound, newest_first)
+        
+        # One extra document tells us whether there is another page
+        page = list(self.messages.find(query, MESSAGE_FIELDS).sort(sort).limit(limit + 1))
+        page = self._with_pending(echo_id, page, limit + 1, newest_first, bound)
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1]) if has_more else None
+        
+        if newest_first:
+            page.reverse()
+        return {"messages": page, "next_cursor": next_cursor}
+    
+    # ========== INDEXES ==========
+    
+    def ensure_indexes(self) -> dict:
+        """
+        Create any missing indexes for the hot queries and report drift.
+        
+        Returns:
+            The ensure_indexes() report ({"enabled": False} without MongoDB)
+        """
+        if self.db is None:
+            return {"enabled": False}
+        
+        report = {"enabled": True, **ensure_indexes(self.db)}
+        for name, status in report["collections"].items():
+            if status["created"]:
+                print(f"📇 Created indexes on {name}: {', '.join(status['created'])}")
+            for failure in status["failed"]:
+                print(f"⚠️  Could not create index {name}.{failure['name']}: {failure['error']}")
+            if status["changed"] or status["unexpected"]:
+                print(f"⚠️  Index drift on {name}: changed={status['changed']} unexpected={status['unexpected']}")
+        return report
+    
+    def check_indexes(self) -> dict:
+        """Report index drift without creating anything."""
+        if self.db is None:
+            return {"enabled": False}
+        return {"enabled": True, **ensure_indexes(self.db, create=False)}
+    
+    def _with_pending(self, echo_id: Any, messages: list, limit: int, newest_first: bool,
+                      bound: tuple = None) -> list:
+        """
+        Merge messages still in the write-behind buffer into a query result.
+        
+        Args:
+            messages: Query result, sorted by (created_at, _id) in the query's direction
+            limit: Length of the merged result
+            newest_first: Direction of the query (and of the result)
+            bound: Decoded cursor - only buffered messages past it qualify
+        """
+        if self.message_buffer is None:
+            return messages
+        pending = self.message_buffer.pending(echo_id=echo_id)
+        if bound is not None:
+            edge = sort_key({"created_at": bound[0], "_id": bound[1]})
+            pending = [m for m in pending if (sort_key(m) < edge) == newest_first and sort_key(m) != edge]
+        if not pending:
+            return messages
+        
+        # A batch that just landed can show up in both
+        merged = {m["_id"]: m for m in messages}
+        for m in pending:
+            merged.setdefault(m["_id"], m)
+        return sorted(merged.values(), key=sort_key, reverse=newest_first)[:limit]
     
     # ========== VOICE MODEL MANAGEMENT ==========
     
     def create_voice_model(self, user_id: Any, model_id: str, name: str, 
                           audio_file_path: str, file_type: str = 'audio', 
-                          echo_id: Any = None) -> dict:
+                          echo_id: Any = None, duration_seconds: float = None) -> dict:
         """
         Saves a voice model to the database with its associated metadata.
         
@@ -107,6 +435,7 @@ class DatabaseManager:
             audio_file_path: Path to the reference audio/video file
             file_type: 'audio' or 'video'
             echo_id: Optional - link this voice model to a specific Echo
+            duration_seconds: Optional - measured length of the reference audio
             
         Returns:
             The created voice model document
@@ -121,11 +450,51 @@ class DatabaseManager:
             "audio_file_path": audio_file_path,
             "file_type": file_type,  # 'audio' or 'video'
             "echo_id": echo_id,  # Optional: link to an Echo
-            "created_at": datetime.datetime.now(datetime.timezone.utc)
+            "duration_seconds": duration_seconds,
+            "created_at": _now_ms()
         }
         
         result = self.voice_models.insert_one(new_model)
-        return self.voice_models.find_one({"_id": result.inserted_id})
+        new_model["_id"] = result.inserted_id
+        return new_model
+    
+    def ensure_voice_model(self, user_id: Any, model_id: str, name: str,
+                           audio_file_path: str, file_type: str = 'audio',
+                           echo_id: Any = None, duration_seconds: float = None) -> dict:
+        """
+        Returns the voice model record for model_id, creating it if missing.
+        
+        Used when an upload was de-duplicated to an existing Fish.Audio
+        model whose record may never have been saved (e.g. the first upload
+        had no user, or its save failed). One atomic upsert on the unique
+        model_id; an existing record is left unchanged.
+        
+        Args: as for create_voice_model
+            
+        Returns:
+            The voice model document
+        """
+        if not self.voice_models:
+            raise RuntimeError("MongoDB not configured - cannot save voice model")
+        
+        from pymongo import ReturnDocument
+        
+        return self.voice_models.find_one_and_update(
+            {"model_id": model_id},
+            {"$setOnInsert": {
+                "user_id": user_id,
+                "model_id": model_id,
+                "name": name,
+                "audio_file_path": audio_file_path,
+                "file_type": file_type,
+                "echo_id": echo_id,
+                "duration_seconds": duration_seconds,
+                "created_at": _now_ms()
+            }},
+            projection=VOICE_MODEL_FIELDS,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
     
     def get_voice_model_by_id(self, model_id: str) -> dict:
         """
@@ -155,7 +524,7 @@ class DatabaseManager:
         if not self.voice_models:
             return []
         
-        return list(self.voice_models.find({"user_id": user_id}).sort("created_at", -1))
+        return list(self.voice_models.find({"user_id": user_id}, VOICE_MODEL_FIELDS).sort("created_at", -1))
     
     def get_voice_model_for_echo(self, echo_id: Any) -> dict:
         """
@@ -0,0 +1,219 @@
+"""
+In-process cache of recent conversation messages.
+Keeps the last few messages of each active Echo in a ring buffer, so a chat
+turn reads its history from memory instead of re-querying MongoDB for the
+messages it just wrote.
+"""
+import sys
+import threading
+from collections import OrderedDict, deque
+from typing import Any, List, Optional
+
+
+# Rough per-message overhead on top of its content (dict, ids, datetime)
+MESSAGE_OVERHEAD_BYTES = 400
+
+
+class _Entry:
+    __slots__ = ("messages", "complete", "bytes")
+
+    def __init__(self, capacity: int):
+        self.messages = deque(maxlen=capacity)
+        # True while the buffer holds the Echo's entire history
+        self.complete = False
+        self.bytes = 0
+
+
+class HistoryCache:
+    """
+    Ring buffer of the last ``capacity`` messages per Echo, LRU across Echoes.
+
+    The total (estimated) size is kept under ``max_bytes`` by evicting the
+    least recently used Echoes. Each Echo has a generation that every write
+    or invalidation bumps - even when the Echo isn't cached - and a load
+    only fills the cache if the generation is unchanged, so a slow database
+    read can't overwrite a newer message.
+    """
+
+    def __init__(self, capacity: int, max_bytes: int):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # echo_id -> _Entry
+        self._generations = {}
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, echo_id: Any, limit: int) -> Optional[List[dict]]:
+        """
+        The last limit messages (chronological copies), or None on a miss.
+
+        A cached Echo only answers if it holds at least limit messages or
+        its whole history.
+        """
+        with self._lock:
+            entry = self._entries.get(echo_id)
+            if entry is None or (len(entry.messages) < limit and not entry.complete):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(echo_id)
+            self.hits += 1
+            recent = list(entry.messages)[-limit:] if limit > 0 else []
+            return [dict(message) for message in recent]
+
+    def generation(self, echo_id: Any) -> int:
+        """Current generation of echo_id; pass it to fill() after loading."""
+        with self._lock:
+            return self._generations.get(echo_id, 0)
+
+    def fill(self, echo_id: Any, messages: List[dict], complete: bool, generation: int):
+        """
+        Cache messages loaded from the database (chronological).
+
+        Args:
+            complete: The load returned the Echo's entire history
+            generation: generation() read before the load started
+        """
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            if generation != self._generations.get(echo_id, 0):
+                return
+            self._drop_locked(echo_id)
+            entry = _Entry(self.capacity)
+            for message in messages[-self.capacity:]:
+                self._push_locked(entry, message)
+            entry.complete = complete and len(messages) <= self.capacity
+            self._entries[echo_id] = entry
+            self._total_bytes += entry.bytes
+            self._evict_locked()
+
+    def append(self, echo_id: Any, message: dict):
+        """Add a newly written message (only Echoes already cached are updated)."""
+        with self._lock:
+            self._generations[echo_id] = self._generations.get(echo_id, 0) + 1
+            entry = self._entries.get(echo_id)
+            if entry is None:
+                return
+            before = entry.bytes
+            self._push_locked(entry, message)
+            self._total_bytes += entry.bytes - before
+            self._entries.move_to_end(echo_id)
+            self._evict_locked()
+
+    def contains(self, echo_id: Any, message_id: Any) -> bool:
+        """Whether a cached Echo already has this message (e.g. our own write)."""
+        with self._lock:
+            entry = self._entries.get(echo_id)
+            return entry is not None and any(m.get("_id") == message_id for m in entry.messages)
+
+    def invalidate(self, echo_id: Any = None):
+        """Forget one Echo (or every Echo if echo_id is None)."""
+        with self._lock:
+            self.invalidations += 1
+            if echo_id is None:
+                for cached in self._entries:
+                    self._generations[cached] = self._generations.get(cached, 0) + 1
+                self._entries.clear()
+                self._total_bytes = 0
+                return
+            self._generations[echo_id] = self._generations.get(echo_id, 0) + 1
+            self._drop_locked(echo_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "echoes": len(self._entries),
+                "messages": sum(len(entry.messages) for entry in self._entries.values()),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "capacity_per_echo": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _push_locked(self, entry: _Entry, message: dict):
+        if len(entry.messages) == entry.messages.maxlen:
+            # The oldest message falls out - the buffer no longer has everything
+            entry.bytes -= self._size(entry.messages[0])
+            entry.complete = False
+        entry.messages.append(dict(message))
+        entry.bytes += self._size(message)
+
+    def _drop_locked(self, echo_id: Any):
+        entry = self._entries.pop(echo_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.bytes
+
+    def _evict_locked(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.bytes
+            self.evictions += 1
+
+    @staticmethod
+    def _size(message: dict) -> int:
+        return sys.getsizeof(message.get("content") or "") + MESSAGE_OVERHEAD_BYTES
+
+
+class ChangeStreamInvalidator:
+    """
+    Keeps a HistoryCache coherent across workers and replicas.
+
+    Watches the messages collection with a MongoDB change stream (needs a
+    replica set, e.g. Atlas) and drops an Echo from the cache when another
+    process adds a message to it. Our own writes are already in the cache
+    and are ignored. Anything else (deletes, a lost stream) clears the
+    whole cache.
+    """
+
+    RETRY_SECONDS = 5
+
+    def __init__(self, collection, cache: HistoryCache):
+        self.collection = collection
+        self.cache = cache
+        self._stopped = threading.Event()
+        self._stream = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="history-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        stream = self._stream
+        if stream is not None:
+            stream.close()
+
+    def _run(self):
+        resume_token = None
+        while not self._stopped.is_set():
+            try:
+                with self.collection.watch(resume_after=resume_token) as stream:
+                    self._stream = stream
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        self._apply(change)
+            except Exception as e:
+                if self._stopped.is_set():
+                    return
+                print(f"Warning: History cache change stream failed: {e}")
+                # Changes may have been missed while disconnected
+                self.cache.invalidate()
+                self._stopped.wait(self.RETRY_SECONDS)
+
+    def _apply(self, change: dict):
+        if change.get("operationType") == "insert":
+            message = change["fullDocument"]
+            if not self.cache.contains(message.get("echo_id"), message.get("_id")):
+                self.cache.invalidate(message.get("echo_id"))
+        else:
+            self.cache.invalidate()
@@ -0,0 +1,309 @@
+"""
+Shared HTTP transport for Fish.Audio API calls.
+Keeps TLS connections to api.fish.audio alive between requests and retries
+transient failures with jittered exponential backoff.
+"""
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+
+
+# Upstream statuses worth retrying for idempotent requests
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class FishAudioTransport:
+    """
+    Pooled, keep-alive HTTP client for the Fish.Audio API.
+
+    Connection failures (nothing was sent yet) are retried for every
+    request. Read timeouts, dropped connections and retryable statuses are
+    only retried when the caller marks the request as idempotent.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        pool_size: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # urllib3 only handles connect-phase retries; everything else is
+        # decided in request() where we know whether the call is idempotent
+        connect_retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=0,
+            other=0,
+            redirect=False,
+            backoff_factor=backoff_base,
+            backoff_jitter=backoff_base,
+            backoff_max=backoff_max
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=2,  # api.fish.audio (+ one spare host)
+            pool_maxsize=pool_size,
+            max_retries=connect_retry
+        )
+
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        read_timeout: float = None,
+        idempotent: bool = None,
+        **kwargs
+    ) -> requests.Response:
+        """
+        Send a request through the shared pool.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            read_timeout: Override the default read timeout (seconds)
+            idempotent: Allow retries after the request was sent
+                        (defaults to True for GET/HEAD)
+            **kwargs: Passed through to requests.Session.request
+
+        Returns:
+            The response (callers must close streamed responses)
+        """
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD")
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+
+        attempt = 0
+        while True:
+            with self._lock:
+                self._requests += 1
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
+                # Connect-phase failures were already retried by urllib3
+                if not idempotent or attempt >= self.max_retries or self._is_connect_failure(e):
+                    with self._lock:
+                        self._failures += 1
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES or not idempotent \
+                        or attempt >= self.max_retries:
+                    return response
+                response.close()
+
+            attempt += 1
+            with self._lock:
+                self._retries += 1
+            self._rewind(kwargs)
+            time.sleep(self._backoff(attempt))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for the given attempt."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _is_connect_failure(error: Exception) -> bool:
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    @staticmethod
+    def _rewind(kwargs: dict):
+        """Seek uploaded file objects back to the start before a retry."""
+        for _, value in (kwargs.get("files") or {}).items():
+            fileobj = value[1] if isinstance(value, tuple) else value
+            if hasattr(fileobj, "seek"):
+                fileobj.seek(0)
+
+    def stats(self) -> dict:
+        """Request counters and per-host connection pool usage."""
+        pools = []
+        pool_manager = self.adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": pool.host,
+                "port": pool.port,
+                "max_size": pool.pool.maxsize if pool.pool else 0,
+                "idle_connections": pool.pool.qsize() if pool.pool else 0,
+                "connections_opened": pool.num_connections,
+                "requests_served": pool.num_requests
+            })
+
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "failures": self._failures,
+                "connect_timeout": self.connect_timeout,
+                "read_timeout": self.read_timeout,
+                "pools": pools
+            }
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+
+class AsyncFishAudioTransport:
+    """
+    asyncio counterpart of FishAudioTransport, built on httpx.AsyncClient.
+
+    Same retry rules: connect failures are retried by the underlying httpx
+    transport for every request; read failures and retryable statuses only
+    for idempotent requests.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        pool_size: int = 100,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0
+    ):
+        import httpx  # Only needed by the FastAPI app
+
+        self._httpx = httpx
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size
+        )
+        self._transport = httpx.AsyncHTTPTransport(retries=max_retries, limits=limits)
+        self.client = httpx.AsyncClient(
+            transport=self._transport,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        read_timeout: float = None,
+        idempotent: bool = None,
+        stream: bool = False,
+        **kwargs
+    ):
+        """
+        Send a request through the shared pool.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            read_timeout: Override the default read timeout (seconds)
+            idempotent: Allow retries after the request was sent
+                        (defaults to True for GET/HEAD)
+            stream: Return before the body is read (caller must aclose())
+            **kwargs: Passed through to httpx.AsyncClient.build_request
+
+        Returns:
+            httpx.Response
+        """
+        httpx = self._httpx
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD")
+        timeout = httpx.Timeout(read_timeout or self.read_timeout, connect=self.connect_timeout)
+
+        attempt = 0
+        while True:
+            self._requests += 1
+            request = self.client.build_request(method, url, timeout=timeout, **kwargs)
+            try:
+                response = await self.client.send(request, stream=stream)
+            except (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError):
+                if not idempotent or attempt >= self.max_retries:
+                    self._failures += 1
+                    raise
+            except httpx.TransportError:
+                # Connect-phase failures were already retried by the transport
+                self._failures += 1
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUSES or not idempotent \
+                        or attempt >= self.max_retries:
+                    return response
+                await response.aclose()
+
+            attempt += 1
+            self._retries += 1
+            FishAudioTransport._rewind(kwargs)
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def stats(self) -> dict:
+        """Request counters and connection pool usage."""
+        connections = getattr(getattr(self._transport, "_pool", None), "connections", [])
+        return {
+            "requests": self._requests,
+            "retries": self._retries,
+            "failures": self._failures,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "pools": [{
+                "max_size": self.pool_size,
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for c in connections if c.is_idle())
+            }]
+        }
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.client.aclose()
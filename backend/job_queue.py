@@ -0,0 +1,444 @@
+"""
+Background job queue for long-running work (e.g. synthesis).
+Jobs are persisted in SQLite so queued work survives a restart, and run on
+a small pool of worker threads.
+"""
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Collection, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+
+# How often finished jobs older than the retention period are deleted
+SWEEP_INTERVAL_SECONDS = 3600
+
+
+def check_callback_url(url: str, allowed_hosts: Collection[str] = ()):
+    """
+    Make sure a callback URL can't be used to reach internal services.
+
+    With allowed_hosts only those hosts are accepted. Otherwise the host
+    must resolve exclusively to public addresses - private, loopback,
+    link-local (cloud metadata), shared, reserved and multicast ranges
+    are refused.
+
+    Raises:
+        ValueError: The URL isn't an acceptable callback target
+    """
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"callback_url host is not allowed: {host}")
+        return
+
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise ValueError("callback_url has an invalid port")
+    _public_addresses(host, port)
+
+
+def _public_addresses(host: str, port: int) -> list:
+    """
+    Resolve host, refusing it unless every address is public.
+
+    Returns:
+        The getaddrinfo() entries, in resolver order
+
+    Raises:
+        ValueError: The host doesn't resolve, or resolves to a non-public address
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"callback_url host could not be resolved: {host}")
+    for info in infos:
+        ip = ipaddress.ip_address(info[4][0].split("%")[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback_url must point to a public address (not {ip})")
+    return infos
+
+
+class _PublicOnlyConnection:
+    """
+    Checks the host's addresses when the socket is opened and connects to
+    the checked address itself, so a DNS answer that changes after
+    check_callback_url() (DNS rebinding) can't point the POST at an
+    internal service. TLS still verifies the certificate (and sends SNI)
+    for the URL's hostname.
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        try:
+            infos = _public_addresses(host, self.port)
+        except ValueError as e:
+            raise NewConnectionError(self, str(e)) from e
+        try:
+            for n, info in enumerate(infos):
+                self._dns_host = info[4][0]
+                try:
+                    return super()._new_conn()
+                except NewConnectionError:
+                    if n == len(infos) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+
+
+class _PublicOnlyHTTPConnection(_PublicOnlyConnection, HTTPConnection):
+    pass
+
+
+class _PublicOnlyHTTPSConnection(_PublicOnlyConnection, HTTPSConnection):
+    pass
+
+
+class _PublicOnlyHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _PublicOnlyHTTPConnection
+
+
+class _PublicOnlyHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _PublicOnlyHTTPSConnection
+
+
+class PublicOnlyAdapter(HTTPAdapter):
+    """Transport adapter that only ever connects to public addresses."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _PublicOnlyHTTPConnectionPool,
+            "https": _PublicOnlyHTTPSConnectionPool
+        }
+
+
+class JobQueue:
+    """
+    Persistent job queue with a local worker pool.
+
+    Each job has a kind (which handler runs it), a JSON payload and an
+    optional callback URL that receives the finished job as a POST.
+    Statuses: queued -> running -> succeeded | failed.
+
+    Workers only claim jobs of the kinds they have handlers for, so
+    several queues can share one database with separate worker pools
+    (e.g. slow voice model creation doesn't hold up synthesis).
+
+    A claimed job is leased to this queue for ``lease_seconds`` and the
+    lease is renewed while it runs. Jobs whose lease ran out (their
+    process died) are claimed again like queued ones, so recovery never
+    touches work another live queue or process is doing.
+
+    Finished jobs are deleted ``retention_seconds`` after they finish
+    (0 keeps them forever). Callback URLs are checked with
+    check_callback_url() when the job is submitted. Without an allowlist
+    the POST goes through PublicOnlyAdapter, which checks the address
+    it actually connects to; it never follows redirects or uses proxies.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        handlers: Dict[str, Callable[[dict], dict]],
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 300.0,
+        retention_seconds: float = 0,
+        callback_allowed_hosts: Collection[str] = ()
+    ):
+        self.db_path = str(db_path)
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retention_seconds = retention_seconds
+        self.callback_allowed_hosts = {host.lower() for host in callback_allowed_hosts}
+        # Unique per queue instance - marks the jobs this queue is running
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation keeps threads independent
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    callback_url TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner TEXT,
+                    lease_until REAL
+                )
+            """)
+            # Databases created before leases existed
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, column_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+        finally:
+            conn.close()
+
+    def start(self):
+        """Start the worker threads (and the lease renewal / cleanup thread)."""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain, name="job-maintenance", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self):
+        """Ask the workers to exit after their current job."""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def submit(self, kind: str, payload: dict, callback_url: str = None) -> dict:
+        """
+        Queue a job.
+
+        Args:
+            kind: Handler name (e.g. 'synthesize')
+            payload: JSON-serializable handler arguments
+            callback_url: Optional URL to POST the finished job to
+
+        Returns:
+            The new job record
+
+        Raises:
+            ValueError: Unknown kind, or a callback_url that isn't allowed
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        if callback_url:
+            check_callback_url(callback_url, self.callback_allowed_hosts)
+
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, callback_url, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), callback_url, now, now)
+            )
+        finally:
+            conn.close()
+
+        self._wakeup.set()
+        return self.get(job_id)
+
+    def get(self, job_id: str, kinds: Optional[Collection[str]] = None) -> Optional[dict]:
+        """
+        Get a job by ID, or None if it doesn't exist.
+
+        With kinds, jobs of any other kind are treated as missing (so an
+        endpoint for one kind can't be used to read another's results).
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if not row or (kinds is not None and row["kind"] not in kinds):
+            return None
+        return self._to_dict(row)
+
+    def stats(self) -> dict:
+        """Number of jobs in each status."""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        finally:
+            conn.close()
+        return {row["status"]: row["n"] for row in rows}
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """
+        Atomically move the oldest queued job (or running job whose lease
+        has expired) of our kinds to running, leased to this queue.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            kinds = list(self.handlers)
+            now = time.time()
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE kind IN ({', '.join('?' * len(kinds))}) "
+                "AND (status = 'queued' OR (status = 'running' AND (lease_until IS NULL OR lease_until < ?))) "
+                "ORDER BY created_at LIMIT 1",
+                kinds + [now]
+            ).fetchone()
+            if row:
+                if row["status"] == "running":
+                    print(f"♻️  Reclaiming job {row['id']} (lease held by {row['owner']} expired)")
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (self.owner, now + self.lease_seconds, now, row["id"])
+                )
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _complete(self, job_id: str, result: dict = None, error: str = None) -> bool:
+        """
+        Record a job's outcome.
+
+        Returns:
+            False if the lease was lost (the job was reclaimed elsewhere),
+            in which case nothing is recorded
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND status = 'running'",
+                (
+                    "failed" if error else "succeeded",
+                    json.dumps(result) if result is not None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                    self.owner
+                )
+            )
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def sweep(self) -> int:
+        """
+        Delete our kinds' jobs that finished more than retention_seconds ago.
+
+        Returns:
+            Number of jobs deleted
+        """
+        if not self.retention_seconds:
+            return 0
+        kinds = list(self.handlers)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') "
+                f"AND kind IN ({', '.join('?' * len(kinds))}) AND updated_at < ?",
+                kinds + [time.time() - self.retention_seconds]
+            )
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _maintain(self):
+        """Extend the leases of the jobs this queue is running; delete old finished jobs."""
+        interval = self.lease_seconds / 3
+        next_sweep = time.monotonic()
+        while not self._stopped.wait(interval):
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = 'running'",
+                    (time.time() + self.lease_seconds, self.owner)
+                )
+            except sqlite3.Error as e:
+                print(f"Warning: Could not renew job leases: {e}")
+            finally:
+                conn.close()
+
+            if time.monotonic() >= next_sweep:
+                next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+                try:
+                    self.sweep()
+                except sqlite3.Error as e:
+                    print(f"Warning: Could not delete finished jobs: {e}")
+
+    def _work(self):
+        while not self._stopped.is_set():
+            try:
+                row = self._claim()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not claim job: {e}")
+                row = None
+
+            if row is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            try:
+                result = self.handlers[row["kind"]](json.loads(row["payload"]))
+                recorded = self._complete(row["id"], result=result)
+            except Exception as e:
+                recorded = self._complete(row["id"], error=str(e))
+
+            if not recorded:
+                print(f"Warning: Job {row['id']} was reclaimed by another worker - result discarded")
+            elif row["callback_url"]:
+                self._send_callback(row["id"], row["callback_url"])
+
+    def _send_callback(self, job_id: str, callback_url: str):
+        """POST the finished job to its callback URL (best effort)."""
+        try:
+            if self.callback_allowed_hosts:
+                check_callback_url(callback_url, self.callback_allowed_hosts)
+                requests.post(callback_url, json=self.get(job_id), timeout=10, allow_redirects=False)
+                return
+            with requests.Session() as session:
+                session.trust_env = False  # a proxy would connect on our behalf, unchecked
+                session.mount("http://", PublicOnlyAdapter())
+                session.mount("https://", PublicOnlyAdapter())
+                session.post(callback_url, json=self.get(job_id), timeout=10, allow_redirects=False)
+        except (ValueError, requests.exceptions.RequestException) as e:
+            print(f"Warning: Job {job_id} callback failed: {e}")
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        return {
+            "job_id": row["id"],
+            "type": row["kind"],
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": datetime.fromtimestamp(row["created_at"], timezone.utc).isoformat(),
+            "updated_at": datetime.fromtimestamp(row["updated_at"], timezone.utc).isoformat()
+        }
@@ -1,15 +1,22 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 from pydantic import BaseModel
-from typing import Optional, List
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from typing import Any, Optional, List
+import asyncio
+import json
 import os
 from bson import ObjectId
 import google.generativeai as genai
+from config import Config
 from database import DatabaseManager
-from voice_service import VoiceServiceWrapper
+from async_voice_service import AsyncVoiceServiceWrapper
 
 # Initialize FastAPI app
 app = FastAPI(title="Echo API", version="1.0.0")
@@ -32,8 +39,49 @@ genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 # Initialize templates
 templates = Jinja2Templates(directory="templates")
 
-# Initialize voice service
-voice_service = VoiceServiceWrapper()
+# Initialize voice service (async, so Fish.Audio calls don't block the event loop)
+voice_service = AsyncVoiceServiceWrapper()
+
+class OutputFiles(StaticFiles):
+    """
+    Static files for generated audio (/outputs).
+    
+    FileResponse handles Range requests (206); whole-file responses use the
+    server's pathsend extension (zero-copy) when it offers one. Cache entries
+    get their content name as a strong ETag and an immutable Cache-Control.
+    """
+    
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        url_path = os.path.relpath(full_path, voice_service.output_dir)
+        etag, cache_control = voice_service.output_cache_policy(url_path.replace(os.sep, "/"))
+        headers = {"cache-control": cache_control}
+        if etag:
+            headers["etag"] = f'"{etag}"'
+        
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        voice_service.retention.touch(url_path.replace(os.sep, "/"))
+        return response
+
+app.mount("/outputs", OutputFiles(directory=voice_service.output_dir), name="outputs")
+
+@app.on_event("shutdown")
+async def close_voice_service():
+    await voice_service.aclose()
+    # Writes any buffered conversation messages
+    await asyncio.to_thread(db_manager.close)
+
+async def run_until_disconnect(request: Request, coro):
+    """Await coro, cancelling it if the client disconnects first."""
+    task = asyncio.ensure_future(coro)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=0.5)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            raise HTTPException(status_code=499, detail="Client disconnected")
 
 # Pydantic models for request/response
 class CreateEchoRequest(BaseModel):
@@ -53,6 +101,10 @@ class EchoResponse(BaseModel):
     name: str
     created_at: str
 
+class BatchSynthesizeRequest(BaseModel):
+    items: List[Any]  # Validated per item so one bad entry doesn't reject the batch
+    concurrency: Optional[int] = None
+
 # Serve HTML test page
 @app.get("/", response_class=HTMLResponse)
 async def serve_test_page(request: Request):
@@ -111,7 +163,7 @@ async def chat(
 ):
     try:
         # Get user
-        user = db_manager.users.find_one({"auth0_user_id": auth0_id})
+        user = db_manager.users.find_one({"auth0_user_id": auth0_id}, {"_id": 1})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -159,7 +211,7 @@ async def chat(
 async def get_echo_info(auth0_id: str):
     try:
         # Get user
-        user = db_manager.users.find_one({"auth0_user_id": auth0_id})
+        user = db_manager.users.find_one({"auth0_user_id": auth0_id}, {"_id": 1})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -180,41 +232,126 @@ async def get_echo_info(auth0_id: str):
 # Voice synthesis endpoint
 @app.post("/api/synthesize")
 async def synthesize_speech(
+    request: Request,
     text: str = Form(...),
-    reference_id: Optional[str] = Form(None)
+    reference_id: Optional[str] = Form(None),
+    stream: bool = Form(False)
 ):
     try:
-        result = voice_service.synthesize(text, reference_id=reference_id)
+        if stream:
+            # Forward audio chunks as they arrive; the file is saved alongside
+            audio_stream = await voice_service.synthesize_stream(text, reference_id=reference_id)
+            return StreamingResponse(
+                audio_stream,
+                media_type="audio/mpeg",
+                headers={
+                    "X-Audio-Url": audio_stream.audio_url,
+                    "X-Cache": "HIT" if audio_stream.cached else "MISS"
+                },
+                background=BackgroundTask(audio_stream.aclose)
+            )
+        
+        result = await run_until_disconnect(
+            request,
+            voice_service.synthesize(text, reference_id=reference_id)
+        )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Batch voice synthesis endpoint (NDJSON, one line per item in order)
+@app.post("/api/synthesize/batch")
+async def synthesize_batch(batch: BatchSynthesizeRequest):
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="items must be a non-empty list")
+    if len(batch.items) > Config.TTS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {Config.TTS_BATCH_MAX_ITEMS} items")
+    
+    async def lines():
+        async for result in voice_service.synthesize_batch(batch.items, batch.concurrency):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 # Upload reference audio endpoint
 @app.post("/api/upload-reference")
 async def upload_reference(
     audio: UploadFile = File(...),
-    name: Optional[str] = Form(None)
+    name: Optional[str] = Form(None),
+    auth0_id: Optional[str] = None
 ):
     try:
-        # Read audio file
-        audio_bytes = await audio.read()
-        
-        # Upload to Fish.Audio
-        result = voice_service.upload_reference_audio(audio_bytes, name or audio.filename)
+        # Stream the spooled upload straight into the Fish.Audio request.
+        # Only a known user's re-upload of the same audio reuses their model.
+        result = await voice_service.upload_reference_audio(
+            audio.file,
+            name or audio.filename,
+            filename=audio.filename,
+            owner=auth0_id
+        )
         
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Get available voices
 @app.get("/api/voices")
-async def get_voices():
+async def get_voices(
+    page_size: Optional[int] = None,
+    offset: int = 0,
+    title: Optional[str] = None,
+    stream: bool = False
+):
     try:
-        voices = voice_service.get_available_voices()
+        if stream:
+            # Every model as NDJSON, fetched and sent one page at a time
+            async def lines():
+                try:
+                    async for model in voice_service.iter_voices(title):
+                        yield json.dumps(model) + "\n"
+                except Exception as e:
+                    yield json.dumps({"error": str(e)}) + "\n"
+            
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+        
+        voices = await voice_service.get_available_voices(page_size=page_size, offset=offset, title=title)
         return {"voices": voices}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# TTS cache statistics
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    try:
+        return {
+            "cache": voice_service.get_cache_stats(),
+            "coalescing": voice_service.get_coalescing_stats(),
+            "voices": voice_service.get_voices_cache_stats(),
+            "history": db_manager.history_cache.stats() if db_manager.history_cache else None
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Output directory retention statistics
+@app.get("/api/admin/outputs/stats")
+async def get_output_stats():
+    try:
+        return {"retention": voice_service.get_retention_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Fish.Audio connection pool statistics
+@app.get("/api/transport/stats")
+async def get_transport_stats():
+    try:
+        return {"transport": voice_service.get_transport_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Minimal MPEG audio frame parser.
+Lets us join MP3 clips at frame boundaries (no re-encoding) and measure
+them without decoding any audio.
+"""
+from collections import namedtuple
+from typing import Iterator, List, Optional, Tuple
+
+
+FrameHeader = namedtuple(
+    "FrameHeader",
+    ["version", "layer", "bitrate", "sample_rate", "padding", "channels",
+     "frame_length", "samples"]
+)
+
+# Bitrates in kbps, indexed by [bitrate_index]
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates in Hz, indexed by version then [sample_rate_index]
+_SAMPLE_RATES = {
+    1: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    2.5: [11025, 12000, 8000],
+}
+
+# Version bits -> MPEG version (0b01 is reserved)
+_VERSIONS = {0b00: 2.5, 0b10: 2, 0b11: 1}
+# Layer bits -> layer number (0b00 is reserved)
+_LAYERS = {0b01: 3, 0b10: 2, 0b11: 1}
+
+
+def parse_frame_header(data: bytes, offset: int = 0) -> Optional[FrameHeader]:
+    """Parse the 4-byte frame header at offset, or return None if it isn't one."""
+    if offset + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = _VERSIONS.get((b1 >> 3) & 0b11)
+    layer = _LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    channels = 1 if (b3 >> 6) == 0b11 else 2
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or version == 1:
+        samples = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        # Layer III in MPEG-2/2.5 carries half as many samples per frame
+        samples = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return FrameHeader(version, layer, bitrate, sample_rate, padding, channels,
+                       frame_length, samples)
+
+
+def id3v2_size(data: bytes) -> int:
+    """Length of a leading ID3v2 tag (0 if there is none)."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    # Tag size is a 28-bit synchsafe integer, excluding the 10-byte header
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _side_info_size(header: FrameHeader) -> int:
+    if header.version == 1:
+        return 17 if header.channels == 1 else 32
+    return 9 if header.channels == 1 else 17
+
+
+def vbr_header(data: bytes, offset: int, header: FrameHeader) -> Optional[Tuple[str, Optional[int]]]:
+    """
+    Detect a Xing/Info or VBRI header inside the frame at offset.
+
+    Returns:
+        (tag, frame_count) - frame_count is None when the header omits it -
+        or None if the frame is ordinary audio
+    """
+    xing_at = offset + 4 + _side_info_size(header)
+    tag = data[xing_at:xing_at + 4]
+    if tag in (b"Xing", b"Info"):
+        flags = int.from_bytes(data[xing_at + 4:xing_at + 8], "big")
+        frames = None
+        if flags & 0x1:
+            frames = int.from_bytes(data[xing_at + 8:xing_at + 12], "big")
+        return tag.decode("ascii"), frames
+
+    vbri_at = offset + 4 + 32
+    if data[vbri_at:vbri_at + 4] == b"VBRI":
+        frames = int.from_bytes(data[vbri_at + 14:vbri_at + 18], "big")
+        return "VBRI", frames
+
+    return None
+
+
+def find_sync(data: bytes, offset: int = 0) -> int:
+    """
+    Offset of the first frame header at or after offset that is followed by
+    another valid header (to avoid false syncs in tag data), or -1.
+    """
+    while True:
+        offset = data.find(b"\xff", offset)
+        if offset < 0:
+            return -1
+        header = parse_frame_header(data, offset)
+        if header and header.frame_length > 4:
+            following = offset + header.frame_length
+            if following >= len(data) or parse_frame_header(data, following):
+                return offset
+        offset += 1
+
+
+def iter_frames(data: bytes) -> Iterator[Tuple[int, FrameHeader]]:
+    """Yield (offset, header) for every complete frame, skipping tags and junk."""
+    offset = find_sync(data, id3v2_size(data))
+    while 0 <= offset < len(data):
+        header = parse_frame_header(data, offset)
+        if header is None or header.frame_length <= 4:
+            # Lost sync (e.g. trailing ID3v1/APE tag) - look for the next frame
+            offset = find_sync(data, offset + 1)
+            continue
+        if offset + header.frame_length > len(data):
+            break  # Truncated final frame
+        yield offset, header
+        offset += header.frame_length
+
+
+def audio_frames(data: bytes) -> bytes:
+    """
+    Return only the audio frames of an MP3 clip.
+
+    ID3 tags, the Xing/Info/VBRI header frame and any truncated trailing
+    frame are dropped, so the result can be concatenated with other clips.
+    """
+    parts = []
+    first = True
+    for offset, header in iter_frames(data):
+        if first:
+            first = False
+            if vbr_header(data, offset, header):
+                continue
+        parts.append(data[offset:offset + header.frame_length])
+    return b"".join(parts)
+
+
+def concat_mp3(clips: List[bytes]) -> bytes:
+    """Join MP3 clips at frame boundaries without re-encoding."""
+    return b"".join(audio_frames(clip) for clip in clips)
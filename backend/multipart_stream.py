@@ -0,0 +1,120 @@
+"""
+Streaming multipart/form-data request bodies.
+requests builds multipart bodies in memory; this produces the same bytes
+lazily, reading file parts straight from their file objects as the body is
+sent.
+"""
+import asyncio
+import os
+import uuid
+from collections import deque
+from typing import BinaryIO, Dict, Tuple
+
+
+# Read size when pulling file parts into the request
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def file_size(fileobj: BinaryIO) -> int:
+    """Bytes remaining in a seekable file object from its current position."""
+    position = fileobj.tell()
+    end = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(position)
+    return end - position
+
+
+class MultipartStream:
+    """
+    A multipart/form-data body that can be passed to requests as ``data``.
+
+    Plain fields are encoded up front (they are small); file parts stay as
+    file objects and are read chunk by chunk while the request is sent.
+    The total length is known in advance, so the request goes out with a
+    Content-Length header rather than chunked encoding.
+
+    Args:
+        fields: Form field name -> value
+        files: Form field name -> (filename, file object, content type)
+    """
+
+    def __init__(self, fields: Dict[str, str], files: Dict[str, Tuple[str, BinaryIO, str]]):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        self._parts = deque()
+        self._length = 0
+        for name, value in fields.items():
+            self._add_bytes(
+                self._part_header(name) + b"\r\n" + str(value).encode("utf-8") + b"\r\n"
+            )
+        for name, (filename, fileobj, content_type) in files.items():
+            self._add_bytes(self._part_header(name, filename, content_type) + b"\r\n")
+            self._parts.append(fileobj)
+            self._length += file_size(fileobj)
+            self._add_bytes(b"\r\n")
+        self._add_bytes(f"--{self.boundary}--\r\n".encode("ascii"))
+
+        self._pending = b""
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes of the body (everything that's left if size < 0)."""
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(READ_CHUNK_SIZE), b""))
+
+        out = bytearray(self._pending[:size])
+        self._pending = self._pending[size:]
+        while len(out) < size and self._parts:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                self._parts.popleft()
+                take = size - len(out)
+                out += part[:take]
+                self._pending = part[take:]
+            else:
+                chunk = part.read(size - len(out))
+                if chunk:
+                    out += chunk
+                else:
+                    self._parts.popleft()
+        return bytes(out)
+
+    async def aiter_chunks(self):
+        """
+        The body as an async iterator (``content=`` for httpx.AsyncClient).
+
+        Each chunk is read in a worker thread, so reading file parts never
+        blocks the event loop.
+        """
+        while True:
+            chunk = await asyncio.to_thread(self.read, READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def _add_bytes(self, data: bytes):
+        self._parts.append(data)
+        self._length += len(data)
+
+    def _part_header(self, name: str, filename: str = None, content_type: str = None) -> bytes:
+        disposition = f'form-data; name="{self._quote(name)}"'
+        if filename is not None:
+            disposition += f'; filename="{self._quote(filename)}"'
+        lines = [f"--{self.boundary}", f"Content-Disposition: {disposition}"]
+        if content_type:
+            lines.append(f"Content-Type: {content_type}")
+        return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+    @staticmethod
+    def _quote(value: str) -> str:
+        # Same escaping as browsers (and urllib3) use in Content-Disposition
+        return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "%0D").replace("\n", "%0A")
@@ -0,0 +1,116 @@
+"""
+Output filename allocation for generated audio.
+Hands out sequential voice_NNN names in constant time, safely across
+threads and processes.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+class OutputFileAllocator:
+    """
+    Allocates unique ``voice_NNN.<ext>`` files in the output directory.
+
+    Files are spread over 256 sub-directories named by a hash prefix of the
+    filename (``outputs/3f/voice_007.mp3``) so no single directory grows
+    large enough to slow down lookups and creates.
+
+    The next number is kept in memory (guarded by a lock for threads) and
+    mirrored to a small counter file so it survives restarts. Each name is
+    claimed with an exclusive create, so two processes sharing the directory
+    can never hand out the same file - the loser simply skips ahead.
+    """
+
+    COUNTER_FILE = ".voice_counter"
+
+    def __init__(self, output_dir: Path, prefix: str = "voice_"):
+        self.output_dir = Path(output_dir)
+        self.prefix = prefix
+        self._counter_path = self.output_dir / self.COUNTER_FILE
+        self._lock = threading.Lock()
+        self._next = self._load_counter()
+
+    def allocate(self, ext: str = "mp3") -> Path:
+        """
+        Reserve the next free output file.
+
+        The file is created empty; callers overwrite it with the audio and
+        should call release() if they end up not using it.
+
+        Returns:
+            Path of the reserved file
+        """
+        with self._lock:
+            while True:
+                number = self._next
+                self._next += 1
+                name = f"{self.prefix}{number:03d}.{ext}"
+                path = self.output_dir / self.shard(name) / name
+                path.parent.mkdir(exist_ok=True)
+                try:
+                    fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                except FileExistsError:
+                    # Another process got there first - catch up with its counter
+                    self._next = max(self._next, self._read_counter_file() or 0)
+                    continue
+                os.close(fd)
+                self._save_counter()
+                return path
+
+    @staticmethod
+    def shard(name: str) -> str:
+        """Sub-directory for a filename: the first two hex digits of its hash."""
+        return hashlib.md5(name.encode("utf-8")).hexdigest()[:2]
+
+    def release(self, path: Path):
+        """Remove a reserved file that was never written."""
+        try:
+            Path(path).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _load_counter(self) -> int:
+        stored = self._read_counter_file()
+        if stored is not None:
+            return stored
+        # First run with this allocator: continue after any existing files
+        return self._scan_existing() + 1
+
+    def _read_counter_file(self):
+        try:
+            return int(self._counter_path.read_text().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save_counter(self):
+        tmp = self._counter_path.with_name(
+            f"{self.COUNTER_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        try:
+            tmp.write_text(str(self._next))
+            os.replace(tmp, self._counter_path)
+        except OSError:
+            # The counter is only a hint; exclusive create keeps names unique
+            pass
+
+    def _scan_existing(self) -> int:
+        """Highest voice number already on disk (one-time migration)."""
+        highest = 0
+        # Older files sit directly in the output directory, newer ones in shards
+        directories = [self.output_dir]
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if entry.is_dir() and len(entry.name) == 2:
+                    directories.append(Path(entry.path))
+
+        for directory in directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if not entry.name.startswith(self.prefix):
+                        continue
+                    stem = entry.name[len(self.prefix):].split(".", 1)[0]
+                    if stem.isdigit():
+                        highest = max(highest, int(stem))
+        return highest
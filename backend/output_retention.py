@@ -0,0 +1,319 @@
+"""
+Retention for generated audio in the output directory.
+Deletes clips that are too old or push the directory over its size budget,
+least-recently-served first.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+# Outputs are written to two-hex-digit shard directories (see OutputFileAllocator)
+_SHARD = re.compile(r"[0-9a-f]{2}")
+
+
+class OutputRetention:
+    """
+    Keeps the output directory within a max age and a max total size.
+
+    Files are tracked in a SQLite index (size and when they were last
+    served - written counts as served), indexed by last served time, so
+    sweeps read just the oldest rows - no directory scans. Several
+    processes can share the directory and its index.
+
+    New files are recorded as they are added. Serving a file only marks it
+    in memory; those marks are written a few seconds later (and before
+    every sweep), so serving never waits on the database. On startup the
+    index is reconciled with the shard directories, so clips written just
+    before a crash are still collected.
+
+    Only files in the shard directories are managed - anything else in the
+    output directory (checked-in samples, readme etc.) is left alone, as
+    are directories in ``exclude`` (e.g. the TTS cache, which has its own
+    LRU).
+    """
+
+    INDEX_FILE = ".retention.db"
+    # Index written by earlier versions, imported once
+    LEGACY_INDEX_FILE = ".retention.json"
+    # Only audio found on disk is adopted; other files are left alone
+    AUDIO_SUFFIXES = {".mp3", ".wav", ".opus", ".pcm", ".flac"}
+    # Files served are recorded at most this long after they are served
+    SAVE_DELAY_SECONDS = 5.0
+
+    def __init__(
+        self,
+        output_dir: Path,
+        max_age_seconds: float,
+        max_bytes: int,
+        exclude: tuple = ("cache",)
+    ):
+        self.output_dir = Path(output_dir)
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.exclude = set(exclude)
+        self.db_path = str(self.output_dir / self.INDEX_FILE)
+
+        self._lock = threading.Lock()
+        # Files served since the last save: relative path -> last served
+        self._served = {}
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.sweeps = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.last_sweep_at = None
+        self.last_sweep_seconds = None
+
+        self._init_db()
+        self._reconcile()
+
+    def add(self, path: Path):
+        """Start tracking a finished output file."""
+        rel = self._relative(path)
+        if rel is None:
+            return
+        try:
+            size = Path(path).stat().st_size
+        except FileNotFoundError:
+            return
+
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO outputs (file, size, last_served) VALUES (?, ?, ?)",
+                (rel, size, time.time())
+            )
+        finally:
+            conn.close()
+        with self._lock:
+            self._served.pop(rel, None)
+
+    def touch(self, url_path: str):
+        """Record that a file (path below /outputs) was just served."""
+        if not self._managed(Path(url_path)):
+            return
+        with self._lock:
+            self._served[url_path] = time.time()
+
+    def sweep(self) -> int:
+        """
+        Delete expired files, then least-recently-served files until the
+        directory is back under its size budget.
+
+        Returns:
+            Number of files deleted
+        """
+        started = time.monotonic()
+        self.save()
+        doomed = []
+        cutoff = time.time() - self.max_age_seconds if self.max_age_seconds else None
+        conn = self._connect()
+        try:
+            # Another process sweeping at the same time waits here, then sees our deletions
+            conn.execute("BEGIN IMMEDIATE")
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM outputs").fetchone()[0]
+            for row in conn.execute("SELECT file, size, last_served FROM outputs ORDER BY last_served"):
+                too_old = cutoff is not None and row["last_served"] < cutoff
+                too_big = self.max_bytes and total > self.max_bytes
+                if not (too_old or too_big):
+                    break
+                total -= row["size"]
+                doomed.append((row["file"], row["size"]))
+            conn.executemany("DELETE FROM outputs WHERE file = ?", [(rel,) for rel, _ in doomed])
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        # Unlink after committing so serving and synthesis aren't held up
+        for rel, size in doomed:
+            try:
+                (self.output_dir / rel).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Warning: Could not delete {rel}: {e}")
+
+        with self._lock:
+            self.sweeps += 1
+            self.evicted_files += len(doomed)
+            self.evicted_bytes += sum(size for _, size in doomed)
+            self.last_sweep_at = time.time()
+            self.last_sweep_seconds = round(time.monotonic() - started, 4)
+        return len(doomed)
+
+    def save(self):
+        """Write the files served since the last save to the index (if there are any)."""
+        with self._lock:
+            served, self._served = self._served, {}
+        if not served:
+            return
+        conn = self._connect()
+        try:
+            # Untracked files match no row; another process may have served a file more recently
+            conn.executemany(
+                "UPDATE outputs SET last_served = MAX(last_served, ?) WHERE file = ?",
+                [(last_served, rel) for rel, last_served in served.items()]
+            )
+        finally:
+            conn.close()
+
+    def start(self, interval: float):
+        """
+        Run sweep() every interval seconds on a background thread, saving
+        served files in between.
+        """
+        def run():
+            next_sweep = time.monotonic() + interval
+            while not self._stopped.wait(min(self.SAVE_DELAY_SECONDS, interval)):
+                try:
+                    if time.monotonic() >= next_sweep:
+                        next_sweep = time.monotonic() + interval
+                        self.sweep()
+                    else:
+                        self.save()
+                except Exception as e:
+                    print(f"Warning: Output sweep failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="output-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background sweeper and save served files."""
+        self._stopped.set()
+        self.save()
+
+    def stats(self) -> dict:
+        """Current usage, limits and eviction counters."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) AS files, COALESCE(SUM(size), 0) AS bytes, MIN(last_served) AS oldest "
+                "FROM outputs"
+            ).fetchone()
+        finally:
+            conn.close()
+        with self._lock:
+            return {
+                "files": row["files"],
+                "bytes": row["bytes"],
+                "max_bytes": self.max_bytes,
+                "max_age_seconds": self.max_age_seconds,
+                "oldest_served_at": row["oldest"],
+                "sweeps": self.sweeps,
+                "evicted_files": self.evicted_files,
+                "evicted_bytes": self.evicted_bytes,
+                "last_sweep_at": self.last_sweep_at,
+                "last_sweep_seconds": self.last_sweep_seconds
+            }
+
+    def _relative(self, path: Path) -> Optional[str]:
+        """Index key for path, or None if retention doesn't manage it."""
+        try:
+            rel = Path(path).relative_to(self.output_dir)
+        except ValueError:
+            return None
+        if not self._managed(rel):
+            return None
+        return rel.as_posix()
+
+    def _managed(self, rel: Path) -> bool:
+        return (
+            len(rel.parts) == 2
+            and bool(_SHARD.fullmatch(rel.parts[0]))
+            and rel.parts[0] not in self.exclude
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outputs (
+                    file TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    last_served REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS outputs_last_served ON outputs (last_served)")
+        finally:
+            conn.close()
+
+    def _reconcile(self):
+        """
+        Adopt files written after the last save (e.g. before a crash) and
+        drop entries whose file is gone.
+        """
+        on_disk = {item["file"]: item for item in self._scan_existing()}
+        legacy = self._read_legacy_index()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            known = {row["file"] for row in conn.execute("SELECT file FROM outputs")}
+            conn.executemany("DELETE FROM outputs WHERE file = ?", [(rel,) for rel in known - on_disk.keys()])
+            adopted = [on_disk[rel] for rel in on_disk.keys() - known]
+            for item in adopted:
+                # Served times from the old JSON index are better than mtimes
+                if item["file"] in legacy:
+                    item["last_served"] = max(item["last_served"], legacy[item["file"]])
+            conn.executemany(
+                "INSERT INTO outputs (file, size, last_served) VALUES (:file, :size, :last_served)",
+                adopted
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if legacy:
+            (self.output_dir / self.LEGACY_INDEX_FILE).unlink(missing_ok=True)
+
+    def _scan_existing(self) -> list:
+        """Audio files in the shard directories, with mtime as last served."""
+        found = []
+        try:
+            shards = [
+                d for d in os.scandir(self.output_dir)
+                if d.is_dir() and _SHARD.fullmatch(d.name) and d.name not in self.exclude
+            ]
+        except FileNotFoundError:
+            return found
+        for shard in shards:
+            for entry in os.scandir(shard.path):
+                if (not entry.is_file() or entry.name.startswith(".")
+                        or Path(entry.name).suffix.lower() not in self.AUDIO_SUFFIXES):
+                    continue
+                stat = entry.stat()
+                found.append({
+                    "file": f"{shard.name}/{entry.name}",
+                    "size": stat.st_size,
+                    "last_served": stat.st_mtime
+                })
+        return found
+
+    def _read_legacy_index(self) -> dict:
+        """file -> last served from an earlier version's JSON index, if there is one."""
+        try:
+            with open(self.output_dir / self.LEGACY_INDEX_FILE, "r", encoding="utf-8") as f:
+                return {item["file"]: item["last_served"] for item in json.load(f)}
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return {}
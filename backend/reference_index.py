@@ -0,0 +1,228 @@
+"""
+De-duplication index for reference audio.
+Maps an upload's content hash and PCM fingerprint to the Fish.Audio model
+already created from it, per user, so re-uploads don't train a new model.
+"""
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+# Fingerprint frames and bands (Haitsma-Kalker style energy-difference bits)
+FINGERPRINT_FRAME_SECONDS = 0.1
+FINGERPRINT_BANDS = 9  # -> 8 bits (one byte) per frame
+FINGERPRINT_MIN_HZ = 300
+FINGERPRINT_MAX_HZ = 3000
+# Only the start of a clip is fingerprinted
+FINGERPRINT_MAX_SECONDS = 30
+# Fingerprints match when at most this fraction of their bits differ (unrelated audio is ~0.5)
+MATCH_BIT_ERROR_RATE = 0.2
+# Frames of misalignment tolerated (encoder delay / padding)
+MATCH_MAX_SHIFT = 2
+# Clips whose durations differ by more than this can't be the same recording
+MATCH_DURATION_TOLERANCE = 1.0
+
+
+def content_hash(fileobj: BinaryIO) -> str:
+    """sha256 of a file object from its current position (which is restored)."""
+    position = fileobj.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(64 * 1024), b""):
+        digest.update(chunk)
+    fileobj.seek(position)
+    return digest.hexdigest()
+
+
+def pcm_fingerprint(samples, sample_rate: int) -> bytes:
+    """
+    Fingerprint decoded audio so re-encoded copies still match.
+
+    Each 100 ms frame is split into log-spaced bands between 300 Hz and
+    3 kHz; every bit is the sign of the change in energy difference between
+    neighbouring bands from one frame to the next. Those signs survive
+    re-encoding, resampling and volume changes.
+
+    Returns:
+        One byte per frame
+    """
+    import numpy as np
+
+    frame = int(sample_rate * FINGERPRINT_FRAME_SECONDS)
+    count = min(len(samples), int(sample_rate * FINGERPRINT_MAX_SECONDS)) // frame
+    if count < 2:
+        return b""
+
+    frames = samples[:count * frame].reshape(count, frame) * np.hanning(frame)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    freqs = np.fft.rfftfreq(frame, 1 / sample_rate)
+    edges = np.geomspace(FINGERPRINT_MIN_HZ, FINGERPRINT_MAX_HZ, FINGERPRINT_BANDS + 1)
+    band_of = np.digitize(freqs, edges) - 1
+    in_range = (band_of >= 0) & (band_of < FINGERPRINT_BANDS)
+    energy = np.zeros((count, FINGERPRINT_BANDS))
+    np.add.at(energy.T, band_of[in_range], power[:, in_range].T)
+
+    band_diff = energy[:, :-1] - energy[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return np.packbits(bits, axis=1).tobytes()
+
+
+def fingerprint_bit_error_rate(a: bytes, b: bytes) -> float:
+    """Fraction of differing bits between two fingerprints, at the best small shift."""
+    import numpy as np
+
+    x = np.frombuffer(a, dtype=np.uint8)
+    y = np.frombuffer(b, dtype=np.uint8)
+    best = 1.0
+    for shift in range(-MATCH_MAX_SHIFT, MATCH_MAX_SHIFT + 1):
+        xs = x[max(shift, 0):]
+        ys = y[max(-shift, 0):]
+        n = min(len(xs), len(ys))
+        if n == 0:
+            continue
+        differing = np.unpackbits(xs[:n] ^ ys[:n]).sum()
+        best = min(best, differing / (n * 8))
+    return best
+
+
+class ReferenceIndex:
+    """
+    Persistent owner -> (sha256, fingerprint) -> model_id index in SQLite.
+
+    Each entry also keeps the duration Fish.Audio's model was created
+    from (after any trimming), which re-uploads report instead of their own.
+
+    Exact re-uploads are found by content hash with a single indexed
+    lookup; re-encoded copies by comparing fingerprints of the owner's
+    clips with a similar duration.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = str(db_path)
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reference_audio (
+                    owner TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    fingerprint BLOB,
+                    duration REAL,
+                    model_id TEXT NOT NULL,
+                    model_duration REAL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (owner, sha256)
+                )
+            """)
+            # Databases created before model durations were stored
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(reference_audio)")}
+            if "model_duration" not in columns:
+                conn.execute("ALTER TABLE reference_audio ADD COLUMN model_duration REAL")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS reference_audio_owner_duration "
+                "ON reference_audio (owner, duration)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS reference_audio_model ON reference_audio (model_id)")
+        finally:
+            conn.close()
+
+    def find(
+        self,
+        owner: str,
+        sha256: str,
+        fingerprint: bytes = None,
+        duration: float = None
+    ) -> Optional[dict]:
+        """
+        The model created from an earlier upload of the same audio by owner.
+
+        Args:
+            owner: User the model belongs to ('' for anonymous uploads)
+            sha256: content_hash() of the upload
+            fingerprint: pcm_fingerprint() of the upload, if it could be decoded
+            duration: Clip duration in seconds (narrows the fingerprint search)
+
+        Returns:
+            {"model_id", "duration_seconds"} - duration_seconds is the
+            model's duration as recorded by add() (None for entries saved
+            before it was stored) - or None if there is no match
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT model_id, model_duration FROM reference_audio WHERE owner = ? AND sha256 = ?",
+                (owner, sha256)
+            ).fetchone()
+            if row:
+                return self._match(row)
+            if not fingerprint:
+                return None
+
+            if duration is None:
+                rows = conn.execute(
+                    "SELECT model_id, model_duration, fingerprint FROM reference_audio "
+                    "WHERE owner = ? AND fingerprint IS NOT NULL",
+                    (owner,)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT model_id, model_duration, fingerprint FROM reference_audio "
+                    "WHERE owner = ? AND fingerprint IS NOT NULL AND duration BETWEEN ? AND ?",
+                    (owner, duration - MATCH_DURATION_TOLERANCE, duration + MATCH_DURATION_TOLERANCE)
+                ).fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            if fingerprint_bit_error_rate(fingerprint, row["fingerprint"]) <= MATCH_BIT_ERROR_RATE:
+                return self._match(row)
+        return None
+
+    @staticmethod
+    def _match(row: sqlite3.Row) -> dict:
+        return {"model_id": row["model_id"], "duration_seconds": row["model_duration"]}
+
+    def add(
+        self,
+        owner: str,
+        sha256: str,
+        model_id: str,
+        fingerprint: bytes = None,
+        duration: float = None,
+        model_duration: float = None
+    ):
+        """
+        Remember that this audio created model_id.
+
+        Args:
+            duration: Duration of the uploaded clip (matched by find())
+            model_duration: Duration the model was created from, as reported
+                to the client (differs from duration when the clip was trimmed)
+        """
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO reference_audio "
+                "(owner, sha256, fingerprint, duration, model_id, model_duration, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (owner, sha256, fingerprint or None, duration, model_id, model_duration, time.time())
+            )
+        finally:
+            conn.close()
+
+    def forget(self, model_id: str):
+        """Drop every entry pointing at a (deleted) model."""
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM reference_audio WHERE model_id = ?", (model_id,))
+        finally:
+            conn.close()
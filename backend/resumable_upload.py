@@ -0,0 +1,278 @@
+"""
+Resumable chunked uploads for reference audio and video.
+Chunks are appended to a file on local disk, so a client whose connection
+drops can ask for the current offset and carry on from there instead of
+restarting the whole upload.
+"""
+import json
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+
+# Copy size when writing a chunk from the request body to disk
+WRITE_CHUNK_SIZE = 64 * 1024
+
+_UPLOAD_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class UploadSessionNotFound(LookupError):
+    """No such upload session (never created, finished or expired)."""
+
+
+class UploadOffsetMismatch(ValueError):
+    """A chunk was sent for an offset other than the session's current one."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload offset mismatch - the server has {offset} bytes")
+        self.offset = offset
+
+
+class UploadSessionStore:
+    """
+    Upload sessions kept as directories below ``root``.
+
+    Each session holds ``session.json`` (what the file is for) and ``data``
+    (the bytes received so far). The size of ``data`` is the session's
+    offset, so nothing has to be rewritten per chunk and sessions survive
+    restarts. Sessions that receive no data for ``ttl_seconds`` are removed
+    by sweep().
+    """
+
+    SESSION_FILE = "session.json"
+    DATA_FILE = "data"
+
+    def __init__(self, root: Path, ttl_seconds: float, max_bytes: int, max_chunk_bytes: int):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_chunk_bytes = max_chunk_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        # One writer per session at a time (a retried PUT may race the original)
+        self._locks_lock = threading.Lock()
+        self._locks = {}
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.expired = 0
+
+    def create(self, filename: str, total_size: int = None, **metadata) -> dict:
+        """
+        Start a new upload session.
+
+        Args:
+            filename: Original filename (its extension sets the content type later)
+            total_size: Expected size in bytes, if known up front
+            **metadata: Anything needed on finalize (name, user_id, ...)
+
+        Returns:
+            The session (see get())
+        """
+        if total_size is not None:
+            total_size = int(total_size)
+            if total_size <= 0:
+                raise ValueError("total_size must be positive")
+            if total_size > self.max_bytes:
+                raise ValueError(f"Upload is too large ({total_size} bytes; the limit is {self.max_bytes})")
+
+        upload_id = uuid.uuid4().hex
+        session_dir = self.root / upload_id
+        session_dir.mkdir()
+        (session_dir / self.DATA_FILE).touch()
+        session = {
+            "upload_id": upload_id,
+            "filename": Path(filename or "reference.wav").name,
+            "total_size": total_size,
+            "created_at": time.time(),
+            **metadata
+        }
+        with open(session_dir / self.SESSION_FILE, "w", encoding="utf-8") as f:
+            json.dump(session, f)
+        return self.get(upload_id)
+
+    def create_from_file(self, fileobj: BinaryIO, filename: str, **metadata) -> dict:
+        """
+        Store a whole file as a completed session (e.g. a single-shot upload
+        whose voice model is created in the background).
+
+        Returns:
+            The session (see get())
+        """
+        session = self.create(filename, **metadata)
+        path = self._session_dir(session["upload_id"]) / self.DATA_FILE
+        written = 0
+        with open(path, "ab") as f:
+            for block in iter(lambda: fileobj.read(WRITE_CHUNK_SIZE), b""):
+                written += len(block)
+                if written > self.max_bytes:
+                    break
+                f.write(block)
+        if written > self.max_bytes:
+            self.delete(session["upload_id"])
+            raise ValueError(f"Upload is too large (the limit is {self.max_bytes} bytes)")
+        return self.get(session["upload_id"])
+
+    def get(self, upload_id: str) -> dict:
+        """
+        Session metadata plus its current offset and expiry.
+
+        Raises:
+            UploadSessionNotFound: Unknown or expired upload_id
+        """
+        session_dir = self._session_dir(upload_id)
+        try:
+            with open(session_dir / self.SESSION_FILE, "r", encoding="utf-8") as f:
+                session = json.load(f)
+            stat = (session_dir / self.DATA_FILE).stat()
+        except (FileNotFoundError, ValueError):
+            raise UploadSessionNotFound(f"Upload session not found: {upload_id}")
+
+        session["offset"] = stat.st_size
+        session["expires_at"] = stat.st_mtime + self.ttl_seconds
+        session["complete"] = session["total_size"] is not None and stat.st_size == session["total_size"]
+        return session
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO, length: int = None) -> dict:
+        """
+        Write a chunk at offset.
+
+        Bytes are flushed to disk as they arrive, so if the connection
+        drops mid-chunk the part that did arrive is kept and the client
+        resumes from the new offset.
+
+        Args:
+            upload_id: Session to write to
+            offset: Where the chunk starts - must equal the current offset
+            stream: Chunk body
+            length: Chunk size in bytes, if known (Content-Length)
+
+        Returns:
+            The updated session
+
+        Raises:
+            UploadOffsetMismatch: offset isn't the session's current offset
+            ValueError: The chunk is too large
+        """
+        with self._session_lock(upload_id):
+            session = self.get(upload_id)
+            if offset != session["offset"]:
+                raise UploadOffsetMismatch(session["offset"])
+
+            limit = session["total_size"] or self.max_bytes
+            remaining = min(self.max_chunk_bytes, limit - offset)
+            if length is not None and length > remaining:
+                raise ValueError(f"Chunk is too large ({length} bytes; at most {remaining} allowed here)")
+
+            with open(self._session_dir(upload_id) / self.DATA_FILE, "ab") as f:
+                while True:
+                    block = stream.read(WRITE_CHUNK_SIZE)
+                    if not block:
+                        break
+                    if len(block) > remaining:
+                        # Keep what fits so the client's offset stays meaningful
+                        f.write(block[:remaining])
+                        raise ValueError("Chunk is larger than the upload allows")
+                    f.write(block)
+                    remaining -= len(block)
+
+        return self.get(upload_id)
+
+    def completed_path(self, upload_id: str) -> Path:
+        """
+        Path of the assembled file, once every byte has arrived.
+
+        Raises:
+            ValueError: The upload is still missing data
+        """
+        session = self.get(upload_id)
+        if session["offset"] == 0:
+            raise ValueError("Upload is empty")
+        if session["total_size"] is not None and not session["complete"]:
+            raise ValueError(
+                f"Upload is incomplete ({session['offset']} of {session['total_size']} bytes received)"
+            )
+        return self._session_dir(upload_id) / self.DATA_FILE
+
+    def delete(self, upload_id: str):
+        """Remove a session and its data (after finalize, or to abort)."""
+        session_dir = self._session_dir(upload_id)
+        with self._session_lock(upload_id):
+            if not session_dir.exists():
+                raise UploadSessionNotFound(f"Upload session not found: {upload_id}")
+            shutil.rmtree(session_dir, ignore_errors=True)
+        with self._locks_lock:
+            self._locks.pop(upload_id, None)
+
+    def sweep(self) -> int:
+        """
+        Remove sessions that haven't received data for ttl_seconds.
+
+        Returns:
+            Number of sessions removed
+        """
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for session_dir in self.root.iterdir():
+            if not _UPLOAD_ID.fullmatch(session_dir.name):
+                continue
+            try:
+                # Half-created sessions have no data file - fall back to the directory
+                data = session_dir / self.DATA_FILE
+                last_write = (data if data.exists() else session_dir).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if last_write < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                with self._locks_lock:
+                    self._locks.pop(session_dir.name, None)
+                removed += 1
+        self.expired += removed
+        return removed
+
+    def start(self, interval: float):
+        """Run sweep() every interval seconds on a background thread."""
+        def run():
+            while not self._stopped.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Warning: Upload session sweep failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="upload-sessions", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background sweeper."""
+        self._stopped.set()
+
+    def stats(self) -> dict:
+        sessions = [d for d in self.root.iterdir() if _UPLOAD_ID.fullmatch(d.name)]
+        return {
+            "sessions": len(sessions),
+            "bytes": sum(self._data_size(d) for d in sessions),
+            "expired_sessions": self.expired,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    def _session_dir(self, upload_id: str) -> Path:
+        # IDs are generated here - anything else could be a path traversal attempt
+        if not _UPLOAD_ID.fullmatch(upload_id or ""):
+            raise UploadSessionNotFound(f"Upload session not found: {upload_id}")
+        return self.root / upload_id
+
+    def _session_lock(self, upload_id: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    @classmethod
+    def _data_size(cls, session_dir: Path) -> int:
+        try:
+            return (session_dir / cls.DATA_FILE).stat().st_size
+        except FileNotFoundError:
+            return 0
@@ -0,0 +1,139 @@
+"""
+Request coalescing ("single flight") for identical concurrent syntheses.
+The first caller for a key does the upstream work; later callers attach to
+it and share the audio it produces.
+"""
+import asyncio
+import threading
+
+
+class Flight:
+    """
+    One in-flight synthesis, shared between its leader and any followers.
+
+    The leader calls start() once the output file is known, progress()
+    after each chunk is written, and finally finish() or fail(). Followers
+    block in wait_started()/wait_progress() and read the output file as it
+    grows.
+    """
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.done = False
+        self._started = threading.Event()
+        self._changed = threading.Condition()
+
+    def start(self, result: dict):
+        self.result = result
+        self._started.set()
+
+    def progress(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def finish(self):
+        with self._changed:
+            self.done = True
+            self._changed.notify_all()
+        self._started.set()
+
+    def fail(self, error: BaseException):
+        with self._changed:
+            self.error = error
+            self.done = True
+            self._changed.notify_all()
+        self._started.set()
+
+    def wait_started(self):
+        self._started.wait()
+        if self.result is None:
+            raise RuntimeError(f"Coalesced synthesis failed: {self.error}")
+
+    def wait_progress(self, timeout: float = 1.0):
+        with self._changed:
+            if not self.done:
+                self._changed.wait(timeout)
+
+
+class AsyncFlight:
+    """asyncio counterpart of Flight (same methods, waits are coroutines)."""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.done = False
+        self._started = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    def start(self, result: dict):
+        self.result = result
+        self._started.set()
+
+    def progress(self):
+        # Wake current waiters and re-arm for the next chunk
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def finish(self):
+        self.done = True
+        self._changed.set()
+        self._started.set()
+
+    def fail(self, error: BaseException):
+        self.error = error
+        self.finish()
+
+    async def wait_started(self):
+        await self._started.wait()
+        if self.result is None:
+            raise RuntimeError(f"Coalesced synthesis failed: {self.error}")
+
+    async def wait_progress(self, timeout: float = 1.0):
+        if self.done:
+            return
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class FlightRegistry:
+    """Tracks in-flight requests by key and counts how many were coalesced."""
+
+    def __init__(self, flight_class=Flight):
+        self._flight_class = flight_class
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, key: str):
+        """
+        Join the flight for key, creating it if there is none.
+
+        Returns:
+            (flight, is_leader)
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = self._flight_class()
+            self.leaders += 1
+            return flight, True
+
+    def land(self, key: str, flight):
+        """Remove a finished flight so later requests start a new one."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "upstream_requests": self.leaders,
+                "coalesced_requests": self.coalesced
+            }
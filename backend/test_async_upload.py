@@ -0,0 +1,109 @@
+"""Test async reference uploads through the Flask API (no Fish.Audio calls)"""
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+import api_server
+from job_queue import JobQueue
+from resumable_upload import UploadSessionStore
+
+print("🧪 Testing async reference uploads...")
+
+AUDIO = b"RIFF" + bytes(range(256)) * 20
+
+
+def wait_for_status(client, status_url, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        body = client.get(status_url).get_json()
+        if body["status"] in ("succeeded", "failed"):
+            return body
+        assert time.monotonic() < deadline, "Timed out waiting for the upload"
+        time.sleep(0.05)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    created = []
+
+    def upload_reference_audio(audio_file, name, filename=None, owner=None):
+        data = audio_file.read()
+        if name == "broken":
+            raise RuntimeError("Fish.Audio API request failed: 500 Server Error")
+        created.append((name, filename, data))
+        return {"model_id": f"model-{len(created)}", "duration_seconds": 12.5}
+
+    # Point the API at a private job database, upload directory and fake service
+    api_server.model_queue.stop()
+    api_server.voice_service.upload_reference_audio = upload_reference_audio
+    api_server.upload_sessions = UploadSessionStore(
+        Path(tmp) / "uploads", ttl_seconds=3600, max_bytes=1024 * 1024, max_chunk_bytes=1024 * 1024
+    )
+    api_server.model_queue = JobQueue(
+        Path(tmp) / "jobs.db",
+        handlers={"create_voice_model": api_server._create_voice_model_job},
+        workers=1,
+        poll_interval=0.05
+    )
+    api_server.model_queue.start()
+    client = api_server.app.test_client()
+
+    # Test 1: async=true answers 202 and the model is created in the background
+    print("\n1. Testing async upload...")
+    response = client.post("/api/upload-reference", data={
+        "audio": (io.BytesIO(AUDIO), "clip.wav"),
+        "name": "Grandma",
+        "async": "true"
+    })
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status_url"] == f"/api/upload-reference/{body['upload_id']}"
+    assert response.headers["Location"] == body["status_url"]
+    status = wait_for_status(client, body["status_url"])
+    assert status["status"] == "succeeded" and status["error"] is None, status
+    assert status["model_id"] == "model-1" and status["duration_seconds"] == 12.5
+    assert created == [("Grandma", "clip.wav", AUDIO)], "The worker sends the stored clip unchanged"
+    assert api_server.upload_sessions.stats()["sessions"] == 0, "The stored clip is removed afterwards"
+    print(f"   ✅ {status['upload_id']} -> {status['model_id']}")
+
+    # Test 2: Failures are reported through the status URL
+    print("\n2. Testing failed upload...")
+    response = client.post("/api/upload-reference?async=1", data={
+        "audio": (io.BytesIO(AUDIO), "clip.wav"),
+        "name": "broken"
+    })
+    assert response.status_code == 202
+    status = wait_for_status(client, response.get_json()["status_url"])
+    assert status["status"] == "failed" and "500 Server Error" in status["error"]
+    assert "model_id" not in status
+    print(f"   ✅ Failed with: {status['error']}")
+
+    # Test 3: Finalizing a resumable upload can also run in the background
+    print("\n3. Testing async finalize...")
+    session = api_server.upload_sessions.create_from_file(io.BytesIO(AUDIO), "resumed.wav", name="Resumed")
+    response = client.post(f"/api/uploads/{session['upload_id']}/finalize", json={"async": True})
+    assert response.status_code == 202
+    status = wait_for_status(client, response.get_json()["status_url"])
+    assert status["status"] == "succeeded" and created[-1] == ("Resumed", "resumed.wav", AUDIO)
+    print(f"   ✅ {status['model_id']} created from the resumable upload")
+
+    # Test 4: Unknown ids and other job kinds are not upload statuses
+    print("\n4. Testing unknown uploads...")
+    assert client.get("/api/upload-reference/does-not-exist").status_code == 404
+    synthesis = JobQueue(Path(tmp) / "jobs.db", handlers={"synthesize": lambda payload: {}}, workers=0)
+    other = synthesis.submit("synthesize", {"text": "not an upload"})
+    assert client.get(f"/api/upload-reference/{other['job_id']}").status_code == 404
+    api_server.job_queue.stop()
+    api_server.job_queue = synthesis
+    assert client.get(f"/api/jobs/{other['job_id']}").status_code == 200
+    assert client.get(f"/api/jobs/{status['upload_id']}").status_code == 404, "/api/jobs only reports synthesis"
+    print("   ✅ 404 for unknown ids and the other endpoint's jobs")
+
+    api_server.model_queue.stop()
+
+print("\n✅ Test complete!")
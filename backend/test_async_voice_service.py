@@ -0,0 +1,45 @@
+"""Test the async voice service's shape against the sync one (no Fish.Audio calls)"""
+import asyncio
+import inspect
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+from async_voice_service import AsyncVoiceServiceWrapper
+from voice_service import VoiceServiceBase, VoiceServiceWrapper
+
+print("🧪 Testing the async voice service...")
+
+service = AsyncVoiceServiceWrapper()
+
+# Test 1: Same public methods, with the I/O ones as coroutines
+print("\n1. Testing public methods...")
+public = {name for name in dir(VoiceServiceWrapper) if not name.startswith("_")}
+assert public <= set(dir(AsyncVoiceServiceWrapper)), public - set(dir(AsyncVoiceServiceWrapper))
+for name in ("synthesize", "synthesize_stream", "get_available_voices", "upload_reference_audio"):
+    assert inspect.iscoroutinefunction(getattr(service, name)), f"{name} should be a coroutine"
+assert inspect.isasyncgenfunction(service.synthesize_batch) and inspect.isasyncgenfunction(service.iter_voices)
+print(f"   ✅ {len(public)} public methods")
+
+# Test 2: Nothing sync-only is inherited
+print("\n2. Testing inheritance...")
+assert not issubclass(AsyncVoiceServiceWrapper, VoiceServiceWrapper)
+assert issubclass(AsyncVoiceServiceWrapper, VoiceServiceBase) and issubclass(VoiceServiceWrapper, VoiceServiceBase)
+for name in ("_fetch_audio", "_tee_to_disk", "_create_model", "_fetch_voices", "_start_synthesis"):
+    assert not hasattr(service, name), f"{name} needs the sync transport"
+print("   ✅ Only the shared base is inherited")
+
+# Test 3: Every stats getter works on the async service
+print("\n3. Testing stats...")
+for name in sorted(name for name in public if name.startswith("get_") and name.endswith("_stats")):
+    assert isinstance(getattr(service, name)(), dict), name
+etag, cache_control = service.output_cache_policy(f"cache/ab/{'ab' * 32}.mp3")
+assert etag == "ab" * 32 and "immutable" in cache_control
+print("   ✅ Stats and cache policy available")
+
+asyncio.run(service.aclose())
+
+print("\n✅ Test complete!")
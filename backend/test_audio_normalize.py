@@ -0,0 +1,79 @@
+"""Test reference audio normalization before upload (no Fish.Audio calls)"""
+import io
+import shutil
+import sys
+import wave
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from audio_normalize import normalize_reference, resample, trim_silence
+from config import Config
+
+print("🧪 Testing reference normalization...")
+
+
+def make_wav(samples, rate: int, channels: int = 1) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+# Test 1: Resampling keeps speech-band tones and drops what can't be represented
+print("\n1. Testing resample()...")
+t = np.arange(48000) / 48000
+tones = np.sin(2 * np.pi * 440 * t) + np.sin(2 * np.pi * 15000 * t)
+down = resample(tones.astype(np.float32), 48000, 16000)
+assert len(down) == 16000
+spectrum = np.abs(np.fft.rfft(down))
+assert spectrum[440] > 100 * spectrum[5000:].max(), "15 kHz must not alias into the 16 kHz clip"
+assert resample(down, 16000, 16000) is down
+print("   ✅ 48 kHz -> 16 kHz without aliasing")
+
+# Test 2: Leading/trailing silence is trimmed, with padding
+print("\n2. Testing trim_silence()...")
+rate = 16000
+voice = 0.5 * np.sin(2 * np.pi * 220 * np.arange(2 * rate) / rate)
+padded = np.concatenate([np.zeros(rate), voice, np.zeros(3 * rate)]).astype(np.float32)
+trimmed, seconds = trim_silence(padded, rate)
+assert 2.0 <= len(trimmed) / rate <= 2.25
+assert abs(seconds - (len(padded) - len(trimmed)) / rate) < 1e-9
+print(f"   ✅ Trimmed {seconds:.2f}s")
+
+# Test 3: Stereo 44.1 kHz WAV -> smaller mono clip at the target rate
+print("\n3. Testing normalize_reference()...")
+stereo_rate = 44100
+tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(3 * stereo_rate) / stereo_rate)
+silence = np.zeros(stereo_rate)
+mono = np.concatenate([silence, tone, silence])
+clip = make_wav(np.repeat(mono, 2), stereo_rate, channels=2)
+upload = io.BytesIO(b"xxxx" + clip)
+upload.seek(4)
+result = normalize_reference(upload, Config.REFERENCE_SAMPLE_RATE)
+assert upload.tell() == 4, "The file position must be restored"
+assert result["sample_rate"] == Config.REFERENCE_SAMPLE_RATE
+assert len(result["data"]) < len(clip)
+assert result["trimmed_seconds"] >= 1.5
+expected_format = "mp3" if shutil.which(Config.FFMPEG_BINARY) else "wav"
+assert result["format"] == expected_format
+if expected_format == "wav":
+    with wave.open(io.BytesIO(result["data"])) as w:
+        assert w.getnchannels() == 1 and w.getframerate() == Config.REFERENCE_SAMPLE_RATE
+print(f"   ✅ {len(clip)} -> {len(result['data'])} bytes ({result['format']})")
+
+# Test 4: Nothing to gain, or nothing to decode
+print("\n4. Testing clips left alone...")
+target = Config.REFERENCE_SAMPLE_RATE
+small = make_wav(0.5 * np.sin(2 * np.pi * 220 * np.arange(target) / target), target)
+if expected_format == "wav":
+    assert normalize_reference(io.BytesIO(small), target) is None, \
+        "A clip that is already mono at the target rate shouldn't be re-encoded"
+assert normalize_reference(io.BytesIO(b"not audio at all"), target) is None
+print("   ✅ None when re-encoding wouldn't help or can't decode")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,69 @@
+"""Test reference audio duration probing from WAV/MP3 headers (no Fish.Audio calls)"""
+import io
+import struct
+import sys
+import wave
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from audio_probe import probe_duration
+from mp3_frames import audio_frames, iter_frames
+
+print("🧪 Testing audio duration probe...")
+
+
+def make_wav(seconds: float, rate: int = 16000, channels: int = 1) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * channels * int(seconds * rate))
+    return out.getvalue()
+
+
+# Test 1: WAV from the fmt/data chunks
+print("\n1. Testing WAV...")
+clip = make_wav(2.5, rate=22050, channels=2)
+assert abs(probe_duration(io.BytesIO(clip)) - 2.5) < 0.001
+# A LIST chunk before data must be skipped
+riff, fmt_and_rest = clip[:12], clip[12:]
+data_at = fmt_and_rest.index(b"data")
+extra = b"LIST" + struct.pack("<I", 5) + b"INFO!" + b"\x00"  # odd size is padded
+with_list = riff + fmt_and_rest[:data_at] + extra + fmt_and_rest[data_at:]
+assert abs(probe_duration(io.BytesIO(with_list)) - 2.5) < 0.001
+# Streamed WAVs leave the data size at 0 - the bytes on disk count
+streamed = bytearray(clip)
+streamed[clip.index(b"data") + 4:clip.index(b"data") + 8] = b"\x00\x00\x00\x00"
+assert abs(probe_duration(io.BytesIO(bytes(streamed))) - 2.5) < 0.001
+print("   ✅ Plain, LIST chunk and streamed WAVs")
+
+# Test 2: MP3 against a full frame walk
+print("\n2. Testing MP3...")
+outputs = Path(__file__).parent / "outputs"
+for path in sorted(outputs.glob("voice_00*.mp3")):
+    data = path.read_bytes()
+    frames = [header for _, header in iter_frames(audio_frames(data))]
+    expected = sum(h.samples for h in frames) / frames[0].sample_rate
+    probed = probe_duration(io.BytesIO(data))
+    # A Xing/Info frame count may include the encoder's own padding frame
+    assert abs(probed - expected) <= frames[0].samples / frames[0].sample_rate + 0.001, path.name
+    print(f"   ✅ {path.name}: {probed:.2f}s")
+
+# Test 3: ID3v2 tag in front of the audio
+print("\n3. Testing ID3v2 tag...")
+data = (outputs / "voice_003.mp3").read_bytes()
+tag = b"ID3\x03\x00\x00" + bytes([0, 0, 0, 100]) + b"\x00" * 100
+assert abs(probe_duration(io.BytesIO(tag + audio_frames(data))) - probe_duration(io.BytesIO(audio_frames(data)))) < 0.001
+print("   ✅ Tag skipped")
+
+# Test 4: Unknown format and file position
+print("\n4. Testing unknown data and position...")
+assert probe_duration(io.BytesIO(b"not audio at all")) is None
+upload = io.BytesIO(b"xxxx" + clip)
+upload.seek(4)
+assert abs(probe_duration(upload) - 2.5) < 0.001
+assert upload.tell() == 4, "The file position must be restored"
+print("   ✅ None for unknown data, position restored")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,87 @@
+"""Test best-segment extraction for long reference clips (no Fish.Audio calls)"""
+import io
+import shutil
+import sys
+import wave
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from audio_segment import cut_segment, decode_pcm, extract_best_segment, find_speech_window
+from config import Config
+from mp3_frames import audio_frames, iter_frames
+
+print("🧪 Testing reference segment extraction...")
+
+RATE = 16000
+
+
+def make_wav(samples, rate: int = RATE) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+# 2 s of room noise, 3 s of "speech", 5 s of room noise
+rng = np.random.default_rng(0)
+t = np.arange(3 * RATE) / RATE
+speech = 0.5 * np.sin(2 * np.pi * 220 * t)
+clip_samples = np.concatenate([rng.normal(0, 0.001, 2 * RATE), speech, rng.normal(0, 0.001, 5 * RATE)])
+clip = make_wav(clip_samples)
+
+# Test 1: Decoding WAV block by block
+print("\n1. Testing decode_pcm()...")
+samples, rate = decode_pcm(io.BytesIO(clip))
+assert rate == RATE and len(samples) == len(clip_samples)
+assert np.allclose(samples, clip_samples, atol=1e-4)
+head, _ = decode_pcm(io.BytesIO(clip), max_seconds=1.5)
+assert len(head) == int(1.5 * RATE), "max_seconds should stop decoding early"
+print(f"   ✅ {len(samples)} samples at {rate} Hz")
+
+# Test 2: The speech window is found and trimmed
+print("\n2. Testing find_speech_window()...")
+start, end = find_speech_window(samples, rate, min_seconds=1.0, max_seconds=4.0)
+assert 1.5 <= start <= 2.0 and 5.0 <= end <= 5.5, (start, end)
+print(f"   ✅ Window {start:.2f}s - {end:.2f}s")
+
+# Test 3: extract_best_segment reads only the window back out of the file
+print("\n3. Testing extract_best_segment() on WAV...")
+upload = io.BytesIO(b"xxxx" + clip)
+upload.seek(4)
+segment, start, end = extract_best_segment(upload, 1.0, 4.0)
+assert upload.tell() == 4, "The file position must be restored"
+with wave.open(io.BytesIO(segment)) as w:
+    assert w.getframerate() == RATE
+    assert w.getnframes() == int(end * RATE) - int(start * RATE)
+print(f"   ✅ {len(segment)} bytes instead of {len(clip)}")
+
+# Test 4: MP3 is cut at frame boundaries without re-encoding
+print("\n4. Testing cut_segment() on MP3...")
+data = (Path(__file__).parent / "outputs" / "voice_001.mp3").read_bytes()
+frames = audio_frames(data)
+cut = cut_segment(io.BytesIO(data), 1.0, 2.0)
+assert cut and cut in frames, "The cut should be a run of the original frames"
+headers = [h for _, h in iter_frames(cut)]
+duration = sum(h.samples for h in headers) / headers[0].sample_rate
+assert abs(duration - 1.0) <= 2 * headers[0].samples / headers[0].sample_rate
+assert cut_segment(data, 1.0, 2.0) == cut, "bytes and file objects should cut the same"
+print(f"   ✅ {len(headers)} frames, {duration:.2f}s")
+
+# Test 5: Unknown data is left alone
+print("\n5. Testing unsupported input...")
+assert extract_best_segment(io.BytesIO(b"not audio at all"), 1.0, 4.0) is None
+if not shutil.which(Config.FFMPEG_BINARY):
+    # MP3 analysis needs ffmpeg - without it the clip is uploaded as is
+    assert extract_best_segment(io.BytesIO(data), 1.0, 4.0) is None
+    print("   ✅ None for unknown data (ffmpeg not installed, MP3 skipped)")
+else:
+    segment, start, end = extract_best_segment(io.BytesIO(data), 1.0, 4.0)
+    assert segment in frames and end - start <= 4.0
+    print(f"   ✅ None for unknown data, MP3 window {start:.2f}s - {end:.2f}s")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,90 @@
+"""Test the create and get-or-create database paths (no MongoDB server needed)"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from database import ECHO_FIELDS, DatabaseManager
+
+print("🧪 Testing database round trips...")
+
+
+class InsertResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class FakeCollection:
+    """Records every call, so each path's round trips can be counted."""
+
+    def __init__(self):
+        self.docs = []
+        self.calls = []
+        self.lose_upsert_race = False
+
+    def insert_one(self, doc):
+        self.calls.append("insert_one")
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(dict(doc))
+        return InsertResult(doc["_id"])
+
+    def find_one(self, query, projection=None):
+        self.calls.append(("find_one", projection))
+        for doc in self.docs:
+            if all(doc.get(k) == v for k, v in query.items()):
+                return dict(doc)
+        return None
+
+    def find_one_and_update(self, query, update, upsert=False, return_document=None, projection=None):
+        self.calls.append("find_one_and_update")
+        if self.lose_upsert_race:
+            # Another request inserted the same user between our match and insert
+            self.docs.append({"_id": ObjectId(), **update["$setOnInsert"], "email": "winner@example.com"})
+            raise DuplicateKeyError("E11000 duplicate key error")
+        for doc in self.docs:
+            if all(doc.get(k) == v for k, v in query.items()):
+                return dict(doc)
+        assert upsert
+        doc = {"_id": ObjectId(), **query, **update["$setOnInsert"]}
+        self.docs.append(doc)
+        return dict(doc)
+
+
+db = DatabaseManager()
+db.users, db.echos, db.voice_models = FakeCollection(), FakeCollection(), FakeCollection()
+
+# Test 1: get_or_create_user is one atomic upsert
+print("\n1. Testing get_or_create_user()...")
+user = db.get_or_create_user("auth0|alice", "alice@example.com")
+assert user["auth0_user_id"] == "auth0|alice" and "_id" in user
+again = db.get_or_create_user("auth0|alice", "changed@example.com")
+assert again["_id"] == user["_id"] and again["email"] == "alice@example.com", "$setOnInsert keeps the first email"
+assert db.users.calls == ["find_one_and_update"] * 2, "One round trip whether or not the user exists"
+db.users.lose_upsert_race = True
+racer = db.get_or_create_user("auth0|bob", "bob@example.com")
+assert racer["email"] == "winner@example.com", "A lost insert race returns the user that won"
+print(f"   ✅ Calls: {db.users.calls}")
+
+# Test 2: create_echo returns the inserted document without reading it back
+print("\n2. Testing create_echo()...")
+echo = db.create_echo(user["_id"], "Grandma", "Warm and patient", "model-1")
+assert db.echos.calls == ["insert_one"]
+stored = db.echos.docs[0]
+assert echo == stored, "The returned document is exactly what was stored"
+assert echo["created_at"].microsecond % 1000 == 0, "Timestamps are at MongoDB's millisecond precision"
+db.get_echo_for_user(user["_id"])
+assert db.echos.calls[-1] == ("find_one", ECHO_FIELDS), "Reads fetch only the returned fields"
+print(f"   ✅ Echo {echo['_id']} in one round trip")
+
+# Test 3: create_voice_model likewise
+print("\n3. Testing create_voice_model()...")
+model = db.create_voice_model(user["_id"], "model-1", "Grandma", "clip.wav",
+                              echo_id=echo["_id"], duration_seconds=12.5)
+assert db.voice_models.calls == ["insert_one"]
+assert model == db.voice_models.docs[0] and model["duration_seconds"] == 12.5
+assert model["created_at"].microsecond % 1000 == 0
+print(f"   ✅ Voice model {model['_id']} in one round trip")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,136 @@
+"""Test the in-process conversation history cache (no MongoDB server needed)"""
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from history_cache import MESSAGE_OVERHEAD_BYTES, ChangeStreamInvalidator, HistoryCache
+
+print("🧪 Testing conversation history cache...")
+
+
+def messages(echo_id, count, start=0):
+    return [{"_id": f"{echo_id}-{i}", "echo_id": echo_id, "content": f"message {i}"}
+            for i in range(start, start + count)]
+
+
+# Test 1: Hits, misses and the ring buffer
+print("\n1. Testing get/fill/append...")
+cache = HistoryCache(capacity=5, max_bytes=1_000_000)
+assert cache.get("echo-1", 3) is None
+cache.fill("echo-1", messages("echo-1", 3), complete=True, generation=cache.generation("echo-1"))
+assert [m["_id"] for m in cache.get("echo-1", 10)] == ["echo-1-0", "echo-1-1", "echo-1-2"], \
+    "A complete short history answers any limit"
+for message in messages("echo-1", 4, start=3):
+    cache.append("echo-1", message)
+assert [m["_id"] for m in cache.get("echo-1", 5)] == [f"echo-1-{i}" for i in range(2, 7)]
+assert cache.get("echo-1", 6) is None, "Older messages fell out of the ring buffer"
+returned = cache.get("echo-1", 1)
+returned[0]["content"] = "changed by the caller"
+assert cache.get("echo-1", 1)[0]["content"] == "message 6", "Callers get copies"
+print(f"   ✅ Stats: {cache.stats()}")
+
+# Test 2: A slow load can't overwrite a newer write or an invalidation
+print("\n2. Testing generations...")
+cache = HistoryCache(capacity=5, max_bytes=1_000_000)
+generation = cache.generation("echo-1")               # a read starts...
+cache.append("echo-1", messages("echo-1", 1, start=9)[0])  # ...a message is written
+cache.fill("echo-1", messages("echo-1", 3), complete=True, generation=generation)
+assert cache.get("echo-1", 1) is None, "The stale load must be discarded"
+generation = cache.generation("echo-1")
+cache.invalidate("echo-1")
+cache.fill("echo-1", messages("echo-1", 3), complete=True, generation=generation)
+assert cache.get("echo-1", 1) is None
+cache.fill("echo-1", messages("echo-1", 3), complete=True, generation=cache.generation("echo-1"))
+assert cache.get("echo-1", 1) is not None
+print("   ✅ Stale loads discarded")
+
+# Test 3: LRU eviction against the byte budget
+print("\n3. Testing eviction...")
+per_echo = 3 * (sys.getsizeof("message 0") + MESSAGE_OVERHEAD_BYTES)
+cache = HistoryCache(capacity=5, max_bytes=2 * per_echo)
+for echo_id in ("a", "b"):
+    cache.fill(echo_id, messages(echo_id, 3), complete=True, generation=0)
+cache.get("a", 1)  # a is now most recently used
+cache.fill("c", messages("c", 3), complete=True, generation=0)
+assert cache.get("b", 1) is None and cache.get("a", 1) is not None
+assert cache.stats()["bytes"] <= 2 * per_echo
+print(f"   ✅ Evictions: {cache.stats()['evictions']}")
+
+# Test 4: Change stream invalidation from other processes
+print("\n4. Testing change stream invalidation...")
+
+
+class FakeStream:
+    def __init__(self, changes, fail_after):
+        self.changes = changes
+        self.fail_after = fail_after
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for i, change in enumerate(self.changes):
+            self.resume_token = {"_data": str(i)}
+            yield change
+        if self.fail_after:
+            raise ConnectionError("change stream lost")
+        time.sleep(60)
+
+    def close(self):
+        pass
+
+
+class FakeCollection:
+    def __init__(self, streams):
+        self.streams = streams
+        self.resumed_after = []
+        self.done = threading.Event()
+
+    def watch(self, resume_after=None):
+        self.resumed_after.append(resume_after)
+        if len(self.streams) == 1:
+            self.done.set()
+        return self.streams.pop(0)
+
+
+cache = HistoryCache(capacity=5, max_bytes=1_000_000)
+for echo_id in ("mine", "theirs", "other"):
+    cache.fill(echo_id, messages(echo_id, 2), complete=True, generation=0)
+own_write = messages("mine", 1, start=2)[0]
+cache.append("mine", own_write)
+collection = FakeCollection([
+    FakeStream([
+        {"operationType": "insert", "fullDocument": own_write},
+        {"operationType": "insert", "fullDocument": messages("theirs", 1, start=2)[0]},
+    ], fail_after=True),
+    FakeStream([], fail_after=False),
+])
+invalidator = ChangeStreamInvalidator(collection, cache)
+invalidator.RETRY_SECONDS = 0.05
+cached_before_failure = []
+original_invalidate = cache.invalidate
+
+
+def record(echo_id=None):
+    if echo_id is None:
+        cached_before_failure.extend(e for e in ("mine", "theirs", "other") if cache.get(e, 1) is not None)
+    original_invalidate(echo_id)
+
+
+cache.invalidate = record
+invalidator.start()
+assert collection.done.wait(5), "The invalidator should reconnect"
+invalidator.stop()
+assert cached_before_failure == ["mine", "other"], \
+    "Our own write is kept, another process's write drops that Echo"
+assert cache.stats()["echoes"] == 0, "A lost stream clears everything"
+assert collection.resumed_after == [None, {"_data": "1"}], "The stream resumes where it left off"
+print(f"   ✅ Stats: {cache.stats()}")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,135 @@
+"""Test the Fish.Audio transport's retry rules (no Fish.Audio calls)"""
+import asyncio
+import io
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from http_transport import AsyncFishAudioTransport, FishAudioTransport
+
+print("🧪 Testing Fish.Audio transport retries...")
+
+
+class ScriptedAdapter(BaseAdapter):
+    """Answers each request with the next scripted status code or exception."""
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = list(script)
+        self.bodies = []
+
+    def send(self, request, **kwargs):
+        body = request.body
+        self.bodies.append(body.read() if hasattr(body, "read") else body)
+        outcome = self.script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.raw = io.BytesIO(b"{}")
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def transport_with(script):
+    transport = FishAudioTransport("test-key", max_retries=2, backoff_base=0)
+    adapter = ScriptedAdapter(script)
+    transport.session.mount("https://", adapter)
+    return transport, adapter
+
+
+URL = "https://api.fish.audio/v1/tts"
+
+# Test 1: Idempotent requests are retried on retryable statuses and read failures
+print("\n1. Testing idempotent retries...")
+transport, adapter = transport_with([503, requests.exceptions.ReadTimeout("slow"), 200])
+assert transport.get(URL).status_code == 200
+assert len(adapter.bodies) == 3
+transport, adapter = transport_with([503, 503, 503])
+assert transport.get(URL).status_code == 503, "Gives up after max_retries and returns the last response"
+assert len(adapter.bodies) == 3
+assert transport.stats()["retries"] == 2
+print(f"   ✅ Stats: {transport.stats()['requests']} requests, {transport.stats()['retries']} retries")
+
+# Test 2: POSTs are not retried once they may have reached the server
+print("\n2. Testing non-idempotent requests...")
+transport, adapter = transport_with([503])
+assert transport.post(URL, json={"text": "hi"}).status_code == 503
+assert len(adapter.bodies) == 1
+transport, adapter = transport_with([requests.exceptions.ReadTimeout("slow")])
+try:
+    transport.post(URL, json={"text": "hi"})
+    raise AssertionError("A timed-out POST must not be resent")
+except requests.exceptions.ReadTimeout:
+    pass
+assert len(adapter.bodies) == 1 and transport.stats()["failures"] == 1
+transport, adapter = transport_with([502, 200])
+assert transport.post(URL, json={"text": "hi"}, idempotent=True).status_code == 200
+print("   ✅ Only retried when marked idempotent")
+
+# Test 3: Connect failures are left to urllib3 (already retried there)
+print("\n3. Testing connect failures...")
+# How requests reports a connect failure urllib3 has already retried
+refused = requests.exceptions.ConnectionError(MaxRetryError(None, URL, NewConnectionError(None, "refused")))
+transport, adapter = transport_with([refused, 200])
+try:
+    transport.get(URL)
+    raise AssertionError("Connect failures surface once urllib3 has given up")
+except requests.exceptions.ConnectionError:
+    pass
+assert len(adapter.bodies) == 1
+transport, adapter = transport_with([requests.exceptions.ConnectionError("reset by peer"), 200])
+assert transport.get(URL).status_code == 200, "A dropped connection is a read failure"
+print("   ✅ No double retries")
+
+# Test 4: Uploaded files are rewound before a retry
+print("\n4. Testing file rewind...")
+transport, adapter = transport_with([503, 200])
+upload = io.BytesIO(b"RIFF-audio")
+response = transport.post(URL, files={"voices": ("a.wav", upload, "audio/wav")}, idempotent=True)
+assert response.status_code == 200
+assert all(b"RIFF-audio" in body for body in adapter.bodies), "The retry must send the whole file again"
+print("   ✅ Retry resent the whole file")
+
+# Test 5: The async transport follows the same rules
+print("\n5. Testing AsyncFishAudioTransport...")
+
+
+async def run_async(script, method, **kwargs):
+    transport = AsyncFishAudioTransport("test-key", max_retries=2, backoff_base=0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        outcome = script.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json={})
+
+    await transport.client.aclose()
+    transport.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    try:
+        response = await transport.request(method, URL, **kwargs)
+        return response.status_code, len(calls)
+    except httpx.HTTPError as e:
+        return type(e).__name__, len(calls)
+    finally:
+        await transport.aclose()
+
+
+assert asyncio.run(run_async([503, httpx.ReadError("reset"), 200], "GET")) == (200, 3)
+assert asyncio.run(run_async([503], "POST", json={})) == (503, 1)
+assert asyncio.run(run_async([httpx.ReadTimeout("slow")], "POST", json={})) == ("ReadTimeout", 1)
+assert asyncio.run(run_async([httpx.ConnectError("refused"), 200], "GET")) == ("ConnectError", 1)
+assert asyncio.run(run_async([502, 200], "POST", json={}, idempotent=True)) == (200, 2)
+print("   ✅ Same retry rules")
+
+print("\n✅ Test complete!")
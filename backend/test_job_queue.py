@@ -0,0 +1,197 @@
+"""Test the persistent background job queue (no Fish.Audio calls)"""
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import job_queue
+from job_queue import JobQueue, check_callback_url
+
+print("🧪 Testing background job queue...")
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out waiting for the queue"
+        time.sleep(0.02)
+
+
+def fail(payload):
+    raise RuntimeError(f"cannot synthesize {payload['text']!r}")
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    db_path = Path(tmp) / "jobs.db"
+    release = threading.Event()
+    ran = []
+
+    def synthesize(payload):
+        release.wait(5)
+        ran.append(payload["text"])
+        return {"audio_url": f"/outputs/{payload['text']}.mp3"}
+
+    queue = JobQueue(db_path, {"synthesize": synthesize, "fail": fail},
+                     workers=1, poll_interval=0.05, lease_seconds=0.6, retention_seconds=60)
+    queue.start()
+
+    # Test 1: Jobs run and record their result or error
+    print("\n1. Testing submit and run...")
+    job = queue.submit("synthesize", {"text": "hello"})
+    assert job["status"] in ("queued", "running")
+    wait_for(lambda: queue.get(job["job_id"])["status"] == "running")
+    print("   ✅ Job claimed")
+
+    # Test 2: Another queue on the same database leaves running jobs alone
+    print("\n2. Testing a second queue...")
+    models = JobQueue(db_path, {"create_model": lambda payload: {}}, workers=1, poll_interval=0.05)
+    models.start()
+    time.sleep(0.9)  # longer than the lease - it must have been renewed
+    assert queue.get(job["job_id"])["status"] == "running", "A new queue must not re-queue running jobs"
+    release.set()
+    wait_for(lambda: queue.get(job["job_id"])["status"] == "succeeded")
+    assert queue.get(job["job_id"])["result"] == {"audio_url": "/outputs/hello.mp3"}
+    assert ran == ["hello"], "The job must run exactly once"
+    failed = queue.submit("fail", {"text": "oops"})
+    wait_for(lambda: queue.get(failed["job_id"])["status"] == "failed")
+    assert "oops" in queue.get(failed["job_id"])["error"]
+    print(f"   ✅ Stats: {queue.stats()}")
+
+    # Test 3: A job left running by a crashed process is picked up after its lease
+    print("\n3. Testing crash recovery...")
+    conn = sqlite3.connect(str(db_path))
+    now = time.time()
+    conn.execute(
+        "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at, owner, lease_until) "
+        "VALUES ('crashed', 'synthesize', 'running', '{\"text\": \"again\"}', ?, ?, 'dead-host:1:x', ?)",
+        (now, now, now + 0.5)
+    )
+    conn.execute(
+        "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) "
+        "VALUES ('legacy', 'synthesize', 'running', '{\"text\": \"legacy\"}', ?, ?)",
+        (now, now)
+    )
+    conn.commit()
+    conn.close()
+    wait_for(lambda: queue.get("legacy")["status"] == "succeeded")
+    assert queue.get("crashed")["status"] == "running", "An unexpired lease must be respected"
+    wait_for(lambda: queue.get("crashed")["status"] == "succeeded")
+    assert ran == ["hello", "legacy", "again"]
+    print("   ✅ Expired and pre-lease jobs reclaimed, live lease respected")
+
+    # Test 4: A worker that lost its lease doesn't overwrite the new owner's result
+    print("\n4. Testing lost lease...")
+    other = JobQueue(db_path, {"synthesize": synthesize}, workers=0)
+    late = queue.submit("synthesize", {"text": "late"})
+    wait_for(lambda: queue.get(late["job_id"])["status"] == "succeeded")
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("UPDATE jobs SET status = 'running', owner = ? WHERE id = ?", (other.owner, late["job_id"]))
+    conn.commit()
+    conn.close()
+    assert not queue._complete(late["job_id"], error="stale worker")
+    assert other._complete(late["job_id"], result={"audio_url": "/outputs/late.mp3"})
+    assert queue.get(late["job_id"])["error"] is None
+    print("   ✅ Stale result discarded")
+
+    # Test 5: Finished jobs are deleted after the retention period
+    print("\n5. Testing sweep()...")
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("UPDATE jobs SET updated_at = ? WHERE id IN ('crashed', 'legacy')", (time.time() - 120,))
+    conn.execute(
+        "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) "
+        "VALUES ('old-model', 'create_model', 'succeeded', '{}', 0, 0)"
+    )
+    conn.commit()
+    conn.close()
+    assert queue.sweep() == 2
+    assert queue.get("crashed") is None and queue.get(job["job_id"]) is not None
+    assert queue.get("old-model") is not None, "Only the queue's own kinds are swept"
+    assert models.sweep() == 0, "retention_seconds=0 keeps jobs forever"
+    print("   ✅ Old finished jobs deleted")
+
+    queue.stop()
+    models.stop()
+
+    # Test 6: Callback URLs can't reach internal services
+    print("\n6. Testing callback URL checks...")
+    for url in ("http://127.0.0.1:5000/admin", "http://localhost/", "http://169.254.169.254/latest/meta-data",
+                "http://10.0.0.5/hook", "http://[::1]/", "http://[::ffff:192.168.1.1]/", "http://0.0.0.0/",
+                "ftp://example.com/hook", "not a url"):
+        try:
+            check_callback_url(url)
+            raise AssertionError(f"{url} should be refused")
+        except ValueError:
+            pass
+    check_callback_url("https://8.8.8.8/hook")
+    check_callback_url("https://hooks.example.com/echo", {"hooks.example.com"})
+    try:
+        check_callback_url("https://8.8.8.8/hook", {"hooks.example.com"})
+        raise AssertionError("Hosts outside the allowlist should be refused")
+    except ValueError:
+        pass
+    try:
+        queue.submit("synthesize", {"text": "x"}, callback_url="http://127.0.0.1/")
+        raise AssertionError("submit() should refuse internal callbacks")
+    except ValueError:
+        pass
+    print("   ✅ Internal targets refused, allowlist honoured")
+
+    # Test 7: get() can be limited to some kinds
+    print("\n7. Testing get() by kind...")
+    assert queue.get(job["job_id"], kinds=("synthesize",))["job_id"] == job["job_id"]
+    assert queue.get(job["job_id"], kinds=("create_model",)) is None
+    assert queue.get("old-model", kinds=("synthesize",)) is None
+    print("   ✅ Other kinds are reported as missing")
+
+    # Test 8: A host that re-resolves to an internal address after the check (DNS rebinding)
+    print("\n8. Testing callbacks against DNS rebinding...")
+    received = []
+
+    class Hook(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append(self.headers["Host"])
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Hook)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    answers = []
+    real_getaddrinfo = socket.getaddrinfo
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        if host == "hooks.example.com":
+            host = answers.pop(0)
+        return real_getaddrinfo(host, *args, **kwargs)
+
+    job_queue.socket.getaddrinfo = rebinding_getaddrinfo
+    try:
+        hooks = JobQueue(db_path, handlers={"synthesize": lambda payload: {}}, workers=0)
+        answers.append("8.8.8.8")
+        hooked = hooks.submit("synthesize", {"text": "x"}, callback_url=f"http://hooks.example.com:{port}/done")
+        answers.append("127.0.0.1")  # the attacker's DNS now answers with loopback
+        hooks._send_callback(hooked["job_id"], f"http://hooks.example.com:{port}/done")
+        assert received == [], "The POST must not reach the internal address"
+        assert answers == [], "The host is checked at connect time"
+
+        # With an allowlist the operator vouches for the host, wherever it resolves
+        trusted = JobQueue(db_path, handlers={"synthesize": lambda payload: {}}, workers=0,
+                           callback_allowed_hosts={"hooks.example.com"})
+        answers.append("127.0.0.1")
+        trusted._send_callback(hooked["job_id"], f"http://hooks.example.com:{port}/done")
+        assert received == [f"hooks.example.com:{port}"]
+    finally:
+        job_queue.socket.getaddrinfo = real_getaddrinfo
+        server.shutdown()
+    print("   ✅ Checked address is the one connected to")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,31 @@
+"""Test long-text chunking and MP3 frame stitching (no Fish.Audio calls)"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from mp3_frames import audio_frames, concat_mp3, iter_frames
+from text_chunker import split_text
+
+print("🧪 Testing long-text synthesis helpers...")
+
+# Test 1: Sentence chunking with a short first chunk
+print("\n1. Testing text chunking...")
+text = ("I remember the summer we spent by the lake, the long evenings, "
+        "and the way you laughed at everything. ") * 8
+chunks = split_text(text, first_chunk_chars=60, max_chunk_chars=250)
+assert len(chunks[0]) <= 60, "First chunk should be short"
+assert all(len(c) <= 250 for c in chunks)
+assert " ".join(chunks).split() == text.split(), "Chunking must not lose or reorder words"
+print(f"   ✅ {len(chunks)} chunks, first chunk: {chunks[0]!r}")
+
+# Test 2: Joining generated clips at frame boundaries
+print("\n2. Testing MP3 stitching...")
+outputs = Path(__file__).parent / "outputs"
+clips = [(outputs / name).read_bytes() for name in ("voice_001.mp3", "voice_003.mp3")]
+joined = concat_mp3(clips)
+expected_frames = sum(len(list(iter_frames(audio_frames(c)))) for c in clips)
+assert len(list(iter_frames(joined))) == expected_frames
+assert len(joined) == sum(len(audio_frames(c)) for c in clips)
+print(f"   ✅ Joined {len(clips)} clips into {expected_frames} frames ({len(joined)} bytes)")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,133 @@
+"""Test keyset pagination of conversation history (no MongoDB server needed)"""
+import datetime
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bson.objectid import ObjectId
+
+from database import DatabaseManager, decode_cursor, encode_cursor
+
+print("🧪 Testing conversation paging...")
+
+
+def as_utc(value):
+    # pymongo hands back naive UTC datetimes
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = as_utc(doc[field])
+            for op, bound in condition.items():
+                if op == "$lt" and not value < as_utc(bound):
+                    return False
+                if op == "$gt" and not value > as_utc(bound):
+                    return False
+        elif as_utc(doc.get(field)) != as_utc(condition):
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        for field, direction in reversed(spec):
+            self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeMessages:
+    """find().sort().limit() over an in-memory list, like the messages collection."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+
+# Test 1: Cursors round-trip and reject garbage
+print("\n1. Testing cursors...")
+message = {"_id": ObjectId(), "created_at": datetime.datetime(2026, 1, 2, 3, 4, 5, 678000)}
+created_at, object_id = decode_cursor(encode_cursor(message))
+assert object_id == message["_id"]
+assert created_at == message["created_at"].replace(tzinfo=datetime.timezone.utc), "Naive datetimes are UTC"
+aware = dict(message, created_at=created_at)
+assert encode_cursor(aware) == encode_cursor(message)
+assert "=" not in encode_cursor(message), "Cursors are URL-safe without padding"
+for bad in ("", "not-a-cursor", encode_cursor(message)[:-4], "MTIzOm5vdC1hbi1pZA"):
+    try:
+        decode_cursor(bad)
+        raise AssertionError(f"{bad!r} should be rejected")
+    except ValueError:
+        pass
+print(f"   ✅ {encode_cursor(message)}")
+
+# Test 2: Paging back and forward through a conversation
+print("\n2. Testing get_message_page()...")
+echo_id, other_echo = ObjectId(), ObjectId()
+base = datetime.datetime(2026, 1, 1)
+docs = [
+    # Pairs of messages share a timestamp - the _id tiebreak keeps paging exact
+    {"_id": ObjectId(), "echo_id": echo_id, "role": "user", "content": f"message {i}",
+     "created_at": base + datetime.timedelta(seconds=i // 2)}
+    for i in range(25)
+]
+docs.append({"_id": ObjectId(), "echo_id": other_echo, "role": "user", "content": "elsewhere",
+             "created_at": base})
+db = DatabaseManager()
+db.messages = FakeMessages(docs)
+
+seen = []
+page = db.get_message_page(echo_id, limit=10)
+while True:
+    contents = [m["content"] for m in page["messages"]]
+    assert contents == sorted(contents, key=lambda c: int(c.split()[1])), "Each page is chronological"
+    seen = contents + seen
+    if not page["next_cursor"]:
+        break
+    page = db.get_message_page(echo_id, limit=10, before=page["next_cursor"])
+assert seen == [f"message {i}" for i in range(25)], "Every message exactly once, none from other Echoes"
+
+oldest = db.get_message_page(echo_id, limit=10, before=encode_cursor(docs[10]))
+assert [m["content"] for m in oldest["messages"]] == [f"message {i}" for i in range(10)]
+assert oldest["next_cursor"] is None
+newer = db.get_message_page(echo_id, limit=10, after=encode_cursor(docs[9]))
+assert [m["content"] for m in newer["messages"]] == [f"message {i}" for i in range(10, 20)]
+assert decode_cursor(newer["next_cursor"])[1] == docs[19]["_id"]
+last = db.get_message_page(echo_id, limit=10, after=newer["next_cursor"])
+assert [m["content"] for m in last["messages"]] == [f"message {i}" for i in range(20, 25)]
+assert last["next_cursor"] is None
+print(f"   ✅ {len(seen)} messages over {len(db.messages.queries)} queries")
+
+# Test 3: Every query is bounded by echo_id and the cursor
+print("\n3. Testing queries...")
+assert all(query["echo_id"] == echo_id for query in db.messages.queries)
+bounded = [query for query in db.messages.queries if "$or" in query]
+assert len(bounded) == len(db.messages.queries) - 1, "Only the first page has no cursor bound"
+try:
+    db.get_message_page(echo_id, before=encode_cursor(docs[5]), after=encode_cursor(docs[9]))
+    raise AssertionError("before and after together should be refused")
+except ValueError:
+    pass
+print("   ✅ Keyset bounds on every page after the first")
+
+print("\n✅ Test complete!")
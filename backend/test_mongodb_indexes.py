@@ -0,0 +1,101 @@
+"""Test index creation, drift reports and the message query shape (no MongoDB server needed)"""
+import datetime
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from bson.objectid import ObjectId
+
+from database import INDEXES, ensure_indexes, message_page_query
+
+print("🧪 Testing MongoDB indexes...")
+
+
+class FakeCollection:
+    """index_information() / create_index() like pymongo's Collection."""
+
+    def __init__(self):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        self.refuse = set()
+
+    def index_information(self):
+        return {name: dict(info) for name, info in self.indexes.items()}
+
+    def create_index(self, keys, name, **options):
+        if name in self.refuse:
+            raise RuntimeError("E11000 duplicate key error")
+        self.indexes[name] = {"key": list(keys), **options}
+        return name
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def names(collection):
+    return sorted(options["name"] for _, options in INDEXES[collection])
+
+
+# Test 1: A fresh database gets every index, and a second run changes nothing
+print("\n1. Testing a fresh database...")
+db = FakeDatabase()
+report = ensure_indexes(db)
+assert not report["drift"]
+for collection, status in report["collections"].items():
+    assert sorted(status["created"]) == names(collection)
+assert db["users"].indexes["auth0_user_id_unique"]["unique"] is True
+report = ensure_indexes(db)
+assert not report["drift"] and all(not s["created"] for s in report["collections"].values())
+assert sorted(report["collections"]["voice_models"]["ok"]) == names("voice_models")
+print(f"   ✅ Created {sum(len(names(c)) for c in INDEXES)} indexes, idempotent")
+
+# Test 2: Drift is reported, never repaired by dropping indexes
+print("\n2. Testing drift...")
+db = FakeDatabase()
+ensure_indexes(db)
+db["voice_models"].indexes["model_id_unique"]["unique"] = False      # lost its unique flag
+db["echos"].indexes["user_id"]["key"] = [("user_id", -1)]            # same name, other keys
+db["echos"].indexes["by_name"] = {"key": [("name", 1)]}              # not ours
+db["users"].indexes["my_auth0"] = db["users"].indexes.pop("auth0_user_id_unique")  # renamed by hand
+report = ensure_indexes(db)
+collections = report["collections"]
+assert report["drift"]
+assert collections["voice_models"]["changed"] == ["model_id_unique"]
+assert collections["echos"]["changed"] == ["user_id"] and collections["echos"]["unexpected"] == ["by_name"]
+assert collections["users"]["ok"] == ["my_auth0"], "Indexes are matched by key pattern, not name"
+assert "by_name" in db["echos"].indexes and db["echos"].indexes["user_id"]["key"] == [("user_id", -1)]
+print(f"   ✅ voice_models: {collections['voice_models']}")
+
+# Test 3: Report-only mode and failed builds
+print("\n3. Testing create=False and failures...")
+db = FakeDatabase()
+report = ensure_indexes(db, create=False)
+assert report["drift"] and sorted(report["collections"]["messages"]["missing"]) == names("messages")
+assert db["messages"].indexes.keys() == {"_id_"}, "check-only must not create anything"
+db["users"].refuse.add("auth0_user_id_unique")
+report = ensure_indexes(db)
+failed = report["collections"]["users"]["failed"]
+assert report["drift"] and failed[0]["name"] == "auth0_user_id_unique" and "E11000" in failed[0]["error"]
+assert not report["collections"]["messages"]["failed"], "One failed build doesn't stop the others"
+print(f"   ✅ Failed build reported: {failed[0]['error']}")
+
+# Test 4: Message queries run on the messages index
+print("\n4. Testing message_page_query()...")
+(index_keys, _), = INDEXES["messages"]
+echo_id, object_id = ObjectId(), ObjectId()
+created_at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+query, sort = message_page_query(echo_id)
+assert query == {"echo_id": echo_id} and sort == index_keys[1:], "Newest first walks the index forwards"
+query, sort = message_page_query(echo_id, (created_at, object_id), newest_first=False)
+assert sort == [(field, -direction) for field, direction in index_keys[1:]], "Oldest first walks it backwards"
+assert query["$or"] == [
+    {"created_at": {"$gt": created_at}},
+    {"created_at": created_at, "_id": {"$gt": object_id}}
+]
+query, _ = message_page_query(echo_id, (created_at, object_id))
+assert query["$or"][0] == {"created_at": {"$lt": created_at}}
+print("   ✅ Sorts match (echo_id, created_at, _id), keyset bounds in both directions")
+
+print("\n✅ Test complete!")
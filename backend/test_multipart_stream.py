@@ -0,0 +1,72 @@
+"""Test streaming multipart/form-data bodies (no Fish.Audio calls)"""
+import asyncio
+import io
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from urllib3 import encode_multipart_formdata
+
+from multipart_stream import MultipartStream, file_size
+
+print("🧪 Testing multipart streaming...")
+
+audio = (Path(__file__).parent / "outputs" / "voice_001.mp3").read_bytes()
+fields = {"title": "Mom's voice", "visibility": "private", "type": "tts"}
+
+
+def body_for(fileobj):
+    return MultipartStream(fields, {"voices": ('clip "1".mp3', fileobj, "audio/mpeg")})
+
+
+def encoded(body):
+    """What requests/urllib3 build in memory for the same form and boundary."""
+    return encode_multipart_formdata(
+        list(fields.items()) + [("voices", ('clip "1".mp3', audio, "audio/mpeg"))],
+        boundary=body.boundary
+    )
+
+
+# Test 1: Same bytes as requests/urllib3 build in memory
+print("\n1. Testing body encoding...")
+body = body_for(io.BytesIO(audio))
+expected, content_type = encoded(body)
+streamed = body.read()
+assert streamed == expected, "Streamed body should match urllib3's encoding"
+assert len(body) == len(expected), "Content-Length must be known up front"
+assert body.content_type == content_type
+print(f"   ✅ {len(streamed)} bytes, boundary {body.boundary}")
+
+# Test 2: Arbitrary read sizes reassemble the same body
+print("\n2. Testing chunked reads...")
+for size in (1, 7, 1000, 64 * 1024):
+    body = body_for(io.BytesIO(audio))
+    chunks = list(iter(lambda: body.read(size), b""))
+    assert all(len(c) <= size for c in chunks)
+    assert b"".join(chunks) == encoded(body)[0], f"Reads of {size} bytes should reassemble the body"
+print("   ✅ Every read size gives the same bytes")
+
+# Test 3: File parts start at the file's current position
+print("\n3. Testing partially read files...")
+upload = io.BytesIO(b"JUNK" + audio)
+upload.seek(4)
+assert file_size(upload) == len(audio)
+assert upload.tell() == 4, "file_size() must restore the position"
+body = body_for(upload)
+assert body.read() == encoded(body)[0]
+print("   ✅ Leading bytes skipped")
+
+# Test 4: Async iteration for httpx
+print("\n4. Testing aiter_chunks()...")
+
+
+async def collect(body):
+    return [chunk async for chunk in body.aiter_chunks()]
+
+
+body = body_for(io.BytesIO(audio))
+chunks = asyncio.run(collect(body))
+assert b"".join(chunks) == encoded(body)[0]
+print(f"   ✅ {len(chunks)} chunks")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,77 @@
+"""Test sequential output filename allocation (no Fish.Audio calls)"""
+import sys
+import tempfile
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from output_allocator import OutputFileAllocator
+
+print("🧪 Testing output file allocator...")
+
+with tempfile.TemporaryDirectory() as tmp:
+    outputs = Path(tmp)
+
+    # Test 1: Continues after files from before the allocator existed
+    print("\n1. Testing migration from existing files...")
+    (outputs / "voice_004.mp3").write_bytes(b"old")
+    (outputs / "readme.txt").write_text("not audio")
+    shard = outputs / OutputFileAllocator.shard("voice_009.wav")
+    shard.mkdir()
+    (shard / "voice_009.wav").write_bytes(b"old")
+    allocator = OutputFileAllocator(outputs)
+    first = allocator.allocate()
+    assert first.name == "voice_010.mp3"
+    assert first.parent.name == OutputFileAllocator.shard("voice_010.mp3"), "Files go in their hash shard"
+    assert first.exists() and first.stat().st_size == 0, "The file is reserved on disk"
+    print(f"   ✅ First file: {first.relative_to(outputs)}")
+
+    # Test 2: Shards are stable two-digit hash prefixes
+    print("\n2. Testing shard()...")
+    names = [f"voice_{n:03d}.mp3" for n in range(1, 2000)]
+    shards = {OutputFileAllocator.shard(name) for name in names}
+    assert all(len(s) == 2 and int(s, 16) >= 0 for s in shards)
+    assert len(shards) > 200, "Names should spread over (nearly) all 256 shards"
+    assert OutputFileAllocator.shard("voice_001.mp3") == OutputFileAllocator.shard("voice_001.mp3")
+    print(f"   ✅ {len(names)} names over {len(shards)} shards")
+
+    # Test 3: The counter survives a restart
+    print("\n3. Testing counter file...")
+    assert (outputs / OutputFileAllocator.COUNTER_FILE).read_text() == "11"
+    restarted = OutputFileAllocator(outputs)
+    assert restarted.allocate().name == "voice_011.mp3"
+    print("   ✅ Counter reloaded")
+
+    # Test 4: Two allocators (processes) never hand out the same file
+    print("\n4. Testing concurrent allocators...")
+    a, b = OutputFileAllocator(outputs), OutputFileAllocator(outputs)
+    claimed = []
+    lock = threading.Lock()
+
+    def claim(allocator):
+        for _ in range(50):
+            path = allocator.allocate()
+            with lock:
+                claimed.append(path.name)
+
+    threads = [threading.Thread(target=claim, args=(alloc,)) for alloc in (a, b, a, b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(claimed) == len(set(claimed)) == 200, "Exclusive create keeps names unique"
+    print(f"   ✅ {len(claimed)} unique files from two allocators")
+
+    # Test 5: A corrupt counter falls back to safe allocation
+    print("\n5. Testing release() and a corrupt counter...")
+    path = allocator.allocate()
+    allocator.release(path)
+    allocator.release(path)  # already gone - no error
+    assert not path.exists()
+    (outputs / OutputFileAllocator.COUNTER_FILE).write_text("garbage")
+    recovered = OutputFileAllocator(outputs).allocate()
+    assert recovered.name not in claimed and recovered.exists()
+    assert not any(p.name.endswith(".tmp") for p in outputs.iterdir()), "Temp counter files are cleaned up"
+    print(f"   ✅ Recovered with {recovered.name}")
+
+print("\n✅ Test complete!")
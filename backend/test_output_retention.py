@@ -0,0 +1,110 @@
+"""Test retention of generated audio in the output directory (no Fish.Audio calls)"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from output_retention import OutputRetention
+
+print("🧪 Testing output retention...")
+
+
+def write(outputs, rel, size=1000, age=0.0):
+    path = outputs / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+    if age:
+        os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def files(outputs):
+    return sorted(p.relative_to(outputs).as_posix() for p in outputs.rglob("*.mp3"))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    outputs = Path(tmp)
+
+    # Test 1: Sweeps delete expired clips, then least-recently-served ones
+    print("\n1. Testing sweep()...")
+    retention = OutputRetention(outputs, max_age_seconds=3600, max_bytes=3500)
+    for name in ("a", "b", "c"):
+        retention.add(write(outputs, f"0{name}/voice_001.mp3"))
+        time.sleep(0.01)
+    retention.add(write(outputs, "cache/ab/key.mp3"))  # the TTS cache manages itself
+    retention.add(write(outputs, "voice_001.mp3"))  # checked-in samples are left alone
+    assert retention.stats()["files"] == 3 and retention.stats()["bytes"] == 3000
+    assert retention.sweep() == 0
+
+    retention.touch("0a/voice_001.mp3")  # now b is the least recently served
+    retention.touch("voice_001.mp3")
+    retention.add(write(outputs, "0d/voice_001.mp3"))
+    assert retention.sweep() == 1
+    assert files(outputs) == ["0a/voice_001.mp3", "0c/voice_001.mp3", "0d/voice_001.mp3",
+                              "cache/ab/key.mp3", "voice_001.mp3"]
+
+    retention.max_age_seconds = 0.05
+    time.sleep(0.1)
+    retention.touch("0d/voice_001.mp3")
+    assert retention.sweep() == 2, "Clips not served within max_age are deleted"
+    stats = retention.stats()
+    assert files(outputs) == ["0d/voice_001.mp3", "cache/ab/key.mp3", "voice_001.mp3"]
+    assert stats["files"] == 1 and stats["bytes"] == 1000
+    assert stats["sweeps"] == 3 and stats["evicted_files"] == 3 and stats["evicted_bytes"] == 3000
+    retention.stop()
+    print(f"   ✅ {stats['evicted_files']} files evicted, oldest first")
+
+    # Test 2: Startup reconciles the index with the shard directories
+    print("\n2. Testing reconcile on startup...")
+    write(outputs, "1e/voice_001.mp3", age=60)  # written just before a crash
+    write(outputs, "1e/notes.txt")  # not audio
+    (outputs / "0d" / "voice_001.mp3").unlink()  # deleted by hand
+    retention = OutputRetention(outputs, max_age_seconds=0, max_bytes=0)
+    stats = retention.stats()
+    assert stats["files"] == 1 and stats["oldest_served_at"] < time.time() - 59, "mtime counts as served"
+    retention.max_bytes = 1
+    assert retention.sweep() == 1 and files(outputs) == ["cache/ab/key.mp3", "voice_001.mp3"]
+    assert (outputs / "1e" / "notes.txt").exists()
+    print("   ✅ Crash leftovers adopted, missing files dropped")
+
+    # Test 3: The JSON index of earlier versions is imported once
+    print("\n3. Testing the legacy JSON index...")
+    write(outputs, "2f/voice_001.mp3", age=7200)
+    served = time.time() - 10
+    (outputs / ".retention.json").write_text(json.dumps([
+        {"file": "2f/voice_001.mp3", "size": 1000, "last_served": served}
+    ]))
+    retention = OutputRetention(outputs, max_age_seconds=3600, max_bytes=0)
+    assert retention.stats()["oldest_served_at"] == served, "The recorded served time wins over mtime"
+    assert not (outputs / ".retention.json").exists()
+    assert retention.sweep() == 0
+    print("   ✅ Served times carried over")
+
+    # Test 4: Processes sharing the directory see each other's files
+    print("\n4. Testing several processes...")
+    script = (
+        "import sys, time; from pathlib import Path; sys.path.insert(0, sys.argv[1]);"
+        "from output_retention import OutputRetention;"
+        "outputs = Path(sys.argv[2]); r = OutputRetention(outputs, 0, 0);"
+        "[(path.parent.mkdir(exist_ok=True), path.write_bytes(b'\\0' * 1000), r.add(path))"
+        " for path in (outputs / f'3{n}' / 'voice_001.mp3' for n in range(5))];"
+        "r.touch('2f/voice_001.mp3'); r.stop()"
+    )
+    before = time.time()
+    procs = [subprocess.Popen([sys.executable, "-c", script, str(Path(__file__).parent), str(outputs)])
+             for _ in range(3)]
+    assert all(proc.wait() == 0 for proc in procs)
+    stats = retention.stats()
+    assert stats["files"] == 6 and stats["bytes"] == 6000, "Files added by other processes are tracked"
+    assert stats["oldest_served_at"] >= before, "Served times recorded elsewhere are merged"
+    retention.max_bytes = 2000
+    assert retention.sweep() == 4 and retention.stats()["files"] == 2
+    assert len([f for f in files(outputs) if f[0] in "23"]) == 2
+    retention.stop()
+    print(f"   ✅ {stats['files']} files tracked across processes")
+
+print("\n✅ Test complete!")
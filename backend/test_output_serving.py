@@ -0,0 +1,79 @@
+"""Test serving generated audio from /outputs in both servers (no Fish.Audio calls)"""
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import api_server
+import main
+
+print("🧪 Testing /outputs serving...")
+
+AUDIO = bytes(range(256)) * 40
+KEY = hashlib.sha256(b"cached request").hexdigest()
+
+
+def check(get, label):
+    # Numbered clips: a derived ETag and revalidation
+    response = get("/outputs/12/voice_001.mp3")
+    assert response.status_code == 200 and response.content == AUDIO
+    assert response.headers["Cache-Control"] == "no-cache"
+    etag = response.headers["ETag"]
+    assert get("/outputs/12/voice_001.mp3", {"If-None-Match": etag}).status_code == 304
+    assert get("/outputs/12/voice_001.mp3", {"If-None-Match": '"other"'}).status_code == 200
+
+    # Cache entries: their content name is a strong ETag, and they never change
+    response = get(f"/outputs/cache/{KEY[:2]}/{KEY}.mp3")
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{KEY}"'
+    assert "immutable" in response.headers["Cache-Control"]
+    not_modified = get(f"/outputs/cache/{KEY[:2]}/{KEY}.mp3", {"If-None-Match": f'"{KEY}"'})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    # Range requests for seeking and resuming
+    partial = get("/outputs/12/voice_001.mp3", {"Range": "bytes=100-199"})
+    assert partial.status_code == 206 and partial.content == AUDIO[100:200]
+    assert partial.headers["Content-Range"] == f"bytes 100-199/{len(AUDIO)}"
+    tail = get("/outputs/12/voice_001.mp3", {"Range": "bytes=-50"})
+    assert tail.status_code == 206 and tail.content == AUDIO[-50:]
+
+    assert get("/outputs/12/voice_999.mp3").status_code == 404
+    assert get("/outputs/../config.py").status_code == 404, "Paths outside outputs/ are never served"
+    print(f"   ✅ {label}: 200, 304, 206 and 404 as expected")
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    outputs = Path(tmp)
+    (outputs / "12").mkdir()
+    (outputs / "12" / "voice_001.mp3").write_bytes(AUDIO)
+    (outputs / "cache" / KEY[:2]).mkdir(parents=True)
+    (outputs / "cache" / KEY[:2] / f"{KEY}.mp3").write_bytes(AUDIO)
+
+    # Test 1: Flask (send_from_directory)
+    print("\n1. Testing Flask /outputs...")
+    api_server.voice_service.output_dir = outputs
+    flask_client = api_server.app.test_client()
+
+    def flask_get(url, headers=None):
+        response = flask_client.get(url, headers=headers or {})
+        response.content = response.get_data()
+        return response
+
+    check(flask_get, "Flask")
+
+    # Test 2: FastAPI (StaticFiles)
+    print("\n2. Testing FastAPI /outputs...")
+    main.voice_service.output_dir = outputs
+    app = FastAPI()
+    app.mount("/outputs", main.OutputFiles(directory=outputs), name="outputs")
+    fastapi_client = TestClient(app)
+    check(lambda url, headers=None: fastapi_client.get(url, headers=headers or {}), "FastAPI")
+
+print("\n✅ Test complete!")
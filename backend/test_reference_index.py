@@ -0,0 +1,136 @@
+"""Test reference audio de-duplication (no Fish.Audio calls)"""
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import wave
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+import numpy as np
+
+from audio_normalize import resample
+from reference_index import (ReferenceIndex, content_hash, fingerprint_bit_error_rate,
+                             pcm_fingerprint, MATCH_BIT_ERROR_RATE)
+from voice_service import VoiceServiceWrapper
+
+print("🧪 Testing reference de-duplication...")
+
+RATE = 16000
+
+
+def speechlike(seed: int, seconds: float = 8.0):
+    """Noise with a changing spectrum and syllable-rate loudness, like speech."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * RATE)
+    t = np.arange(n) / RATE
+    carrier = sum(np.sin(2 * np.pi * f * t + rng.uniform(0, 6)) for f in rng.uniform(300, 3000, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2, 5) * t)
+    return (0.05 * carrier * envelope + rng.normal(0, 0.05, n)).astype(np.float32)
+
+
+# Test 1: Content hash of a file object from its position
+print("\n1. Testing content_hash()...")
+upload = io.BytesIO(b"JUNK" + b"audio" * 1000)
+upload.seek(4)
+assert content_hash(upload) == content_hash(io.BytesIO(b"audio" * 1000))
+assert upload.tell() == 4, "The file position must be restored"
+print("   ✅ Hash is position-aware and restores it")
+
+# Test 2: Fingerprints survive volume changes, resampling and noise
+print("\n2. Testing pcm_fingerprint()...")
+original = speechlike(1)
+print_a = pcm_fingerprint(original, RATE)
+quieter = pcm_fingerprint(original * 0.3, RATE)
+resampled = resample(resample(original, RATE, 22050), 22050, RATE)
+resampled += np.random.default_rng(3).normal(0, 0.02, len(resampled)).astype(np.float32)  # encoder noise
+roundtrip = pcm_fingerprint(resampled, RATE)
+other = pcm_fingerprint(speechlike(2), RATE)
+assert len(print_a) == int(8.0 / 0.1) - 1
+assert fingerprint_bit_error_rate(print_a, quieter) == 0.0
+assert fingerprint_bit_error_rate(print_a, roundtrip) <= MATCH_BIT_ERROR_RATE
+assert fingerprint_bit_error_rate(print_a, other) > MATCH_BIT_ERROR_RATE
+# A couple of frames of encoder delay
+assert fingerprint_bit_error_rate(print_a, print_a[2:]) == 0.0
+print(f"   ✅ Same audio {fingerprint_bit_error_rate(print_a, roundtrip):.2f}, "
+      f"other audio {fingerprint_bit_error_rate(print_a, other):.2f}")
+
+with tempfile.TemporaryDirectory() as tmp:
+    index = ReferenceIndex(Path(tmp) / "references.db")
+
+    # Test 3: Exact and re-encoded re-uploads
+    print("\n3. Testing find()...")
+    index.add("auth0|alice", "a" * 64, "model-1", fingerprint=print_a, duration=8.0, model_duration=7.5)
+    assert index.find("auth0|alice", "a" * 64) == {"model_id": "model-1", "duration_seconds": 7.5}
+    assert index.find("auth0|alice", "b" * 64, fingerprint=roundtrip, duration=8.2)["model_id"] == "model-1"
+    assert index.find("auth0|alice", "b" * 64, fingerprint=roundtrip, duration=12.0) is None, \
+        "Clips of a different length can't be the same recording"
+    assert index.find("auth0|alice", "c" * 64, fingerprint=other, duration=8.0) is None
+    print("   ✅ Hash and fingerprint matches")
+
+    # Test 4: Entries are scoped to their owner
+    print("\n4. Testing owner scoping...")
+    assert index.find("auth0|bob", "a" * 64) is None
+    assert index.find("auth0|bob", "b" * 64, fingerprint=print_a, duration=8.0) is None
+    index.add("auth0|bob", "a" * 64, "model-2", fingerprint=print_a, duration=8.0)
+    assert index.find("auth0|bob", "a" * 64)["model_id"] == "model-2"
+    assert index.find("auth0|alice", "a" * 64)["model_id"] == "model-1"
+    print("   ✅ Another user's upload is never reused")
+
+    # Test 5: Deleted models are forgotten, and the index persists
+    print("\n5. Testing forget() and persistence...")
+    index.forget("model-1")
+    reopened = ReferenceIndex(Path(tmp) / "references.db")
+    assert reopened.find("auth0|alice", "a" * 64) is None
+    assert reopened.find("auth0|bob", "a" * 64)["model_id"] == "model-2"
+    print("   ✅ Forgotten model gone, others kept")
+
+    # Test 6: Databases from before model durations were stored are migrated
+    print("\n6. Testing schema migration...")
+    conn = sqlite3.connect(str(Path(tmp) / "old.db"))
+    conn.execute(
+        "CREATE TABLE reference_audio (owner TEXT NOT NULL, sha256 TEXT NOT NULL, fingerprint BLOB, "
+        "duration REAL, model_id TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (owner, sha256))"
+    )
+    conn.execute("INSERT INTO reference_audio VALUES ('auth0|alice', 'd', NULL, 8.0, 'model-old', 0)")
+    conn.commit()
+    conn.close()
+    migrated = ReferenceIndex(Path(tmp) / "old.db")
+    assert migrated.find("auth0|alice", "d") == {"model_id": "model-old", "duration_seconds": None}
+    migrated.add("auth0|alice", "e", "model-new", duration=8.0, model_duration=8.0)
+    assert migrated.find("auth0|alice", "e")["duration_seconds"] == 8.0
+    print("   ✅ model_duration column added, old entries kept")
+
+    # Test 7: A re-upload reports the model's duration, not its own
+    print("\n7. Testing upload_reference_audio()...")
+
+    def wav(samples) -> bytes:
+        out = io.BytesIO()
+        with wave.open(out, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(RATE)
+            w.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+        return out.getvalue()
+
+    service = VoiceServiceWrapper()
+    service.references = ReferenceIndex(Path(tmp) / "service.db")
+    created = []
+
+    def create_model(audio_file, name, filename):
+        # As if Fish.Audio was sent a 6 s segment of the clip
+        created.append(name)
+        return {"model_id": f"model-{len(created)}", "reference_id": f"model-{len(created)}",
+                "duration_seconds": 6.0}
+
+    service._create_model = create_model
+    first = service.upload_reference_audio(wav(original), "Mom", owner="auth0|carol")
+    again = service.upload_reference_audio(wav(resampled), "Mom again", owner="auth0|carol")
+    assert created == ["Mom"] and again["deduplicated"] and again["model_id"] == first["model_id"]
+    assert again["duration_seconds"] == 6.0, "The re-upload is 8 s, but the model was made from 6 s"
+    print(f"   ✅ Reused {again['model_id']} ({again['duration_seconds']}s)")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,136 @@
+"""Test resumable chunked uploads (no Fish.Audio calls)"""
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from resumable_upload import UploadOffsetMismatch, UploadSessionNotFound, UploadSessionStore
+
+print("🧪 Testing resumable uploads...")
+
+
+class DroppedConnection(io.RawIOBase):
+    """A request body that dies after `limit` bytes."""
+
+    def __init__(self, data: bytes, limit: int):
+        self.data = data[:limit]
+
+    def read(self, size=-1):
+        if not self.data:
+            raise ConnectionResetError("client went away")
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+payload = os.urandom(200_000)
+
+with tempfile.TemporaryDirectory() as tmp:
+    root = Path(tmp) / "uploads"
+    store = UploadSessionStore(root, ttl_seconds=60, max_bytes=300_000, max_chunk_bytes=100_000)
+
+    # Test 1: Upload in chunks
+    print("\n1. Testing chunked upload...")
+    session = store.create("mom.wav", total_size=len(payload), name="Mom", user_id="auth0|alice")
+    upload_id = session["upload_id"]
+    assert session["offset"] == 0 and not session["complete"]
+    session = store.append(upload_id, 0, io.BytesIO(payload[:80_000]), length=80_000)
+    assert session["offset"] == 80_000
+    print(f"   ✅ Offset {session['offset']} after the first chunk")
+
+    # Test 2: A chunk for the wrong offset is rejected with the real one
+    print("\n2. Testing offset mismatch...")
+    for offset in (0, 100_000):
+        try:
+            store.append(upload_id, offset, io.BytesIO(payload[offset:offset + 1000]))
+            raise AssertionError("Appending at the wrong offset should fail")
+        except UploadOffsetMismatch as e:
+            assert e.offset == 80_000, "The error should tell the client where to resume"
+    assert store.get(upload_id)["offset"] == 80_000, "A rejected chunk must not be written"
+    print("   ✅ Rejected, server offset reported")
+
+    # Test 3: A dropped connection keeps what arrived, and the client resumes
+    print("\n3. Testing resume after a dropped connection...")
+    try:
+        store.append(upload_id, 80_000, DroppedConnection(payload[80_000:], 70_000))
+        raise AssertionError("The dropped connection should surface")
+    except ConnectionResetError:
+        pass
+    offset = store.get(upload_id)["offset"]
+    assert offset == 80_000 + 70_000, "Everything that arrived is kept"
+    try:
+        store.completed_path(upload_id)
+        raise AssertionError("An incomplete upload can't be finalized")
+    except ValueError:
+        pass
+    while offset < len(payload):
+        chunk = payload[offset:offset + 100_000]
+        offset = store.append(upload_id, offset, io.BytesIO(chunk), length=len(chunk))["offset"]
+    session = store.get(upload_id)
+    assert session["complete"] and session["name"] == "Mom"
+    assert store.completed_path(upload_id).read_bytes() == payload
+    print("   ✅ Resumed and assembled byte for byte")
+
+    # Test 4: Size limits
+    print("\n4. Testing size limits...")
+    session = store.create("big.wav")
+    try:
+        store.append(session["upload_id"], 0, io.BytesIO(b"x" * 100_001), length=100_001)
+        raise AssertionError("Chunk over max_chunk_bytes should fail")
+    except ValueError:
+        pass
+    try:
+        store.create("huge.wav", total_size=300_001)
+        raise AssertionError("total_size over max_bytes should fail")
+    except ValueError:
+        pass
+    try:
+        store.create_from_file(io.BytesIO(b"x" * 300_001), "huge.wav")
+        raise AssertionError("A whole file over max_bytes should fail")
+    except ValueError:
+        pass
+    print("   ✅ Oversized chunks and uploads rejected")
+
+    # Test 5: Upload IDs and filenames can't escape the upload directory
+    print("\n5. Testing path traversal...")
+    victim = Path(tmp) / "victim"
+    victim.mkdir()
+    (victim / "data").write_bytes(b"keep me")
+    (victim / "session.json").write_text('{"total_size": null}')
+    for bad_id in ("../victim", "..", "/etc", upload_id + "/../../victim", upload_id.upper()):
+        for call in (lambda: store.get(bad_id),
+                     lambda: store.append(bad_id, 7, io.BytesIO(b"evil")),
+                     lambda: store.completed_path(bad_id),
+                     lambda: store.delete(bad_id)):
+            try:
+                call()
+                raise AssertionError(f"{bad_id!r} should not resolve to a session")
+            except UploadSessionNotFound:
+                pass
+    assert (victim / "data").read_bytes() == b"keep me"
+    session = store.create("../../victim/data")
+    assert session["filename"] == "data"
+    assert (root / session["upload_id"]).is_dir()
+    print("   ✅ Only generated IDs resolve; filenames lose their directories")
+
+    # Test 6: Idle sessions expire
+    print("\n6. Testing sweep()...")
+    stale = store.create("stale.wav")["upload_id"]
+    old = time.time() - 120
+    os.utime(root / stale / "data", (old, old))
+    stray = root / "not-a-session"
+    stray.mkdir()
+    os.utime(stray, (old, old))
+    assert store.sweep() == 1
+    assert stray.exists(), "Only session directories are swept"
+    try:
+        store.get(stale)
+        raise AssertionError("Expired session should be gone")
+    except UploadSessionNotFound:
+        pass
+    store.delete(upload_id)
+    print(f"   ✅ Stats: {store.stats()}")
+
+print("\n✅ Test complete!")
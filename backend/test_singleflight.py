@@ -0,0 +1,110 @@
+"""Test request coalescing for identical concurrent syntheses (no Fish.Audio calls)"""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from singleflight import AsyncFlight, FlightRegistry
+
+print("🧪 Testing single-flight coalescing...")
+
+# Test 1: Concurrent callers share one leader
+print("\n1. Testing concurrent joins...")
+registry = FlightRegistry()
+barrier = threading.Barrier(8)
+upstream_calls = []
+results = []
+
+
+def synthesize(key: str):
+    barrier.wait()  # every thread joins while the leader is still working
+    flight, is_leader = registry.join(key)
+    if is_leader:
+        upstream_calls.append(key)
+        deadline = time.monotonic() + 5
+        while registry.coalesced < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)  # stay in flight until everyone has joined
+        flight.start({"audio_path": "voice_001.mp3"})
+        flight.progress()
+        flight.finish()
+        registry.land(key, flight)
+    else:
+        flight.wait_started()
+        while not flight.done:
+            flight.wait_progress(timeout=0.1)
+    results.append(flight.result["audio_path"])
+
+
+threads = [threading.Thread(target=synthesize, args=("same-text",)) for _ in range(8)]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert upstream_calls == ["same-text"], "Only one caller should reach upstream"
+assert results == ["voice_001.mp3"] * 8
+stats = registry.stats()
+assert stats == {"in_flight": 0, "upstream_requests": 1, "coalesced_requests": 7}
+print(f"   ✅ Stats: {stats}")
+
+# Test 2: A landed flight is not reused
+print("\n2. Testing land()...")
+flight, is_leader = registry.join("same-text")
+assert is_leader, "A new request after landing should start a new flight"
+registry.land("other-key", flight)
+assert registry.stats()["in_flight"] == 1, "land() must only remove the flight for its key"
+registry.land("same-text", flight)
+assert registry.stats()["in_flight"] == 0
+print("   ✅ Finished flights are removed")
+
+# Test 3: Followers see the leader's failure
+print("\n3. Testing leader failure...")
+flight, _ = registry.join("broken")
+follower, is_leader = registry.join("broken")
+assert not is_leader
+flight.fail(ConnectionError("upstream down"))
+try:
+    follower.wait_started()
+    raise AssertionError("Follower should not get a result")
+except RuntimeError as e:
+    assert "upstream down" in str(e)
+print("   ✅ Failure propagated to followers")
+
+# Test 4: asyncio flights
+print("\n4. Testing AsyncFlight...")
+
+
+async def run_async():
+    registry = FlightRegistry(AsyncFlight)
+    chunks = []
+
+    async def leader(flight):
+        flight.start({"audio_path": "voice_002.mp3"})
+        for i in range(3):
+            await asyncio.sleep(0.01)
+            chunks.append(i)
+            flight.progress()
+        flight.finish()
+
+    async def follower():
+        flight, is_leader = registry.join("async-text")
+        assert not is_leader
+        await flight.wait_started()
+        while not flight.done:
+            await flight.wait_progress(timeout=0.5)
+        return flight.result["audio_path"]
+
+    flight, is_leader = registry.join("async-text")
+    assert is_leader
+    paths = await asyncio.gather(leader(flight), follower(), follower())
+    assert paths[1:] == ["voice_002.mp3", "voice_002.mp3"]
+    assert chunks == [0, 1, 2]
+    return registry.stats()
+
+
+stats = asyncio.run(run_async())
+assert stats["coalesced_requests"] == 2
+print(f"   ✅ Stats: {stats}")
+
+print("\n✅ Test complete!")
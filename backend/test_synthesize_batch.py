@@ -0,0 +1,63 @@
+"""Test batch synthesis over HTTP in both servers (no Fish.Audio calls)"""
+import json
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+from fastapi.testclient import TestClient
+
+import api_server
+import main
+
+print("🧪 Testing batch synthesis endpoints...")
+
+ITEMS = [{"text": "first"}, "not an object", {"voice_id": "no text"}, 42, {"text": "last", "voice_id": "grandma"}]
+
+
+def fake_result(text, reference_id=None, voice_id=None, format="mp3"):
+    return {"audio_url": f"/outputs/{text}.mp3", "voice_id": voice_id}
+
+
+def check(post, label):
+    response = post({"items": ITEMS, "concurrency": 2})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2, 3, 4], "One line per item, in order"
+    assert [line["success"] for line in lines] == [True, False, False, False, True]
+    assert lines[1]["error"] == lines[3]["error"] == "Text is required", "Non-object items fail on their own line"
+    assert lines[4]["audio_url"] == "/outputs/last.mp3" and lines[4]["voice_id"] == "grandma"
+    assert post({"items": []}).status_code == 400
+    print(f"   ✅ {label}: bad items reported per line, the rest synthesized")
+
+
+# Test 1: Flask
+print("\n1. Testing Flask /api/synthesize/batch...")
+api_server.voice_service.synthesize = fake_result
+flask_client = api_server.app.test_client()
+
+
+def flask_post(body):
+    response = flask_client.post("/api/synthesize/batch", json=body)
+    response.text = response.get_data(as_text=True)
+    return response
+
+
+check(flask_post, "Flask")
+
+# Test 2: FastAPI
+print("\n2. Testing FastAPI /api/synthesize/batch...")
+
+
+async def fake_result_async(**kwargs):
+    return fake_result(**kwargs)
+
+
+main.voice_service.synthesize = fake_result_async
+fastapi_client = TestClient(main.app)
+check(lambda body: fastapi_client.post("/api/synthesize/batch", json=body), "FastAPI")
+
+print("\n✅ Test complete!")
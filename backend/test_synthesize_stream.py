@@ -0,0 +1,128 @@
+"""Test streaming synthesis and its tee to disk (no Fish.Audio calls)"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+import requests
+
+from output_allocator import OutputFileAllocator
+from tts_cache import TTSCache
+from voice_service import STREAM_CHUNK_SIZE, VoiceServiceWrapper
+
+print("🧪 Testing streaming synthesis...")
+
+AUDIO = bytes(range(256)) * 100  # a little over three stream chunks
+
+
+class FakeResponse:
+    """Just enough of a streamed requests.Response."""
+
+    def __init__(self, body=AUDIO, status=200, fail_after=None):
+        self.body = body
+        self.status = status
+        self.fail_after = fail_after
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status} Server Error")
+
+    def iter_content(self, chunk_size):
+        for n, start in enumerate(range(0, len(self.body), chunk_size)):
+            if self.fail_after is not None and n == self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection broken")
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    outputs = Path(tmp)
+    service = VoiceServiceWrapper()
+    service.output_dir = outputs
+    service.allocator = OutputFileAllocator(outputs)
+    service.cache = TTSCache(outputs / "cache", 10 * 1024 * 1024)
+    responses = []
+
+    def post(url, **kwargs):
+        assert kwargs.get("stream"), "Synthesis must stream the upstream body"
+        return responses.pop(0)
+
+    service.transport.post = post
+
+    def audio_files():
+        return sorted(p for p in outputs.rglob("voice_*") if "cache" not in p.parts)
+
+    # Test 1: Chunks reach the caller and the file on disk
+    print("\n1. Testing streamed chunks...")
+    responses.append(FakeResponse())
+    stream = service.synthesize_stream("hello there")
+    assert not stream.cached
+    chunks = list(stream)
+    stream.close()
+    assert b"".join(chunks) == AUDIO and len(chunks[0]) == STREAM_CHUNK_SIZE
+    result = stream.result()
+    saved = Path(result["audio_path"])
+    assert saved.read_bytes() == AUDIO, "The saved file must match what was streamed"
+    assert stream.audio_url == result["audio_url"] == f"/outputs/{saved.relative_to(outputs).as_posix()}"
+    print(f"   ✅ {len(chunks)} chunks, saved as {stream.audio_url}")
+
+    # Test 2: Repeat requests come from the cache
+    print("\n2. Testing cache hit...")
+    stream = service.synthesize_stream("hello there")
+    assert stream.cached and b"".join(stream) == AUDIO
+    stream.close()
+    assert responses == [], "A cache hit must not call Fish.Audio"
+    print(f"   ✅ Served from {stream.audio_url}")
+
+    # Test 3: A client that disconnects leaves no truncated clip
+    print("\n3. Testing early close...")
+    before = audio_files()
+    upstream = FakeResponse()
+    responses.append(upstream)
+    stream = service.synthesize_stream("goodbye")
+    next(iter(stream))
+    stream.close()
+    assert audio_files() == before and upstream.closed
+    upstream = FakeResponse()
+    responses.append(upstream)
+    service.synthesize_stream("never read").close()
+    assert audio_files() == before and upstream.closed, "Abandoning before reading releases the response"
+    print("   ✅ Partial files removed, responses closed")
+
+    # Test 4: Upstream errors before and during the body
+    print("\n4. Testing upstream failures...")
+    responses.append(FakeResponse(status=503))
+    try:
+        service.synthesize_stream("server down")
+        raise AssertionError("HTTP errors must be raised before streaming starts")
+    except RuntimeError as e:
+        assert "503" in str(e)
+    assert audio_files() == before, "The reserved file is released"
+    responses.append(FakeResponse(fail_after=2))
+    stream = service.synthesize_stream("cut off")
+    try:
+        list(stream)
+        raise AssertionError("A broken body must be reported")
+    except RuntimeError as e:
+        assert "connection broken" in str(e)
+    stream.close()
+    assert audio_files() == before, "A truncated clip must not be kept"
+    responses.append(FakeResponse())
+    stream = service.synthesize_stream("cut off")
+    assert not stream.cached, "A failed synthesis must not be cached"
+    stream.close()
+    print("   ✅ Errors surfaced as RuntimeError, no files left behind")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,79 @@
+"""Test the in-memory TTL cache with stale-while-revalidate (no Fish.Audio calls)"""
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from ttl_cache import TTLCache
+
+print("🧪 Testing TTL cache...")
+
+# Test 1: Fresh, then stale, then missing
+print("\n1. Testing expiry...")
+cache = TTLCache(ttl=0.1, stale_ttl=0.1)
+key = ("account", "models", 1)
+assert cache.get(key) == (None, TTLCache.MISSING)
+cache.put(key, ["model-a"])
+assert cache.get(key) == (["model-a"], TTLCache.FRESH)
+time.sleep(0.12)
+assert cache.get(key) == (["model-a"], TTLCache.STALE)
+time.sleep(0.1)
+assert cache.get(key) == (None, TTLCache.MISSING)
+print(f"   ✅ Stats: {cache.stats()}")
+
+# Test 2: One background refresh per key
+print("\n2. Testing refresh claim...")
+assert cache.begin_refresh(key)
+assert not cache.begin_refresh(key), "A second refresh should not start"
+cache.end_refresh(key)
+assert cache.begin_refresh(key)
+cache.end_refresh(key)
+print("   ✅ Refreshes are exclusive")
+
+# Test 3: Invalidation drops the namespace and rejects older loads
+print("\n3. Testing invalidation...")
+cache = TTLCache(ttl=60, stale_ttl=60)
+cache.put(("account", "page", 1), ["model-a"])
+cache.put(("other", "page", 1), ["model-b"])
+generation = cache.generation(("account", "page", 1))  # a load starts...
+cache.invalidate("account")                               # ...a model is created
+cache.put(("account", "page", 1), ["model-a"], generation=generation)
+assert cache.get(("account", "page", 1))[1] == TTLCache.MISSING, "Outdated load must be discarded"
+assert cache.get(("other", "page", 1))[1] == TTLCache.FRESH, "Other namespaces are untouched"
+cache.put(("account", "page", 1), ["model-a", "model-c"], generation=cache.generation(("account",)))
+assert cache.get(("account", "page", 1)) == (["model-a", "model-c"], TTLCache.FRESH)
+print("   ✅ Invalidated namespace reloads cleanly")
+
+# Test 4: ttl <= 0 disables caching
+print("\n4. Testing disabled cache...")
+cache = TTLCache(ttl=0, stale_ttl=60)
+cache.put(key, ["model-a"])
+assert cache.get(key)[1] == TTLCache.MISSING
+assert cache.stats()["enabled"] is False
+print("   ✅ Nothing stored")
+
+# Test 5: The number of entries is bounded
+print("\n5. Testing max_entries...")
+cache = TTLCache(ttl=60, stale_ttl=60, max_entries=3)
+for page in range(3):
+    cache.put(("account", "page", page), [page])
+cache.get(("account", "page", 0))  # page 0 is now most recently used
+cache.put(("account", "page", 3), [3])
+assert cache.get(("account", "page", 1))[1] == TTLCache.MISSING, "The least recently used entry goes"
+assert cache.get(("account", "page", 0))[1] == TTLCache.FRESH
+for page in range(100):
+    cache.put(("account", "title", page), [page])
+assert cache.stats()["entries"] == 3
+cache = TTLCache(ttl=0.1, stale_ttl=0.1, max_entries=2)
+cache.put(("account", "old"), ["old"])
+time.sleep(0.12)
+cache.put(("account", "live"), ["live"])
+cache.get(("account", "old"))  # stale, and now more recently used than "live"
+time.sleep(0.1)
+cache.put(("account", "new"), ["new"])
+assert cache.get(("account", "live"))[1] != TTLCache.MISSING, \
+    "Expired entries are purged before live ones are evicted"
+assert cache.stats()["entries"] == 2
+print(f"   ✅ Stats: {cache.stats()}")
+
+print("\n✅ Test complete!")
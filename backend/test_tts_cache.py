@@ -0,0 +1,51 @@
+"""Test the on-disk TTS result cache (no Fish.Audio calls)"""
+import sys
+import tempfile
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from tts_cache import TTSCache
+
+print("🧪 Testing TTS result cache...")
+
+with tempfile.TemporaryDirectory() as tmp:
+    tmp = Path(tmp)
+    cache = TTSCache(tmp / "cache", max_bytes=2500)
+
+    # Test 1: Key is independent of argument order
+    print("\n1. Testing key canonicalization...")
+    key_a = TTSCache.make_key({"text": "Hello!", "reference_id": "abc", "voice_id": None}, "mp3")
+    key_b = TTSCache.make_key({"reference_id": "abc", "text": "Hello!"}, "mp3")
+    key_c = TTSCache.make_key({"text": "Hello!", "reference_id": "abc"}, "wav")
+    assert key_a == key_b, "Equivalent requests should share a key"
+    assert key_a != key_c, "Different formats should not share a key"
+    print("   ✅ Keys match for equivalent requests")
+
+    # Test 2: Miss, then hit
+    print("\n2. Testing miss/hit...")
+    source = tmp / "voice_001.mp3"
+    source.write_bytes(b"\xff\xfb" * 500)
+    assert cache.get(key_a) is None
+    cached = cache.put(key_a, source)
+    assert cache.get(key_a) == cached
+    assert cached.read_bytes() == source.read_bytes()
+    print(f"   ✅ Stats: {cache.stats()}")
+
+    # Test 3: LRU eviction against the byte budget
+    print("\n3. Testing LRU eviction...")
+    cache.put("b" * 64, source)
+    cache.get(key_a)  # key_a is now most recently used
+    cache.put("c" * 64, source)
+    assert cache.get("b" * 64) is None, "Least recently used entry should be evicted"
+    assert cache.get(key_a) is not None
+    print(f"   ✅ Evictions: {cache.stats()['evictions']}")
+
+    # Test 4: Index survives a restart
+    print("\n4. Testing index persistence...")
+    cache.flush()
+    reloaded = TTSCache(tmp / "cache", max_bytes=2500)
+    assert reloaded.get(key_a) is not None
+    assert reloaded.stats()["entries"] == 2
+    print("   ✅ Index reloaded")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,87 @@
+"""Test paging through voice model listings (no Fish.Audio calls)"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+os.environ.setdefault("FISH_AUDIO_API_KEY", "test-key")
+
+from async_voice_service import AsyncVoiceServiceWrapper
+from ttl_cache import TTLCache
+from voice_service import VoiceServiceWrapper
+
+print("🧪 Testing voice model paging...")
+
+MODELS = [{"_id": f"model-{i}", "title": f"{'Mom' if i % 2 else 'Dad'} {i}"} for i in range(7)]
+
+
+def paging_upstream(params):
+    """Honours page_size/page_number/title like Fish.Audio's /model."""
+    models = [m for m in MODELS if params.get("title", "").lower() in m["title"].lower()]
+    size, number = params["page_size"], params["page_number"]
+    return {"total": len(models), "items": models[(number - 1) * size:number * size]}
+
+
+def ignoring_upstream(params):
+    """Ignores every parameter and returns the whole listing as one page."""
+    return {"total": len(MODELS), "items": list(MODELS)}
+
+
+def list_upstream(params):
+    """Ignores every parameter and returns a bare list."""
+    return list(MODELS)
+
+
+def ids(page):
+    return [m["_id"] for m in page["models"]]
+
+
+def check(use, get_page, collect, label):
+    for upstream in (paging_upstream, ignoring_upstream, list_upstream):
+        use(upstream)
+        page = get_page(page_size=1, offset=2)
+        assert ids(page) == ["model-2"], f"{upstream.__name__}: one model, the third ({ids(page)})"
+        assert page["total"] == 7 and page["next_offset"] == 3
+        page = get_page(page_size=3, offset=5)
+        assert ids(page) == ["model-5", "model-6"] and page["next_offset"] is None
+        page = get_page(page_size=3, offset=2)
+        assert ids(page) == ["model-2", "model-3", "model-4"], "Offsets inside a page span two upstream pages"
+        page = get_page(page_size=2, offset=0, title="mom")
+        assert ids(page) == ["model-1", "model-3"] and page["total"] == 3
+        assert [m["_id"] for m in collect()] == [m["_id"] for m in MODELS], "Every model exactly once"
+    print(f"   ✅ {label}: paged, unpaged and bare-list upstreams")
+
+
+# Test 1: VoiceServiceWrapper
+print("\n1. Testing get_available_voices()...")
+service = VoiceServiceWrapper()
+service.voices_cache = TTLCache(0, 0)  # every call goes upstream
+
+
+def use_sync(upstream):
+    service._fetch_voices = upstream
+
+
+check(use_sync, service.get_available_voices, service.iter_voices, "sync")
+
+# Test 2: AsyncVoiceServiceWrapper
+print("\n2. Testing the async wrapper...")
+async_service = AsyncVoiceServiceWrapper()
+async_service.voices_cache = TTLCache(0, 0)
+
+
+def use_async(upstream):
+    async def fetch(params):
+        return upstream(params)
+    async_service._fetch_voices_async = fetch
+
+
+async def collect_all():
+    return [model async for model in async_service.iter_voices()]
+
+
+check(use_async, lambda **kwargs: asyncio.run(async_service.get_available_voices(**kwargs)),
+      lambda: asyncio.run(collect_all()), "async")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,126 @@
+"""Test write-behind batching for conversation messages (no MongoDB server needed)"""
+import datetime
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from write_behind import MessageWriteBuffer, sort_key
+
+print("🧪 Testing message write-behind...")
+
+
+class FakeCollection:
+    """insert_many with MongoDB's unordered semantics and per-document failures."""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = 0
+        self.down = False
+        self.land_before_failing = False
+
+    def insert_many(self, batch, ordered=True):
+        assert not ordered, "Batches must be unordered so one bad document doesn't block the rest"
+        self.calls += 1
+        if self.down:
+            if self.land_before_failing:
+                # The write reached the server but the reply was lost
+                for doc in batch:
+                    self.docs.setdefault(doc["_id"], dict(doc))
+            raise AutoReconnect("connection reset")
+        errors = []
+        for index, doc in enumerate(batch):
+            if doc.get("content") is None:
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            elif doc.get("flaky") and self.calls < 3:
+                errors.append({"index": index, "code": 189, "errmsg": "Primary stepped down"})
+            elif doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+            else:
+                self.docs[doc["_id"]] = dict(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(batch) - len(errors)})
+
+
+def message(content, **extra):
+    return {"echo_id": "echo-1", "role": "user", "content": content,
+            "created_at": datetime.datetime.now(datetime.timezone.utc), **extra}
+
+
+# Test 1: Batches, and read-your-writes before the flush
+print("\n1. Testing batching...")
+collection = FakeCollection()
+buffer = MessageWriteBuffer(collection, max_batch=3, flush_interval=60)
+first = buffer.add(message("hi"))
+assert "_id" in first, "Documents get their _id when queued"
+buffer.add(message("there"))
+assert [m["content"] for m in buffer.pending(echo_id="echo-1")] == ["hi", "there"]
+assert buffer.pending(echo_id="echo-2") == []
+assert buffer.flush() == 2 and collection.calls == 1
+assert buffer.pending() == [] and len(collection.docs) == 2
+print(f"   ✅ Stats: {buffer.stats()}")
+
+# Test 2: Partial failure - written, transient and rejected documents are told apart
+print("\n2. Testing partial batch failure...")
+collection = FakeCollection()
+dropped = []
+buffer = MessageWriteBuffer(collection, max_batch=100, flush_interval=60,
+                            on_dead_letter=lambda doc, reason: dropped.append((doc["content"], reason)))
+ok = buffer.add(message("fine"))
+bad = buffer.add(message(None))
+flaky = buffer.add(message("retry me", flaky=True))
+assert buffer.flush() == 1
+assert ok["_id"] in collection.docs
+assert [m["_id"] for m in buffer.pending()] == [flaky["_id"]], "Only the transient failure is retried"
+assert dropped == [(None, "Document failed validation")], "A permanent rejection must not be retried"
+assert buffer.dead_letters[0]["document"]["_id"] == bad["_id"]
+assert buffer.flush() == 0 and len(buffer.pending()) == 1, "Still failing on the second call"
+assert buffer.flush() == 1 and buffer.pending() == []
+assert flaky["_id"] in collection.docs
+print(f"   ✅ Stats: {buffer.stats()}")
+
+# Test 3: Lost replies are retried without duplicates
+print("\n3. Testing unknown outcome...")
+collection = FakeCollection()
+buffer = MessageWriteBuffer(collection, flush_interval=60)
+doc = buffer.add(message("maybe written"))
+collection.down = collection.land_before_failing = True
+assert buffer.flush() == 0 and len(buffer.pending()) == 1
+collection.down = False
+assert buffer.flush() == 1, "A duplicate _id means the earlier attempt landed"
+assert list(collection.docs) == [doc["_id"]]
+print("   ✅ Retried idempotently")
+
+# Test 4: Retries are capped
+print("\n4. Testing max_attempts...")
+collection = FakeCollection()
+dropped = []
+buffer = MessageWriteBuffer(collection, flush_interval=60, max_attempts=3,
+                            on_dead_letter=lambda doc, reason: dropped.append(reason))
+buffer.add(message("never lands"))
+collection.down = True
+for _ in range(3):
+    buffer.flush()
+assert buffer.pending() == [] and dropped == ["gave up after 3 attempts"]
+assert buffer.stats()["dead_lettered"] == 1
+print(f"   ✅ Dropped after {collection.calls} attempts")
+
+# Test 5: Background flushing and close()
+print("\n5. Testing background thread...")
+collection = FakeCollection()
+buffer = MessageWriteBuffer(collection, max_batch=2, flush_interval=0.1)
+buffer.start()
+buffer.add(message("a"))
+time.sleep(0.3)
+assert len(collection.docs) == 1, "flush_interval should write a partial batch"
+buffer.add(message("b"))
+buffer.add(message("c"))
+buffer.close()
+assert len(collection.docs) == 3 and buffer.pending() == []
+older = dict(first, created_at=first["created_at"].replace(tzinfo=None) - datetime.timedelta(seconds=1))
+assert sort_key(older) < sort_key(first), "Naive (MongoDB) and aware datetimes must compare"
+print(f"   ✅ Stats: {buffer.stats()}")
+
+print("\n✅ Test complete!")
@@ -0,0 +1,74 @@
+"""
+Text splitting for long-text synthesis.
+Breaks text at sentence boundaries (falling back to clauses, then words) so
+each piece can be synthesized independently.
+"""
+import re
+from collections import deque
+from typing import List
+
+
+# Whitespace after sentence-ending punctuation (optionally followed by quotes/brackets)
+_SENTENCE_END = re.compile(r'(?<=[.!?…。！？])\s+|(?<=[.!?…。！？]["\')\]])\s+')
+# Whitespace after clause punctuation, or around dashes
+_CLAUSE_END = re.compile(r'(?<=[,;:—–，；])\s+|\s+(?=[—–]\s)')
+
+
+def split_text(text: str, first_chunk_chars: int, max_chunk_chars: int) -> List[str]:
+    """
+    Split text into chunks for parallel synthesis.
+
+    Sentences are packed greedily into chunks of at most max_chunk_chars.
+    The first chunk is capped at first_chunk_chars so its audio comes back
+    quickly and playback can start while the rest is still synthesizing.
+
+    Args:
+        text: The text to split
+        first_chunk_chars: Maximum length of the first chunk
+        max_chunk_chars: Maximum length of every other chunk
+
+    Returns:
+        List of non-empty chunks, in order
+    """
+    pieces = deque(s.strip() for s in _SENTENCE_END.split(text.strip()) if s.strip())
+    chunks = []
+    current = ""
+
+    while pieces:
+        piece = pieces.popleft()
+        limit = first_chunk_chars if not chunks else max_chunk_chars
+        candidate = f"{current} {piece}" if current else piece
+
+        if len(candidate) <= limit:
+            current = candidate
+        elif current:
+            # Close this chunk and retry the piece against a fresh one
+            chunks.append(current)
+            current = ""
+            pieces.appendleft(piece)
+        else:
+            # A single sentence longer than the chunk - break it up
+            head, tail = _split_at_boundary(piece, limit)
+            chunks.append(head)
+            if tail:
+                pieces.appendleft(tail)
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _split_at_boundary(piece: str, limit: int):
+    """Cut piece at the last clause (or word) boundary within limit."""
+    cut = 0
+    for match in _CLAUSE_END.finditer(piece):
+        if match.start() > limit:
+            break
+        cut = match.start()
+
+    if not cut:
+        cut = piece.rfind(" ", 0, limit + 1)
+    if cut <= 0:
+        cut = limit  # No boundary at all - hard cut
+
+    return piece[:cut].strip(), piece[cut:].strip()
@@ -0,0 +1,133 @@
+"""
+Small in-memory TTL cache with stale-while-revalidate.
+Used for upstream listings (e.g. Fish.Audio voice models) that change rarely
+but are requested constantly.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+
+
+class TTLCache:
+    """
+    Key/value cache whose entries go stale after ``ttl`` seconds.
+
+    Stale entries are still served for up to ``stale_ttl`` more seconds
+    while the caller refreshes them in the background; begin_refresh()
+    makes sure only one refresh per key runs at a time.
+
+    Keys are tuples whose first element is a namespace (e.g. the account).
+    invalidate(namespace) drops every key in it and bumps the namespace's
+    generation, so a load that started before the invalidation can't put
+    its (now outdated) result back.
+
+    At most ``max_entries`` keys are kept. When put() goes over, expired
+    entries are purged first, then the least recently used ones.
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+    MISSING = "missing"
+
+    def __init__(self, ttl: float, stale_ttl: float, max_entries: int = 1000):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, stored_at), least recently used first
+        self._generations = {}
+        self._refreshing = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Tuple[Any, str]:
+        """
+        Look up key.
+
+        Returns:
+            (value, state) - state is FRESH, STALE (serve it, but refresh)
+            or MISSING (value is None)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = time.monotonic() - stored_at
+                self._entries.move_to_end(key)
+                if age < self.ttl:
+                    self.hits += 1
+                    return value, self.FRESH
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    return value, self.STALE
+                del self._entries[key]
+            self.misses += 1
+            return None, self.MISSING
+
+    def generation(self, key: tuple) -> int:
+        """Current generation of key's namespace; pass it to put() after loading."""
+        with self._lock:
+            return self._generations.get(key[0], 0)
+
+    def put(self, key: tuple, value: Any, generation: int = None):
+        """Store value, unless its namespace was invalidated since generation was read."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._evict_locked()
+
+    def invalidate(self, namespace: str):
+        """Drop every key in namespace and discard loads still in progress for it."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+    def begin_refresh(self, key: tuple) -> bool:
+        """Claim the background refresh for key (False if one is running)."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, key: tuple):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def _evict_locked(self):
+        # Entries past their stale window are never served again - drop those first
+        expired_before = time.monotonic() - self.ttl - self.stale_ttl
+        for key in [key for key, (_, stored_at) in self._entries.items() if stored_at <= expired_before]:
+            del self._entries[key]
+            self.evictions += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.ttl > 0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "background_refreshes": self.refreshes,
+                "ttl_seconds": self.ttl,
+                "stale_ttl_seconds": self.stale_ttl
+            }
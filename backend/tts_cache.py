@@ -0,0 +1,197 @@
+"""
+Content-addressed cache for Fish.Audio TTS results.
+Repeat requests (same text, voice and parameters) are served from local disk
+instead of paying for another /tts call.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class TTSCache:
+    """
+    On-disk LRU cache of synthesized audio, keyed by a hash of the request.
+
+    Audio files live in ``cache_dir`` as ``<key[:2]>/<key>.<ext>`` (sharded by
+    key prefix so no directory gets too large) and an ``index.json``
+    file records their size and recency so the cache survives restarts.
+    Entries are evicted least-recently-used first once the total size
+    exceeds ``max_bytes``.
+    """
+
+    INDEX_FILE = "index.json"
+    KEY_VERSION = 1
+
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> {"file", "size", "last_access"}
+        self._total_bytes = 0
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+
+    @classmethod
+    def make_key(cls, payload: dict, format: str) -> str:
+        """
+        Build the cache key for a TTS request.
+
+        The payload is canonicalized (None values dropped, keys sorted,
+        compact separators) so equivalent requests hash identically
+        regardless of argument order.
+        """
+        canonical = {k: v for k, v in payload.items() if v is not None}
+        canonical["_format"] = format
+        canonical["_v"] = cls.KEY_VERSION
+        encoded = json.dumps(
+            canonical,
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached file for ``key`` or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            path = self.cache_dir / entry["file"]
+            if not path.exists():
+                # File removed behind our back - forget about it
+                self._drop_locked(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            entry["last_access"] = time.time()
+            self._dirty = True
+            self.hits += 1
+            return path
+
+    def put(self, key: str, source_path: Path) -> Path:
+        """
+        Copy a freshly synthesized file into the cache.
+
+        Args:
+            key: Cache key from make_key()
+            source_path: The generated audio file
+
+        Returns:
+            Path of the cached copy
+        """
+        source_path = Path(source_path)
+        ext = source_path.suffix.lstrip(".") or "mp3"
+        dest = self.cache_dir / key[:2] / f"{key}.{ext}"
+        dest.parent.mkdir(exist_ok=True)
+
+        # Copy to a private temp name first so readers never see a partial file
+        tmp = dest.parent / f"{key}.{threading.get_ident()}.tmp"
+        shutil.copyfile(source_path, tmp)
+        os.replace(tmp, dest)
+
+        self._add_entry(key, dest)
+        return dest
+
+    def _add_entry(self, key: str, path: Path):
+        """Record a file that is already in place under the cache directory."""
+        size = path.stat().st_size
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries[key]["size"]
+            self._entries[key] = {
+                "file": path.relative_to(self.cache_dir).as_posix(),
+                "size": size,
+                "last_access": time.time()
+            }
+            self._entries.move_to_end(key)
+            self._total_bytes += size
+            self._evict_locked()
+            self._save_index_locked()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": True,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+    def flush(self):
+        """Persist recency updates from cache hits to the index file."""
+        with self._lock:
+            if self._dirty:
+                self._save_index_locked()
+
+    def _evict_locked(self):
+        # Never evict the entry we just added, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            path = self.cache_dir / self._entries[key]["file"]
+            self._drop_locked(key)
+            self.evictions += 1
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _drop_locked(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry["size"]
+        self._dirty = True
+
+    def _load_index(self):
+        index_path = self.cache_dir / self.INDEX_FILE
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            stored = []
+
+        # Index is stored oldest-first so the OrderedDict keeps LRU order
+        for item in stored:
+            path = self.cache_dir / item["file"]
+            if not path.exists():
+                continue
+            self._entries[item["key"]] = {
+                "file": item["file"],
+                "size": item["size"],
+                "last_access": item["last_access"]
+            }
+            self._total_bytes += item["size"]
+
+        with self._lock:
+            self._evict_locked()
+
+    def _save_index_locked(self):
+        index_path = self.cache_dir / self.INDEX_FILE
+        tmp = index_path.with_suffix(f".{threading.get_ident()}.tmp")
+        data = [{"key": key, **entry} for key, entry in self._entries.items()]
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, index_path)
+        self._dirty = False
@@ -2,19 +2,87 @@
 Voice Service Client for Fish.Audio API
 Integrates Fish.Audio's paid API service for text-to-speech synthesis.
 """
+import hashlib
+import io
 import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import wave
 import requests
-from pathlib import Path
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Optional, Tuple
 from datetime import datetime
 from config import Config
+from http_transport import FishAudioTransport
+from audio_probe import probe_duration
+from audio_normalize import normalize_reference
+from audio_segment import decode_pcm, extract_best_segment
+from mp3_frames import audio_frames
+from multipart_stream import MultipartStream, file_size
+from output_allocator import OutputFileAllocator
+from output_retention import OutputRetention
+from reference_index import FINGERPRINT_MAX_SECONDS, ReferenceIndex, content_hash, pcm_fingerprint
+from singleflight import FlightRegistry
+from text_chunker import split_text
+from tts_cache import TTSCache
+from ttl_cache import TTLCache
 
 
-class VoiceServiceWrapper:
-    """Wrapper around Fish.Audio API for text-to-speech synthesis."""
+# Size of the audio chunks read from Fish.Audio and sent on to clients
+STREAM_CHUNK_SIZE = 8192
+
+# Cache entries are named by the sha256 of their request, so their URLs never change content
+_CONTENT_NAME = re.compile(r"[0-9a-f]{64}")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class SynthesisStream:
+    """
+    Audio chunks for one synthesis request.
+    
+    Iterate to receive the audio bytes; result() gives the same dict that
+    synthesize() returns (audio_path, audio_url, ...). Always iterate to the
+    end or call close() so the upstream connection is released.
+    """
+    
+    def __init__(self, chunks, result: dict, on_abandon=None):
+        self._chunks = chunks
+        self._result = result
+        self._on_abandon = on_abandon
+        self._started = False
+        self.audio_url = result["audio_url"]
+        self.cached = result["cached"]
+    
+    def __iter__(self):
+        self._started = True
+        return self._chunks
+    
+    def close(self):
+        if not self._started and self._on_abandon:
+            # Generator never ran, so its own cleanup won't either
+            self._on_abandon()
+        self._chunks.close()
+    
+    def result(self) -> dict:
+        return dict(self._result)
+
+
+class VoiceServiceBase:
+    """
+    State and helpers shared by VoiceServiceWrapper and
+    AsyncVoiceServiceWrapper: configuration, output directory, caches,
+    indexes, payload building and result shaping - everything that
+    doesn't depend on sync vs. async I/O. The subclasses add the
+    transport, flight registries and the public synthesis and upload
+    methods.
+    """
     
     def __init__(self):
-        """Initialize the voice service with API configuration from environment."""
+        """Initialize the shared state with API configuration from environment."""
         self.api_key = Config.FISH_AUDIO_API_KEY
         self.api_url = Config.FISH_AUDIO_API_URL
         
@@ -25,29 +93,479 @@ class VoiceServiceWrapper:
         backend_dir = Path(__file__).parent
         self.output_dir = backend_dir / "outputs"
         self.output_dir.mkdir(exist_ok=True)
+        self.allocator = OutputFileAllocator(self.output_dir)
+        
+        # Content-addressed cache of previous results (outputs/cache)
+        self.cache = None
+        if Config.TTS_CACHE_ENABLED:
+            self.cache = TTSCache(self.output_dir / "cache", Config.TTS_CACHE_MAX_BYTES)
+        
+        # Delete old / least-recently-served clips in the background (cache/ has its own LRU)
+        self.retention = OutputRetention(
+            self.output_dir,
+            max_age_seconds=Config.OUTPUT_MAX_AGE_HOURS * 3600,
+            max_bytes=Config.OUTPUT_MAX_BYTES
+        )
+        self.retention.start(Config.OUTPUT_SWEEP_INTERVAL)
+        
+        # Voice model listings, answered from memory and refreshed in the background
+        self.voices_cache = TTLCache(
+            Config.VOICES_CACHE_TTL,
+            Config.VOICES_CACHE_STALE_TTL,
+            max_entries=Config.VOICES_CACHE_MAX_ENTRIES
+        )
+        
+        # Reference audio already turned into a model, per user (re-uploads reuse it)
+        self.references = None
+        if Config.REFERENCE_DEDUP_ENABLED:
+            self.references = ReferenceIndex(backend_dir / Config.REFERENCE_INDEX_DB)
         
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
     
-    def _get_next_voice_number(self) -> int:
-        """Get the next sequential voice number."""
-        # Check for both .wav and .mp3 files
-        voice_files = list(self.output_dir.glob("voice_*.*"))
-        if not voice_files:
-            return 1
+    @staticmethod
+    def _batch_concurrency(concurrency: int = None) -> int:
+        if not concurrency or concurrency < 1:
+            return Config.TTS_BATCH_CONCURRENCY
+        return min(concurrency, Config.TTS_BATCH_CONCURRENCY)
+    
+    @staticmethod
+    def _batch_item_args(item) -> dict:
+        """Validate one batch item and return the synthesize() arguments."""
+        if not isinstance(item, dict) or not item.get('text'):
+            raise ValueError("Text is required")
+        return {
+            "text": item['text'],
+            "reference_id": item.get('reference_id'),
+            "voice_id": item.get('voice_id'),
+            "format": item.get('format', 'mp3')
+        }
+    
+    def _build_payload(self, text: str, reference_id: str, voice_id: str, extra: dict) -> dict:
+        """Build the /tts request payload."""
+        # NOTE: Don't send format parameter - Fish.Audio WAV export is broken
+        # API defaults to MP3 which works correctly
+        payload = {
+            "text": text,
+            **extra
+        }
         
-        # Extract numbers from filenames
-        numbers = []
-        for f in voice_files:
-            try:
-                num = int(f.stem.split('_')[1])
-                numbers.append(num)
-            except (IndexError, ValueError):
-                continue
+        if reference_id:
+            payload["reference_id"] = reference_id
+        if voice_id:
+            payload["voice_id"] = voice_id
+        
+        return payload
+    
+    def _cache_lookup(self, payload: dict, format: str, output_path: str = None):
+        """
+        Check the TTS cache for a request.
+        
+        Returns:
+            (cache_key, cached_path) - cache_key is None when caching is off,
+            cached_path is None on a miss. On a hit with an explicit
+            output_path, the audio is copied there and that path is returned.
+        """
+        if not self.cache:
+            return None, None
+        
+        cache_key = TTSCache.make_key(payload, format)
+        cached_path = self.cache.get(cache_key)
+        if cached_path and output_path is not None:
+            output_path = Path(output_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached_path, output_path)
+            cached_path = output_path
+        return cache_key, cached_path
+    
+    def _prepare_output(self, output_path: str, format: str):
+        """
+        Resolve where a synthesis result will be written.
+        
+        Returns:
+            (output_path, reserved) - reserved is True when the file was
+            allocated here rather than supplied by the caller
+        """
+        if output_path is None:
+            # Reserve the next sequential numbered filename (use MP3 extension)
+            file_ext = "mp3" if format == "mp3" else format
+            return self.allocator.allocate(file_ext), True
+        
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        return output_path, False
+    
+    @staticmethod
+    def _long_text_chunks(text: str) -> list:
+        """Chunks for long-text mode, or an empty list if text should go in one request."""
+        if len(text) <= Config.TTS_LONG_TEXT_THRESHOLD:
+            return []
+        chunks = split_text(text, Config.TTS_FIRST_CHUNK_CHARS, Config.TTS_MAX_CHUNK_CHARS)
+        return chunks if len(chunks) > 1 else []
+    
+    def _finish_output(self, output_path: Path, cache_key: str = None):
+        """Hand a fully written clip to the cache and to retention."""
+        if cache_key:
+            self.cache.put(cache_key, output_path)
+        self.retention.add(output_path)
+    
+    def _synthesis_result(self, audio_path: Path, cached: bool = False) -> dict:
+        """Build the result dict returned by synthesize()."""
+        audio_path = Path(audio_path)
+        try:
+            # Keep sub-directories (e.g. cache/) in the public URL
+            url_path = audio_path.relative_to(self.output_dir).as_posix()
+        except ValueError:
+            url_path = audio_path.name
+        
+        return {
+            "audio_path": str(audio_path),
+            "audio_url": f"/outputs/{url_path}",
+            "cached": cached,
+            "message": "Speech synthesized successfully"
+        }
+    
+    def output_cache_policy(self, url_path: str) -> Tuple[Optional[str], str]:
+        """
+        HTTP caching for a file served from /outputs.
+        
+        Args:
+            url_path: Path below /outputs (e.g. 'cache/<key>.mp3')
+        
+        Returns:
+            (etag, cache_control) - etag is the content name for cache
+            entries, or None to let the server derive one from the file
+        """
+        path = PurePosixPath(url_path)
+        if path.parts[:1] == ("cache",) and _CONTENT_NAME.fullmatch(path.stem):
+            return path.stem, IMMUTABLE_CACHE_CONTROL
+        # Numbered files are never rewritten, but may be removed - revalidate
+        return None, "no-cache"
+    
+    def get_retention_stats(self) -> dict:
+        """
+        Get usage and eviction counters for the output directory.
+        
+        Returns:
+            Dict with tracked files, bytes, limits and sweep counters
+        """
+        return self.retention.stats()
+    
+    def get_coalescing_stats(self) -> dict:
+        """
+        Get counters for request coalescing.
+        
+        Returns:
+            Dict with in-flight, upstream and coalesced request counts
+        """
+        return self.flights.stats()
+    
+    def get_voices_cache_stats(self) -> dict:
+        """
+        Get hit/miss statistics for the voice listing cache.
+        
+        Returns:
+            Dict with cache counters and TTLs
+        """
+        return self.voices_cache.stats()
+    
+    def get_cache_stats(self) -> dict:
+        """
+        Get hit/miss statistics for the TTS result cache.
+        
+        Returns:
+            Dict with cache counters and usage
+        """
+        if not self.cache:
+            return {"enabled": False}
+        self.cache.flush()
+        return self.cache.stats()
+    
+    def _voices_account(self) -> str:
+        # Listings belong to the account, so cache them under (a hash of) the API key
+        return hashlib.sha256(self.api_key.encode("utf-8")).hexdigest()[:16]
+    
+    def _voices_cache_key(self, params: dict) -> tuple:
+        return (self._voices_account(), *sorted(params.items()))
+    
+    @staticmethod
+    def _reference_identity(audio_file) -> dict:
+        """Content hash, PCM fingerprint and duration used to spot re-uploads."""
+        identity = {
+            "sha256": content_hash(audio_file),
+            "fingerprint": None,
+            "duration": probe_duration(audio_file)
+        }
+        try:
+            # Only the fingerprinted start of the clip is decoded
+            identity["fingerprint"] = pcm_fingerprint(
+                *decode_pcm(audio_file, max_seconds=FINGERPRINT_MAX_SECONDS)
+            )
+        except (ImportError, RuntimeError, ValueError, OSError, wave.Error, subprocess.SubprocessError):
+            # Can't decode here (e.g. MP3 without ffmpeg) - exact matches only
+            pass
+        return identity
+    
+    @staticmethod
+    def _voices_result(models) -> dict:
+        if isinstance(models, dict):
+            # Paged upstream response ({"total", "items"})
+            count = models.get("total", len(models.get("items", [])))
+        else:
+            count = len(models) if isinstance(models, list) else 0
+        return {
+            "models": models,
+            "count": count
+        }
+    
+    @staticmethod
+    def _voices_page_size(page_size: int = None) -> int:
+        if not page_size or page_size < 1:
+            return Config.VOICES_PAGE_SIZE
+        return min(page_size, Config.VOICES_MAX_PAGE_SIZE)
+    
+    @staticmethod
+    def _voices_params(page_size: int, page_number: int, title: str = None) -> dict:
+        params = {"page_size": page_size, "page_number": page_number}
+        if title:
+            params["title"] = title
+        return params
+    
+    @classmethod
+    def _listing_items(cls, data, page_size: int, title: str = None) -> Tuple[list, bool]:
+        """
+        Models in an upstream listing page.
+        
+        Returns:
+            (models, whole) - whole is True when Fish.Audio ignored paging and
+            sent every model (a bare list, or more items than page_size); the
+            models are then filtered by title here
+        """
+        if isinstance(data, list):
+            return cls._filter_voices(data, title), True
+        items = data.get("items", [])
+        if len(items) > page_size:
+            return cls._filter_voices(items, title), True
+        return items, False
+    
+    @staticmethod
+    def _filter_voices(models: list, title: str = None) -> list:
+        if not title:
+            return models
+        title = title.lower()
+        return [m for m in models if title in str(m.get("title", "")).lower()]
+    
+    @staticmethod
+    def _paged_voices_result(models: list, total: int, offset: int, page_size: int) -> dict:
+        end = offset + len(models)
+        return {
+            "models": models,
+            "count": len(models),
+            "total": total,
+            "offset": offset,
+            "page_size": page_size,
+            "next_offset": end if models and end < total else None
+        }
+    
+    @staticmethod
+    def _voices_unavailable() -> dict:
+        return {
+            "message": "Fish.Audio voice models",
+            "note": "Upload reference audio to create voice models"
+        }
+    
+    @classmethod
+    def _prepare_reference(cls, audio_file):
+        """
+        Measure a reference clip, replacing over-long clips with their best segment.
+        
+        Clips longer than REFERENCE_TRIM_SECONDS are decoded and the window
+        (REFERENCE_WINDOW_MIN_SECONDS up to REFERENCE_TRIM_SECONDS long) with
+        the most speech is cut out, so only that is uploaded.
+        
+        Returns:
+            (file to upload, duration, segment) - segment describes the cut
+            ({"start_seconds", "end_seconds", "original_duration_seconds"})
+            or is None when the clip is used as-is
+        """
+        duration = probe_duration(audio_file)
+        trim_above = Config.REFERENCE_TRIM_SECONDS
+        if duration is None or not trim_above or duration <= trim_above:
+            return audio_file, cls._check_duration(audio_file), None
+        
+        # Decoded from the file and only the chosen window is read back out
+        extracted = extract_best_segment(
+            audio_file,
+            Config.REFERENCE_WINDOW_MIN_SECONDS,
+            trim_above
+        )
+        if extracted is None:
+            # Couldn't analyze it here - upload the whole clip if Fish.Audio will take it
+            return audio_file, cls._check_duration(audio_file), None
+        
+        data, start, end = extracted
+        segment_file = io.BytesIO(data)
+        segment = {
+            "start_seconds": round(start, 2),
+            "end_seconds": round(end, 2),
+            "original_duration_seconds": round(duration, 2)
+        }
+        return segment_file, cls._check_duration(segment_file), segment
+    
+    @classmethod
+    def _normalize_reference(cls, upload_file, filename: str, duration: Optional[float]):
+        """
+        Shrink a reference clip to what voice cloning needs before uploading it.
+        
+        The clip is downmixed to mono, resampled to REFERENCE_SAMPLE_RATE,
+        trimmed of leading/trailing silence and re-encoded (MP3 with the
+        ffmpeg binary, 16-bit WAV without it). The original is kept if it
+        can't be decoded here or is already smaller.
+        
+        Returns:
+            (file to upload, filename, duration, normalization) -
+            normalization records the before/after sizes, or is None when
+            the clip is sent unchanged
+        """
+        if not Config.REFERENCE_NORMALIZE_ENABLED:
+            return upload_file, filename, duration, None
+        
+        started = time.perf_counter()
+        # Decoded from the file itself - only a re-encoded clip is built in memory
+        normalized = normalize_reference(upload_file, Config.REFERENCE_SAMPLE_RATE)
+        if normalized is None:
+            return upload_file, filename, duration, None
+        
+        normalized_file = io.BytesIO(normalized["data"])
+        normalization = {
+            "original_bytes": file_size(upload_file),
+            "uploaded_bytes": len(normalized["data"]),
+            "format": normalized["format"],
+            "sample_rate": normalized["sample_rate"],
+            "channels": 1,
+            "trimmed_seconds": normalized["trimmed_seconds"],
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        print(
+            f"Normalized reference audio: {normalization['original_bytes']} -> "
+            f"{normalization['uploaded_bytes']} bytes ({normalization['format']}, "
+            f"{normalization['sample_rate']} Hz mono)"
+        )
+        filename = f"{Path(filename).stem}.{normalized['format']}"
+        # Trimming silence can take a clip under the minimum length
+        return normalized_file, filename, cls._check_duration(normalized_file), normalization
+    
+    @classmethod
+    def _check_duration(cls, audio_file) -> Optional[float]:
+        """
+        Reject clips Fish.Audio would refuse, without uploading them.
+        
+        Returns:
+            Measured duration in seconds (None for formats we can't probe)
+        """
+        duration = probe_duration(audio_file)
+        if duration is None:
+            # Unknown container - fall back to the size estimate
+            cls._check_upload_size(file_size(audio_file))
+        elif duration > Config.REFERENCE_MAX_SECONDS:
+            raise ValueError(f"Audio is too long ({duration:.0f} seconds). Fish.Audio requires audio under {Config.REFERENCE_MAX_SECONDS:.0f} seconds. Please upload a shorter clip (10-30 seconds recommended).")
+        elif duration < Config.REFERENCE_MIN_SECONDS:
+            raise ValueError(f"Audio is too short ({duration:.1f} seconds). Please upload at least {Config.REFERENCE_MIN_SECONDS:.0f} seconds of speech (10-30 seconds recommended).")
+        return duration
+    
+    @staticmethod
+    def _check_upload_size(size_bytes: int):
+        # Check file size (rough estimate: 1MB ≈ 60 seconds for MP3)
+        file_size_mb = size_bytes / (1024 * 1024)
+        if file_size_mb > 10:  # Rough check - 10MB is likely > 270 seconds
+            raise ValueError(f"Audio file is too large ({file_size_mb:.1f}MB). Fish.Audio requires audio under 270 seconds (4.5 minutes). Please upload a shorter clip (10-30 seconds recommended).")
+    
+    @staticmethod
+    def _audio_content_type(filename: str) -> str:
+        return 'audio/mpeg' if Path(filename).suffix == '.mp3' else 'audio/wav'
+    
+    @staticmethod
+    def _model_form_data(name: str = None) -> dict:
+        """Form fields for the Fish.Audio model creation request."""
+        return {
+            'type': 'tts',
+            'train_mode': 'fast',
+            'title': name or f'Voice Model {datetime.now().strftime("%Y%m%d_%H%M%S")}',
+            'texts': 'Reference audio for voice cloning',
+            'visibility': 'private'  # Make models private (no cover image required)
+        }
+    
+    @staticmethod
+    def _check_model_response(status_code: int, error_msg: str):
+        """Better error handling for Fish.Audio errors"""
+        if status_code == 400:
+            if "too long" in error_msg.lower() or "270" in error_msg:
+                raise ValueError("Audio file is too long! Fish.Audio requires audio under 270 seconds (4.5 minutes). Please upload a 10-30 second clip instead.")
+            elif "cover image" in error_msg.lower():
+                raise ValueError("Fish.Audio requires a cover image for public models. The model visibility has been set to private to avoid this issue. Please try again.")
+            else:
+                raise ValueError(f"Fish.Audio rejected the audio: {error_msg}")
+    
+    @staticmethod
+    def _existing_model_result(model_id: str, duration: float = None) -> dict:
+        return {
+            "model_id": model_id,
+            "reference_id": model_id,
+            "duration_seconds": round(duration, 2) if duration is not None else None,
+            "deduplicated": True,
+            "message": f"Voice model already exists for this audio! ID: {model_id}"
+        }
+    
+    @staticmethod
+    def _model_result(
+        result: dict,
+        duration: float = None,
+        segment: dict = None,
+        normalization: dict = None
+    ) -> dict:
+        model_id = result.get('id') or result.get('_id')
+        
+        model_result = {
+            "model_id": model_id,
+            "reference_id": model_id,
+            "duration_seconds": round(duration, 2) if duration is not None else None,
+            "message": f"Voice model created! ID: {model_id}"
+        }
+        if segment:
+            model_result["segment"] = segment
+        if normalization:
+            model_result["normalization"] = normalization
+        return model_result
+
+
+class VoiceServiceWrapper(VoiceServiceBase):
+    """Wrapper around Fish.Audio API for text-to-speech synthesis."""
+    
+    def __init__(self):
+        """Initialize the voice service with API configuration from environment."""
+        super().__init__()
+        
+        # Identical concurrent requests are coalesced into one upstream call
+        self.flights = FlightRegistry()
+        self.reference_flights = FlightRegistry()
+        
+        # Shared keep-alive connection pool for every Fish.Audio call
+        self.transport = FishAudioTransport(
+            self.api_key,
+            pool_size=Config.FISH_AUDIO_POOL_SIZE,
+            connect_timeout=Config.FISH_AUDIO_CONNECT_TIMEOUT,
+            read_timeout=Config.FISH_AUDIO_READ_TIMEOUT,
+            max_retries=Config.FISH_AUDIO_MAX_RETRIES,
+            backoff_base=Config.FISH_AUDIO_BACKOFF_BASE
+        )
         
-        return max(numbers) + 1 if numbers else 1
+        # Bounded pool for synthesizing the chunks of long texts in parallel
+        self._chunk_pool = ThreadPoolExecutor(
+            max_workers=Config.TTS_LONG_TEXT_WORKERS,
+            thread_name_prefix="tts-chunk"
+        )
     
     def synthesize(
         self,
@@ -72,159 +590,515 @@ class VoiceServiceWrapper:
         Returns:
             Path to the generated audio file
         """
+        stream = self.synthesize_stream(
+            text,
+            output_path=output_path,
+            reference_id=reference_id,
+            voice_id=voice_id,
+            format=format,
+            **kwargs
+        )
+        
+        # Drain the stream - every chunk is written to disk as it is read
+        if not stream.cached:
+            for _ in stream:
+                pass
+        stream.close()
+        
+        return stream.result()
+    
+    def synthesize_stream(
+        self,
+        text: str,
+        output_path: str = None,
+        reference_id: str = None,
+        voice_id: str = None,
+        format: str = "mp3",
+        **kwargs
+    ) -> "SynthesisStream":
+        """
+        Start synthesizing speech and return the audio as it arrives.
+        
+        The upstream request is made before this returns, so API errors are
+        raised here rather than halfway through a response. Chunks are written
+        to disk (and the cache) as the caller consumes them.
+        
+        Args:
+            Same as synthesize()
+            
+        Returns:
+            SynthesisStream yielding audio bytes
+        """
+        payload = self._build_payload(text, reference_id, voice_id, kwargs)
+        
+        # Serve repeat requests straight from the on-disk cache
+        cache_key, cached_path = self._cache_lookup(payload, format, output_path)
+        if cached_path:
+            return SynthesisStream(
+                self._iter_file(cached_path),
+                self._synthesis_result(cached_path, cached=True)
+            )
+        
+        # Identical requests already in flight share one upstream call
+        flight = None
         if output_path is None:
-            # Generate sequential numbered filename (use MP3 extension)
-            voice_num = self._get_next_voice_number()
-            file_ext = "mp3" if format == "mp3" else format
-            output_path = self.output_dir / f"voice_{voice_num:03d}.{file_ext}"
-        else:
-            output_path = Path(output_path)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
+            flight_key = cache_key or TTSCache.make_key(payload, format)
+            flight, leader = self.flights.join(flight_key)
+            if not leader:
+                return self._follow_flight(flight)
         
-        # Prepare API request payload
-        # NOTE: Don't send format parameter - Fish.Audio WAV export is broken
-        # API defaults to MP3 which works correctly
-        payload = {
-            "text": text,
-            **kwargs
-        }
+        try:
+            stream = self._start_synthesis(payload, format, output_path, cache_key)
+        except BaseException as e:
+            if flight:
+                flight.fail(e)
+                self.flights.land(flight_key, flight)
+            raise
         
-        if reference_id:
-            payload["reference_id"] = reference_id
-        if voice_id:
-            payload["voice_id"] = voice_id
+        if flight:
+            return self._lead_flight(stream, flight, flight_key)
+        return stream
+    
+    def _start_synthesis(
+        self,
+        payload: dict,
+        format: str,
+        output_path: str = None,
+        cache_key: str = None
+    ) -> "SynthesisStream":
+        """Send the upstream request(s) for a cache miss."""
+        output_path, reserved = self._prepare_output(output_path, format)
+        
+        # Long texts: synthesize sentence chunks in parallel and join the MP3 frames
+        chunks = self._long_text_chunks(payload["text"])
+        if chunks:
+            return self._synthesize_long_stream(payload, chunks, output_path, cache_key)
         
-        # Make API request to Fish.Audio
+        # Make API request to Fish.Audio (TTS has no side effects, so it is safe to retry)
         try:
-            response = requests.post(
+            response = self.transport.post(
                 f"{self.api_url}/tts",
-                headers=self.headers,
                 json=payload,
-                stream=True
+                stream=True,
+                idempotent=True
             )
             response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if reserved:
+                self.allocator.release(output_path)
+            raise RuntimeError(f"Fish.Audio API request failed: {str(e)}")
+        
+        def abandon():
+            response.close()
+            Path(output_path).unlink(missing_ok=True)
+        
+        return SynthesisStream(
+            self._tee_to_disk(response, output_path, cache_key),
+            self._synthesis_result(output_path),
+            on_abandon=abandon
+        )
+    
+    def _lead_flight(self, stream: "SynthesisStream", flight, key: str) -> "SynthesisStream":
+        """Wrap the leader's stream so coalesced followers can track its progress."""
+        flight.start(stream.result())
+        
+        def abandon():
+            stream.close()
+            flight.fail(RuntimeError("Synthesis was cancelled"))
+            self.flights.land(key, flight)
+        
+        return SynthesisStream(
+            self._report_progress(stream, flight, key),
+            stream.result(),
+            on_abandon=abandon
+        )
+    
+    def _report_progress(self, stream: "SynthesisStream", flight, key: str):
+        try:
+            for chunk in stream:
+                # Resuming the inner stream wrote the previous chunk to disk
+                flight.progress()
+                yield chunk
+            flight.finish()
+        except GeneratorExit:
+            flight.fail(RuntimeError("Synthesis was cancelled"))
+            raise
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        finally:
+            stream.close()
+            self.flights.land(key, flight)
+    
+    def _follow_flight(self, flight) -> "SynthesisStream":
+        """Attach to an identical synthesis that is already in progress."""
+        flight.wait_started()
+        result = flight.result
+        return SynthesisStream(self._tail_file(flight), result)
+    
+    @staticmethod
+    def _tail_file(flight):
+        """Yield the leader's output file as it grows, until the leader finishes."""
+        with open(flight.result["audio_path"], 'rb') as f:
+            while True:
+                done = flight.done
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                    continue
+                if flight.error is not None:
+                    raise RuntimeError(f"Coalesced synthesis failed: {flight.error}")
+                if done:
+                    break
+                flight.wait_progress(timeout=0.25)
+    
+    def synthesize_batch(self, items: list, concurrency: int = None):
+        """
+        Synthesize many texts with bounded concurrency.
+        
+        Args:
+            items: List of dicts with text and optional reference_id/voice_id
+            concurrency: Maximum items in flight (capped at TTS_BATCH_CONCURRENCY)
             
-            # Save audio file
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
+        Yields:
+            One result dict per item, in input order, as soon as that item
+            (and every item before it) has finished. A failed item yields
+            {"index", "success": False, "error"} and the batch carries on.
+        """
+        workers = self._batch_concurrency(concurrency)
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-batch")
+        try:
+            futures = [
+                executor.submit(self._synthesize_batch_item, index, item)
+                for index, item in enumerate(items)
+            ]
+            for future in futures:
+                yield future.result()
+        finally:
+            # Stop queued items if the caller goes away early
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _synthesize_batch_item(self, index: int, item) -> dict:
+        try:
+            result = self.synthesize(**self._batch_item_args(item))
+            return {"index": index, "success": True, **result}
+        except Exception as e:
+            return {"index": index, "success": False, "error": str(e)}
+    
+    def _tee_to_disk(self, response, output_path: Path, cache_key: str = None):
+        """Yield upstream audio chunks while saving them to output_path."""
+        completed = False
+        try:
+            # Unbuffered so coalesced followers can read each chunk straight away
+            with response, open(output_path, 'wb', buffering=0) as f:
+                for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+                    yield chunk
                     f.write(chunk)
-            
-            return {
-                "audio_path": str(output_path),
-                "audio_url": f"/outputs/{Path(output_path).name}",
-                "message": "Speech synthesized successfully"
-            }
-            
+            completed = True
+        except requests.exceptions.RequestException as e:
+            raise RuntimeError(f"Fish.Audio API request failed: {str(e)}")
+        finally:
+            if not completed:
+                # Client went away or upstream failed - don't leave a truncated clip
+                Path(output_path).unlink(missing_ok=True)
+        
+        self._finish_output(output_path, cache_key)
+    
+    def _synthesize_long_stream(
+        self,
+        payload: dict,
+        chunks: list,
+        output_path: Path,
+        cache_key: str = None
+    ) -> "SynthesisStream":
+        """Synthesize text chunks concurrently and stream them back in order."""
+        futures = [
+            self._chunk_pool.submit(self._fetch_audio, {**payload, "text": chunk})
+            for chunk in chunks
+        ]
+        
+        def abandon():
+            for future in futures:
+                future.cancel()
+            Path(output_path).unlink(missing_ok=True)
+        
+        # The first chunk is short - wait for it so API errors surface before streaming
+        try:
+            futures[0].result()
+        except Exception:
+            abandon()
+            raise
+        
+        return SynthesisStream(
+            self._stitch_to_disk(futures, output_path, cache_key),
+            self._synthesis_result(output_path),
+            on_abandon=abandon
+        )
+    
+    def _fetch_audio(self, payload: dict) -> bytes:
+        """Synthesize one payload and return the whole MP3 in memory."""
+        try:
+            response = self.transport.post(
+                f"{self.api_url}/tts",
+                json=payload,
+                idempotent=True
+            )
+            response.raise_for_status()
+            return response.content
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Fish.Audio API request failed: {str(e)}")
     
-    def get_available_voices(self):
+    def _stitch_to_disk(self, futures: list, output_path: Path, cache_key: str = None):
+        """
+        Yield each chunk's audio frames in order while saving them to output_path.
+        
+        Tags and Xing/Info headers are stripped from every chunk so the joined
+        frames form one continuous MP3 stream - no re-encoding involved.
+        """
+        completed = False
+        try:
+            with open(output_path, 'wb', buffering=0) as f:
+                for future in futures:
+                    frames = audio_frames(future.result())
+                    yield frames
+                    f.write(frames)
+            completed = True
+        finally:
+            if not completed:
+                for future in futures:
+                    future.cancel()
+                Path(output_path).unlink(missing_ok=True)
+        
+        self._finish_output(output_path, cache_key)
+    
+    @staticmethod
+    def _iter_file(path: Path):
+        """Yield a file's contents in stream-sized chunks."""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def get_transport_stats(self) -> dict:
+        """
+        Get connection pool and retry statistics for Fish.Audio calls.
+        
+        Returns:
+            Dict with request counters and per-host pool usage
+        """
+        return self.transport.stats()
+    
+    def get_available_voices(self, page_size: int = None, offset: int = 0, title: str = None):
         """
         Get list of voice models from Fish.Audio API.
         
+        Without arguments this returns Fish.Audio's default listing. With
+        page_size, offset or title it returns one page of models, fetched
+        with upstream paging (page_size/page_number/title) - or sliced
+        locally if Fish.Audio returns the whole list at once.
+        
+        Listings are cached per API key for VOICES_CACHE_TTL seconds; after
+        that the old listing is still returned while a background thread
+        fetches a new one.
+        
+        Args:
+            page_size: Models per page (capped at VOICES_MAX_PAGE_SIZE)
+            offset: Number of models to skip
+            title: Only models whose title matches
+        
         Returns:
-            Dict with models list
+            Dict with models list (and total/next_offset when paging)
         """
         try:
-            response = requests.get(
-                "https://api.fish.audio/model",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                timeout=10
-            )
-            response.raise_for_status()
-            
-            models = response.json()
-            return {
-                "models": models,
-                "count": len(models) if isinstance(models, list) else 0
-            }
-            
+            if page_size is None and not offset and not title:
+                return self._voices_result(self._cached_voices_page({}))
+            return self._voices_slice(page_size, offset, title)
         except requests.exceptions.RequestException:
-            return {
-                "message": "Fish.Audio voice models",
-                "note": "Upload reference audio to create voice models"
-            }
+            return self._voices_unavailable()
     
-    def upload_reference_audio(self, audio_file_path: str, name: str = None):
+    def iter_voices(self, title: str = None):
+        """
+        Yield every voice model, one page at a time.
+        
+        Only one page is held in memory, so listings with thousands of
+        models can be streamed out as they are fetched.
+        """
+        offset = 0
+        while offset is not None:
+            page = self._voices_slice(Config.VOICES_MAX_PAGE_SIZE, offset, title)
+            yield from page["models"]
+            offset = page["next_offset"]
+    
+    def _voices_slice(self, page_size: int, offset: int, title: str = None) -> dict:
+        """One page of models starting at offset (at most two upstream pages)."""
+        page_size = self._voices_page_size(page_size)
+        offset = max(offset or 0, 0)
+        first, skip = divmod(offset, page_size)
+        data = self._cached_voices_page(self._voices_params(page_size, first + 1, title))
+        models, whole = self._listing_items(data, page_size, title)
+        if whole:
+            # Upstream ignored paging and returned everything - page through it locally
+            return self._paged_voices_result(models[offset:offset + page_size], len(models), offset, page_size)
+        
+        models, total = models[skip:skip + page_size], data.get("total", 0)
+        if skip and offset + len(models) < total:
+            more = self._cached_voices_page(self._voices_params(page_size, first + 2, title))
+            models += more.get("items", [])[:page_size - len(models)]
+        return self._paged_voices_result(models, total, offset, page_size)
+    
+    def _cached_voices_page(self, params: dict):
+        """Raw upstream listing for params, from the cache when possible."""
+        key = self._voices_cache_key(params)
+        data, state = self.voices_cache.get(key)
+        if state == TTLCache.STALE and self.voices_cache.begin_refresh(key):
+            threading.Thread(
+                target=self._refresh_voices,
+                args=(key, params),
+                name="voices-refresh",
+                daemon=True
+            ).start()
+        if state != TTLCache.MISSING:
+            return data
+        
+        generation = self.voices_cache.generation(key)
+        data = self._fetch_voices(params)
+        self.voices_cache.put(key, data, generation)
+        return data
+    
+    def _fetch_voices(self, params: dict):
+        response = self.transport.get(
+            "https://api.fish.audio/model",
+            params=params,
+            read_timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    def _refresh_voices(self, key: tuple, params: dict):
+        """Background refresh of a stale voice listing (keeps the old one on failure)."""
+        try:
+            generation = self.voices_cache.generation(key)
+            self.voices_cache.put(key, self._fetch_voices(params), generation)
+        except requests.exceptions.RequestException as e:
+            print(f"Warning: Could not refresh voice models: {e}")
+        finally:
+            self.voices_cache.end_refresh(key)
+    
+    def upload_reference_audio(
+        self,
+        audio_file_path,
+        name: str = None,
+        filename: str = None,
+        owner: str = None
+    ):
         """
         Upload reference audio to Fish.Audio and create a voice model.
         
+        The audio is streamed into the upstream multipart request straight
+        from its source - nothing is copied to a temp file.
+        
         Args:
-            audio_file_path: Path to audio file or bytes
+            audio_file_path: Path to audio file, bytes, or a binary file object
+                (e.g. an uploaded file's stream)
             name: Optional name for the voice model
+            filename: Filename to send for bytes / file objects (sets the content type)
+            owner: User the model is for - if they already uploaded the same
+                audio (byte-identical or re-encoded), that model is returned.
+                Uploads without an owner are never de-duplicated.
             
         Returns:
-            Dict with model_id (reference_id)
+            Dict with model_id (reference_id); deduplicated is True when an
+            existing model was reused
             
         Note:
-            Fish.Audio requires audio to be LESS THAN 270 seconds (4.5 minutes)
+            Fish.Audio requires audio to be LESS THAN 270 seconds (4.5 minutes).
+            WAV and MP3 durations are measured from their headers and checked
+            against REFERENCE_MIN_SECONDS / REFERENCE_MAX_SECONDS locally;
+            the result includes the measured duration_seconds. Clips longer
+            than REFERENCE_TRIM_SECONDS are cut down to their densest window
+            of speech first (see _prepare_reference).
         """
-        # Handle file path or bytes
         if isinstance(audio_file_path, (str, Path)):
             audio_path = Path(audio_file_path)
             if not audio_path.exists():
                 raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
-            file_to_upload = audio_path
-            
-            # Check file size (rough estimate: 1MB ≈ 60 seconds for MP3)
-            file_size_mb = audio_path.stat().st_size / (1024 * 1024)
-            if file_size_mb > 10:  # Rough check - 10MB is likely > 270 seconds
-                raise ValueError(f"Audio file is too large ({file_size_mb:.1f}MB). Fish.Audio requires audio under 270 seconds (4.5 minutes). Please upload a shorter clip (10-30 seconds recommended).")
+            audio_file = open(audio_path, 'rb')
+            filename = audio_path.name
+        elif isinstance(audio_file_path, (bytes, bytearray)):
+            audio_file = io.BytesIO(audio_file_path)
         else:
-            # Save bytes to temp file
-            import uuid
-            temp_dir = Path("temp")
-            temp_dir.mkdir(exist_ok=True)
-            file_to_upload = temp_dir / f"{uuid.uuid4().hex}.wav"
-            file_to_upload.write_bytes(audio_file_path)
+            audio_file = audio_file_path
+        filename = filename or "reference.wav"
         
         try:
-            with open(file_to_upload, 'rb') as audio_file:
-                files = {
-                    'voices': (file_to_upload.name, audio_file, 
-                              'audio/mpeg' if file_to_upload.suffix == '.mp3' else 'audio/wav')
-                }
-                data = {
-                    'type': 'tts',
-                    'train_mode': 'fast',
-                    'title': name or f'Voice Model {datetime.now().strftime("%Y%m%d_%H%M%S")}',
-                    'texts': 'Reference audio for voice cloning',
-                    'visibility': 'private'  # Make models private (no cover image required)
-                }
-                
-                response = requests.post(
-                    "https://api.fish.audio/model",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    files=files,
-                    data=data,
-                    timeout=60
+            if not self.references or not owner:
+                # Anonymous uploads can't be matched to anyone's earlier model
+                return self._create_model(audio_file, name, filename)
+            
+            # Same audio from the same user (e.g. a mobile retry) reuses its model
+            owner = str(owner)
+            identity = self._reference_identity(audio_file)
+            match = self.references.find(owner, **identity)
+            if match:
+                return self._existing_model_result(match["model_id"], match["duration_seconds"])
+            
+            # Identical uploads still in progress wait for the first one
+            key = f"{owner}:{identity['sha256']}"
+            flight, is_leader = self.reference_flights.join(key)
+            if not is_leader:
+                flight.wait_started()
+                return self._existing_model_result(
+                    flight.result["model_id"], flight.result["duration_seconds"]
                 )
-                
-                # Better error handling for Fish.Audio errors
-                if response.status_code == 400:
-                    error_msg = response.text
-                    if "too long" in error_msg.lower() or "270" in error_msg:
-                        raise ValueError("Audio file is too long! Fish.Audio requires audio under 270 seconds (4.5 minutes). Please upload a 10-30 second clip instead.")
-                    elif "cover image" in error_msg.lower():
-                        raise ValueError("Fish.Audio requires a cover image for public models. The model visibility has been set to private to avoid this issue. Please try again.")
-                    else:
-                        raise ValueError(f"Fish.Audio rejected the audio: {error_msg}")
-                
-                response.raise_for_status()
-                
-                result = response.json()
-                model_id = result.get('id') or result.get('_id')
-                
-                return {
-                    "model_id": model_id,
-                    "reference_id": model_id,
-                    "message": f"Voice model created! ID: {model_id}"
-                }
-                
+            try:
+                result = self._create_model(audio_file, name, filename)
+                self.references.add(
+                    owner,
+                    model_id=result["model_id"],
+                    model_duration=result["duration_seconds"],
+                    **identity
+                )
+                flight.start(result)
+                flight.finish()
+                return result
+            except BaseException as e:
+                flight.fail(e)
+                raise
+            finally:
+                self.reference_flights.land(key, flight)
+        finally:
+            if audio_file is not audio_file_path:
+                audio_file.close()
+    
+    def _create_model(self, audio_file, name: str, filename: str) -> dict:
+        """Create a Fish.Audio voice model from an open reference clip."""
+        try:
+            # Measure (and if needed trim) the clip before sending it, so bad audio fails fast
+            upload_file, duration, segment = self._prepare_reference(audio_file)
+            upload_file, filename, duration, normalization = self._normalize_reference(
+                upload_file, filename, duration
+            )
+            body = MultipartStream(
+                self._model_form_data(name),
+                {'voices': (filename, upload_file, self._audio_content_type(filename))}
+            )
+            
+            # Model creation is not idempotent - only connect failures are retried
+            response = self.transport.post(
+                "https://api.fish.audio/model",
+                data=body,
+                headers={"Content-Type": body.content_type},
+                read_timeout=60
+            )
+            
+            self._check_model_response(response.status_code, response.text)
+            response.raise_for_status()
+            
+            # The new model must show up in the next listing
+            self.voices_cache.invalidate(self._voices_account())
+            return self._model_result(response.json(), duration, segment, normalization)
+            
         except requests.exceptions.RequestException as e:
             raise RuntimeError(f"Failed to create voice model: {str(e)}")
-        finally:
-            if not isinstance(audio_file_path, (str, Path)) and file_to_upload.exists():
-                file_to_upload.unlink()
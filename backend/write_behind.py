@@ -0,0 +1,224 @@
+"""
+Write-behind buffer for conversation messages.
+Messages are queued in memory and written to MongoDB in batches by a
+background thread, so adding a message doesn't wait for a database round
+trip.
+"""
+import datetime
+import threading
+from collections import deque
+from typing import Any, Callable, List, Tuple
+
+
+# MongoDB error code for a duplicate key (e.g. a retried insert that had landed)
+DUPLICATE_KEY = 11000
+# Per-document write errors worth retrying (failover, shutdown, timeouts, network);
+# anything else (validation failure, document too large, ...) will never succeed
+TRANSIENT_CODES = {
+    6, 7, 50, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436
+}
+# Rejected documents kept for inspection (see dead_letters)
+DEAD_LETTER_LIMIT = 1000
+
+
+class MessageWriteBuffer:
+    """
+    Batches inserts into one collection.
+
+    A batch is written with insert_many once ``max_batch`` documents are
+    waiting or ``flush_interval`` seconds have passed, whichever comes
+    first. Documents get their ``_id`` when they are added, so they can be
+    returned (and paged by cursor) before they reach the database;
+    pending() exposes them for read-your-writes. Documents that failed to
+    write with a transient error (or an unknown outcome, e.g. a dropped
+    connection) are put back and retried on the next flush - the _id makes
+    the retry idempotent - at most ``max_attempts`` times. Documents the
+    server rejects for good, or that run out of attempts, are logged and
+    moved to ``dead_letters`` (and passed to ``on_dead_letter``).
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_batch: int = 100,
+        flush_interval: float = 0.5,
+        max_attempts: int = 10,
+        on_dead_letter: Callable[[dict, str], None] = None
+    ):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.on_dead_letter = on_dead_letter
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        # Taken off _pending but not yet confirmed written - still visible to readers
+        self._in_flight = []
+        # _id -> failed attempts so far
+        self._attempts = {}
+        self.dead_letters = deque(maxlen=DEAD_LETTER_LIMIT)
+
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.batches = 0
+        self.written = 0
+        self.failures = 0
+        self.dead_lettered = 0
+
+    def add(self, document: dict) -> dict:
+        """Queue a document (an _id is assigned if it has none) and return it."""
+        from bson.objectid import ObjectId
+
+        document.setdefault("_id", ObjectId())
+        with self._lock:
+            self._pending.append(document)
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wakeup.set()
+        return document
+
+    def pending(self, **match) -> List[dict]:
+        """Copies of queued documents whose fields equal match (e.g. echo_id=...)."""
+        with self._lock:
+            queued = self._in_flight + self._pending
+        return [
+            dict(doc) for doc in queued
+            if all(doc.get(field) == value for field, value in match.items())
+        ]
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far.
+
+        Returns:
+            Number of documents written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._in_flight = batch
+            if not batch:
+                return 0
+            try:
+                self.collection.insert_many(batch, ordered=False)
+                retry, rejected = [], []
+            except Exception as e:
+                retry, rejected = self._unwritten(batch, e)
+                if retry or rejected:
+                    print(f"Warning: Could not write {len(retry) + len(rejected)} of {len(batch)} messages: {e}")
+
+            unwritten = {id(doc) for doc in retry} | {id(doc) for doc, _ in rejected}
+            written = [doc for doc in batch if id(doc) not in unwritten]
+            retry, exhausted = self._count_attempts(retry)
+            rejected += exhausted
+            with self._lock:
+                # Failed documents go back in front for the next attempt
+                self._pending = retry + self._pending
+                self._in_flight = []
+                self.written += len(written)
+                if retry or rejected:
+                    self.failures += 1
+                else:
+                    self.batches += 1
+                for doc in written:
+                    self._attempts.pop(doc["_id"], None)
+            for doc, reason in rejected:
+                self._dead_letter(doc, reason)
+            return len(written)
+
+    def _count_attempts(self, retry: List[dict]) -> Tuple[List[dict], List[Tuple[dict, str]]]:
+        """Split documents to retry into (still retrying, out of attempts)."""
+        keep, exhausted = [], []
+        with self._lock:
+            for doc in retry:
+                attempts = self._attempts.get(doc["_id"], 0) + 1
+                if attempts >= self.max_attempts:
+                    exhausted.append((doc, f"gave up after {attempts} attempts"))
+                else:
+                    self._attempts[doc["_id"]] = attempts
+                    keep.append(doc)
+        return keep, exhausted
+
+    def _dead_letter(self, doc: dict, reason: str):
+        print(f"Error: Dropping message {doc.get('_id')} (echo {doc.get('echo_id')}): {reason}")
+        with self._lock:
+            self._attempts.pop(doc["_id"], None)
+            self.dead_letters.append({"document": doc, "reason": reason})
+            self.dead_lettered += 1
+        if self.on_dead_letter is not None:
+            try:
+                self.on_dead_letter(doc, reason)
+            except Exception as e:
+                print(f"Warning: Dead letter handler failed: {e}")
+
+    @staticmethod
+    def _unwritten(batch: List[dict], error: Exception) -> Tuple[List[dict], List[Tuple[dict, str]]]:
+        """
+        Documents of a failed insert_many that weren't written.
+
+        Returns:
+            (documents to retry, [(document, reason)] rejected for good)
+        """
+        details = getattr(error, "details", None)
+        if not details or "writeErrors" not in details:
+            # Connection error etc. - retry all; ones that did land are
+            # skipped next time as duplicate _ids
+            return list(batch), []
+        # Unordered insert: everything without a write error was written, and
+        # a duplicate key means an earlier attempt already wrote it
+        retry, rejected = [], []
+        for write_error in details["writeErrors"]:
+            code = write_error.get("code")
+            if code == DUPLICATE_KEY:
+                continue
+            doc = batch[write_error["index"]]
+            if code in TRANSIENT_CODES:
+                retry.append(doc)
+            else:
+                rejected.append((doc, write_error.get("errmsg") or f"write error {code}"))
+        return retry, rejected
+
+    def start(self):
+        """Flush on a background thread (every flush_interval, or when a batch fills)."""
+        def run():
+            while not self._stopped.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self.flush()
+
+        self._thread = threading.Thread(target=run, name="message-write-behind", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop the background thread and write whatever is still queued."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending) + len(self._in_flight),
+                "batches": self.batches,
+                "written": self.written,
+                "failures": self.failures,
+                "dead_lettered": self.dead_lettered,
+                "max_attempts": self.max_attempts,
+                "max_batch": self.max_batch,
+                "flush_interval_seconds": self.flush_interval
+            }
+
+
+def sort_key(document: dict):
+    """(created_at, _id) ordering that works for naive (from MongoDB) and aware datetimes."""
+    created_at: Any = document["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+    return created_at, document["_id"]
@@ -37,8 +37,9 @@ export default function VoiceUploadScreen() {
         name: file.name,
       };
 
-      // Step 3: Upload to backend
-      const response = await VoiceAPI.uploadReference(audioFile, 'My Voice');
+      // Step 3: Upload to backend (the model is created in the background)
+      const upload = await VoiceAPI.uploadReference(audioFile, 'My Voice', { async: true });
+      const response = await VoiceAPI.waitForUpload(upload.upload_id);
       
       // Step 4: Save reference ID
       setReferenceId(response.reference_id);
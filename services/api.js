@@ -84,9 +84,19 @@ export const EchoAPI = {
 export const ConversationAPI = {
   /**
    * Get conversation history
+   *
+   * Pass the response's next_cursor as options.before to load older
+   * messages (or as options.after when paging forward).
    */
-  async getHistory(echoId, limit = 10) {
-    return apiRequest(`/api/conversation/${echoId}?limit=${limit}`);
+  async getHistory(echoId, limit = 10, options = {}) {
+    let query = `limit=${limit}`;
+    if (options.before) {
+      query += `&before=${encodeURIComponent(options.before)}`;
+    }
+    if (options.after) {
+      query += `&after=${encodeURIComponent(options.after)}`;
+    }
+    return apiRequest(`/api/conversation/${echoId}?${query}`);
   },
 
   /**
@@ -128,13 +138,22 @@ export const VoiceAPI = {
 
   /**
    * Upload reference audio for voice cloning
+   *
+   * With options.async the server answers right away with an upload_id;
+   * poll it with getUploadStatus() (or waitForUpload()) for the model_id.
    */
-  async uploadReference(audioFile, name) {
+  async uploadReference(audioFile, name, options = {}) {
     const formData = new FormData();
     formData.append('audio', audioFile);
     if (name) {
       formData.append('name', name);
     }
+    if (options.userId) {
+      formData.append('user_id', options.userId);
+    }
+    if (options.async) {
+      formData.append('async', 'true');
+    }
 
     return apiRequest('/api/upload-reference', {
       method: 'POST',
@@ -144,6 +163,31 @@ export const VoiceAPI = {
       body: formData,
     });
   },
+
+  /**
+   * Get the status of an async reference upload
+   */
+  async getUploadStatus(uploadId) {
+    return apiRequest(`/api/upload-reference/${uploadId}`);
+  },
+
+  /**
+   * Poll an async reference upload until its voice model is ready
+   */
+  async waitForUpload(uploadId, intervalMs = 2000, timeoutMs = 180000) {
+    const deadline = Date.now() + timeoutMs;
+    while (Date.now() < deadline) {
+      const status = await VoiceAPI.getUploadStatus(uploadId);
+      if (status.status === 'succeeded') {
+        return status;
+      }
+      if (status.status === 'failed') {
+        throw new Error(status.error || 'Voice model creation failed');
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+    throw new Error('Timed out waiting for the voice model');
+  },
 };
 
 /**